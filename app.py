@@ -2,7 +2,9 @@ import io
 
 import pandas as pd
 import streamlit as st
-from tariff.file_parse import read_and_parse_excel, aggregate_highest_kva, concate_all_sheets, max_kva
+from tariff.file_parse import read_and_parse_excel, aggregate_highest_kva, concate_all_sheets, max_kva, ParseReport
+from tariff.coincident import coincident_peaks
+from tariff.meter_formats import read_meter_file
 
 
 def multi_excel(dfs):
@@ -39,7 +41,7 @@ def load_files():
     add_title()
     st.sidebar.header('Add your file or skip to use the default file')
     
-    st.sidebar.write('File format must be xlsx. Check the date column has a title `Date`')
+    st.sidebar.write('File format must be xlsx or csv. Check the date column has a title `Date`')
 
     uploaded_file = st.sidebar.file_uploader("Upload your input CSV file", type=["csv", "xlsx", "xls"])
     
@@ -53,12 +55,14 @@ def load_files():
     
     df = None
     if uploaded_file is not None:
-        df = read_and_parse_excel(uploaded_file, sheet_name=sheet_number, multiplier=multiplier)
-        print(df)
+        report = ParseReport(source=uploaded_file.name)
+        df = read_meter_file(uploaded_file, sheet_name=sheet_number, multiplier=multiplier, report=report)
+        if report.errors:
+            st.sidebar.warning(report.summary())
+            st.sidebar.dataframe(report.to_frame())
         
     if skip_file:
         df = read_and_parse_excel(sheet_name=sheet_number, multiplier=multiplier)
-        print(df)
     
     all_dfs = []
     for i in range(0, 6):
@@ -144,6 +148,22 @@ def load_files():
         file_name='max_kva.xlsx',
         mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     )
+    
+    st.divider()
+    
+    st.subheader('Top coincident peaks per month and period')
+    top_n = st.number_input('Peaks per month and period', value=3, min_value=1, max_value=20)
+    meters = merged.filter(like='KVA_value_Mtr').rename(columns=lambda col: col.replace('KVA_value_', ''))
+    peaks = coincident_peaks(meters, n=top_n)
+    st.write(peaks)
+    
+    excel_data = to_excel(peaks)
+    st.download_button(
+        label="Download coincident peaks as Excel",
+        data=excel_data,
+        file_name='coincident_peaks.xlsx',
+        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
 
 
 load_files()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the multi-meter merge in `concate_all_sheets`.
+
+Compares the concat + groupby('Date').first() merge it replaced with `merge_meters`, on
+meters with a few gaps and duplicate timestamps, checks that both give the same readings,
+and prints the timings:
+
+    python -m benchmarks.meter_merge --meters 40 --rows 17520
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from tariff.merge import merge_meters
+
+
+def merge_concat(meters, column='KVA'):
+    """The previous implementation, a groupby over the rows of all meters."""
+    col_dfs = []
+    for name, df in meters.items():
+        col_dfs.append(df[['Date', column]].rename(columns={column: name}))
+    master_df = pd.concat(col_dfs, ignore_index=True).set_index('Date')
+    return master_df.groupby('Date').first()
+
+
+def make_meters(meters, rows, seed=0):
+    # A year of half-hourly data per meter, with some intervals dropped and some repeated
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01 00:30", periods=rows, freq="30min")
+    frames = {}
+    for i in range(meters):
+        kept = dates[rng.random(rows) > 0.01]
+        repeated = kept[rng.random(len(kept)) < 0.005]
+        meter_dates = kept.append(repeated).sort_values()
+        frames[f"Mtr{i + 1}"] = pd.DataFrame({"Date": meter_dates, "KVA": rng.random(len(meter_dates)) * 100})
+    return frames
+
+
+def timed(fn, meters):
+    start = time.perf_counter()
+    result = fn(meters)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--meters", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=17520)
+    args = parser.parse_args()
+
+    meters = make_meters(args.meters, args.rows)
+    expected, concat_seconds = timed(merge_concat, meters)
+    (result, _), merge_seconds = timed(merge_meters, meters)
+
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    print(f"meters:  {args.meters}")
+    print(f"rows:    {args.rows:,}")
+    print(f"concat:  {concat_seconds:.3f}s")
+    print(f"merge:   {merge_seconds:.3f}s")
+    print(f"speedup: {concat_seconds / merge_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the time-of-use classification in `add_demand_slots`.
+
+Compares the row-wise `apply` implementation it replaced with the table lookup, checks that
+both give the same labels, and prints the timings:
+
+    python -m benchmarks.tou_classification --rows 2000000
+"""
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from tariff.constants import HIGH_DEMAND, LOW_DEMAND, OFF_PEAK
+from tariff.file_parse import add_demand_slots
+from tariff.holidays import holidays_for
+from tariff.tariff_maps import coe_tariff_e_2020_2021
+
+
+def add_demand_slots_apply(df):
+    """The previous implementation, one Python call per row, with the public holidays of the data."""
+    df['month'] = df['Date'].dt.month
+    df['season'] = df['month'].apply(
+        lambda x: HIGH_DEMAND if x in coe_tariff_e_2020_2021["high_demand_months"] else LOW_DEMAND)
+
+    default_holidays = {day.date() for day in holidays_for(df['Date'])}
+
+    def get_rate(row):
+        date_time = row['Date']
+        if date_time.date() in default_holidays or date_time.weekday() == 6:
+            return OFF_PEAK
+        return coe_tariff_e_2020_2021[row['season']][date_time.hour][0]
+
+    df['rate'] = df.apply(get_rate, axis=1)
+    return df
+
+
+def make_frame(rows):
+    # Half-hourly interval data ending in the current year
+    end = pd.Timestamp(f"{datetime.now().year}-12-31 23:30")
+    dates = pd.date_range(end=end, periods=rows, freq="30min")
+    return pd.DataFrame({"Date": dates, "KVA": 1.0})
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df.copy())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    expected, apply_seconds = timed(add_demand_slots_apply, df)
+    result, lookup_seconds = timed(add_demand_slots, df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"rows:    {args.rows:,}")
+    print(f"apply:   {apply_seconds:.3f}s")
+    print(f"lookup:  {lookup_seconds:.3f}s")
+    print(f"speedup: {apply_seconds / lookup_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+from collections import deque
+
+import pandas as pd
+
+from tariff.constants import DEFAULT_INTERVAL_HOURS, PEAK, ROLLING_DEMAND_MONTHS, STANDARD
+from tariff.file_parse import iter_excel_chunks
+
+# Keys of the monthly aggregates, one row per billing month and time-of-use period
+AGGREGATE_KEYS = ['year', 'month', 'rate']
+
+
+def infer_interval_hours(dates):
+    """Returns the metering interval in hours, the most common step between timestamps."""
+    steps = pd.Series(pd.DatetimeIndex(dates).sort_values()).diff().dropna()
+    steps = steps[steps > pd.Timedelta(0)]
+    if steps.empty:
+        raise ValueError("Need at least two distinct timestamps to infer the interval")
+    return steps.mode().iloc[0] / pd.Timedelta(hours=1)
+
+
+def interval_hours(dates=None):
+    """Returns the metering interval of timestamps, DEFAULT_INTERVAL_HOURS without two distinct ones."""
+    if dates is None:
+        return DEFAULT_INTERVAL_HOURS
+    dates = pd.DatetimeIndex(dates)
+    dates = dates[dates.notna()]
+    if dates.nunique() < 2:
+        return DEFAULT_INTERVAL_HOURS
+    return infer_interval_hours(dates)
+
+
+def kw_to_kwh(kw, dates=None):
+    """Returns the kWh of every interval from its kW demand, over the interval of the timestamps, see `interval_hours`."""
+    return kw * interval_hours(dates)
+
+
+class MonthlyAggregator:
+    """
+    Reduces parsed interval data to the monthly figures the tariff charges are based on.
+
+    Frames are added with `update`, in any number of chunks, and only the running totals are
+    kept. For every (year, month, rate) the result has the season, the KW and kWh sums, the
+    max kVA and the number of intervals. The monthly demand is the max kVA over the peak and
+    standard rows of a month.
+
+    :param interval_hours length of a metering interval, inferred from the first chunk if None
+    """
+
+    def __init__(self, interval_hours=None):
+        self.interval_hours = interval_hours
+        self._totals = None
+
+    def update(self, df):
+        """Adds a parsed frame, with the 'Date', 'KW', 'KVA', 'season' and 'rate' columns."""
+        df = df[df['Date'].notna()]
+        if df.empty:
+            return self
+
+        if self.interval_hours is None:
+            self.interval_hours = infer_interval_hours(df['Date'])
+
+        partial = (
+            df.assign(year=df['Date'].dt.year, month=df['Date'].dt.month, KWH=df['KW'] * self.interval_hours)
+            .groupby(AGGREGATE_KEYS, observed=True)
+            .agg(
+                season=('season', 'first'),
+                kw=('KW', 'sum'),
+                kwh=('KWH', 'sum'),
+                kva_max=('KVA', 'max'),
+                intervals=('KW', 'size'),
+            )
+        )
+
+        if self._totals is None:
+            self._totals = partial
+        else:
+            self._totals = (
+                pd.concat([self._totals, partial])
+                .groupby(level=AGGREGATE_KEYS, observed=True)
+                .agg({'season': 'first', 'kw': 'sum', 'kwh': 'sum', 'kva_max': 'max', 'intervals': 'sum'})
+            )
+        return self
+
+    def result(self):
+        """
+        Returns the aggregates.
+
+        Returns:
+            pd.DataFrame: Aggregates indexed by (year, month, rate).
+        """
+        if self._totals is None:
+            raise ValueError("No interval data added")
+        return self._totals.copy()
+
+
+def monthly_aggregates(df, interval_hours=None):
+    """Returns the monthly aggregates of a parsed frame, see `MonthlyAggregator`."""
+    return MonthlyAggregator(interval_hours).update(df).result()
+
+
+def stream_monthly_aggregates(file_obj=None, sheet_name=0, chunksize=50000, multiplier=200000,
+                              interval_hours=None, report=None):
+    """
+    Computes the monthly aggregates of a sheet without loading it whole.
+
+    Parameters:
+        file_obj (file object): The file object of the Excel file, the default file is used if None.
+        sheet_name (str or int): The name or index of the sheet to read.
+        chunksize (int): The number of rows read at a time.
+        multiplier (int): The multiplier for the energy values.
+        interval_hours (float): Length of a metering interval, inferred from the data if None.
+        report (ParseReport): Collects parse errors and stage timings.
+
+    Returns:
+        pd.DataFrame: Aggregates indexed by (year, month, rate).
+    """
+    aggregator = MonthlyAggregator(interval_hours)
+    for chunk in iter_excel_chunks(file_obj, sheet_name, chunksize=chunksize, multiplier=multiplier,
+                                   report=report):
+        aggregator.update(chunk)
+    return aggregator.result()
+
+
+def monthly_demand(aggregates, periods=(PEAK, STANDARD)):
+    """
+    Returns the max kVA of every billing month over the given time-of-use periods.
+
+    Parameters:
+        aggregates (pd.DataFrame): Monthly aggregates.
+        periods (tuple): The periods the demand is measured in.
+
+    Returns:
+        pd.Series: The max kVA indexed by (year, month).
+    """
+    in_periods = aggregates.index.get_level_values('rate').isin(periods)
+    return aggregates.loc[in_periods, 'kva_max'].groupby(level=['year', 'month'], observed=True).max()
+
+
+def rolling_max_demand(demand, months=ROLLING_DEMAND_MONTHS):
+    """
+    Returns, for every billing month, the highest demand over the calendar months ending with it.
+
+    Parameters:
+        demand (pd.Series): The max kVA of every month indexed by (year, month), as from `monthly_demand`.
+        months (int): The length of the window in calendar months.
+
+    Returns:
+        pd.Series: The rolling max kVA indexed by (year, month).
+    """
+    demand = demand.dropna().sort_index()
+    numbers = [int(year) * 12 + int(month) - 1 for year, month in demand.index]
+    rolling = rolling_max(numbers, demand.to_numpy(), months)
+    return pd.Series(rolling, index=demand.index, name=demand.name, dtype='float64')
+
+
+def rolling_max(numbers, values, months=ROLLING_DEMAND_MONTHS, groups=None):
+    """
+    Returns the max of the values over the `months` months ending at every month.
+
+    The values are scanned once with a monotonic deque: it holds the months that can still
+    be the highest of a later window, in decreasing order of value, so every month is added
+    and dropped once. Months missing from `numbers` count as no demand.
+
+    Parameters:
+        numbers (list): Month numbers (year * 12 + month - 1), increasing within each group.
+        values (list): The monthly values aligned with `numbers`.
+        months (int): The length of the window in calendar months.
+        groups (list): Group labels, such as meters, each group's months contiguous. All one group if None.
+
+    Returns:
+        list: The rolling max aligned with `numbers`.
+    """
+    window = deque()  # (month number, value), decreasing value
+    rolling = []
+    group = None
+    for i, (number, value) in enumerate(zip(numbers, values)):
+        if groups is not None and groups[i] != group:
+            group = groups[i]
+            window.clear()
+        while window and window[0][0] <= number - months:
+            window.popleft()
+        while window and window[-1][1] <= value:
+            window.pop()
+        window.append((number, value))
+        rolling.append(window[0][1])
+    return rolling
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+from tariff.aggregates import interval_hours, rolling_max
+from tariff.billing import get_clean_label, get_codes
+from tariff.compiled import MONTHLY_CHARGES, compile_tariff
+from tariff.constants import PEAK, ROLLING_DEMAND_MONTHS, STANDARD
+from tariff.fixed_point import costs, costs_to_cents, quantize, to_milli_cents, vat_cents
+from tariff.holidays import holidays_for
+from tariff.loader import validate_tariff
+from tariff.tou import PERIODS, SEASONS
+from tariff.tou_calendar import calendar_codes
+
+# Columns of the long-format input and of the bill table
+PROFILE_COLUMNS = ['meter', 'date', 'kw', 'kva']
+BILL_COLUMNS = ['meter', 'tariff', 'voltage_type', 'year', 'month', 'charge', 'units', 'units_type', 'rate', 'total']
+EXACT_BILL_COLUMNS = BILL_COLUMNS + ['total_cents']
+
+# Line item names, as in the TariffCalculator bills
+CHARGE_NAMES = {
+    "fixed_charge": "Fixed charge",
+    "internet_based_consumption_display": "Internet based consumption display",
+    "demand_charge": "Demand charge",
+    "network_access_charge": "Network access charge",
+    "energy_charge": "Energy charge",
+}
+
+
+def bill_meters(df, meters, holidays=None, exact=False):
+    """
+    Bills many meters in one call, every charge of every meter for every month.
+
+    The meters of a tariff are billed together: intervals are priced with array lookups and
+    reduced to meter months with one groupby, and every charge is computed for all meter months
+    at once. The charges are those of `TariffCalculator`, billed per month. The network access
+    charge of a month is on the highest peak or standard kVA of the 12 months ending with it.
+    Energy is the kW of an interval over the metering interval of its meter, inferred from the
+    meter's own timestamps, see `tariff.aggregates.interval_hours`.
+
+    Exact bills price in integer milli-cents and round every line item to the cent, see the
+    rounding policy in `tariff.fixed_point`. Their 'total_cents' column is exact, 'total' is
+    the same amount in rand.
+
+    Parameters:
+        df (pd.DataFrame): Long-format interval data, a row per meter and interval, with 'meter',
+            'date', 'kw' and 'kva' columns. 'season' and 'period' columns are used if present,
+            otherwise the intervals are labelled from the time-of-use calendar of the meter's
+            tariff, see `tariff.tou_calendar.calendar_codes`.
+        meters (dict): (tariff, charge voltage type) of every meter.
+        holidays (list): Dates billed as off peak all day, in addition to Sundays. The South African
+            public holidays of the years of the data if None.
+        exact (bool): Bill in whole cents with fixed-point arithmetic.
+
+    Returns:
+        pd.DataFrame: The bill table, a row per meter, month and charge.
+    """
+    missing = [col for col in PROFILE_COLUMNS if col not in df]
+    if missing:
+        raise ValueError(f"Interval data is missing the columns {missing}")
+
+    unknown = set(df['meter'].unique()) - set(meters)
+    if unknown:
+        raise ValueError(f"No tariff for the meters {sorted(unknown, key=str)}")
+
+    df = df[df['date'].notna()]
+    if holidays is None:
+        holidays = holidays_for(df['date'])
+    by_tariff = {}
+    for meter, (tariff, voltage_type) in meters.items():
+        by_tariff.setdefault(tariff["code"], (tariff, {}))[1][meter] = voltage_type
+
+    for tariff, _ in by_tariff.values():
+        validate_tariff(tariff)
+
+    bills = [
+        bill_tariff(df[df['meter'].isin(list(voltage_types))], tariff, voltage_types, holidays, exact)
+        for tariff, voltage_types in by_tariff.values()
+    ]
+    if not bills:
+        return pd.DataFrame(columns=EXACT_BILL_COLUMNS if exact else BILL_COLUMNS)
+    return pd.concat(bills, ignore_index=True).sort_values(['meter', 'year', 'month'], kind='stable',
+                                                           ignore_index=True)
+
+
+def bill_tariff(df, tariff, voltage_types, holidays=(), exact=False):
+    """Bills the meters of one tariff, see `bill_meters`."""
+    if df.empty:
+        return pd.DataFrame(columns=EXACT_BILL_COLUMNS if exact else BILL_COLUMNS)
+
+    compiled = compile_tariff(tariff)
+    meter_codes, meter_names = pd.factorize(df['meter'])
+    voltages = np.array([compiled.voltage_code(voltage_types[meter]) for meter in meter_names], dtype=np.intp)
+    dates = pd.DatetimeIndex(df['date'])
+    month_number = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+
+    if 'season' in df and 'period' in df:
+        season_codes = get_codes(df['season'], SEASONS, "season")
+        period_codes = get_codes(df['period'], PERIODS, "period")
+    else:
+        # Meters share their timestamps, so each one is classified once
+        unique_dates, inverse = np.unique(dates.values, return_inverse=True)
+        season_codes, period_codes = calendar_codes(unique_dates, tariff, holidays=holidays)
+        season_codes, period_codes = season_codes[inverse], period_codes[inverse]
+
+    kwh = df['kw'].to_numpy(dtype=float) * meter_interval_hours(dates, meter_codes, len(meter_names))[meter_codes]
+    if exact:
+        # Exact interval costs are integers, so their monthly sums are exact too
+        rates = np.zeros(compiled.energy_rates.shape, dtype=np.int64)
+        used = np.unique(voltages)
+        rates[used] = to_milli_cents(compiled.energy_rates[used])
+        price = costs(rates[voltages[meter_codes], season_codes, period_codes], quantize(kwh))
+    else:
+        price = kwh * compiled.energy_rates[voltages[meter_codes], season_codes, period_codes]
+    demand = np.isin(period_codes, [PERIODS.index(PEAK), PERIODS.index(STANDARD)])
+    intervals = pd.DataFrame({
+        'meter': meter_codes,
+        'month_number': month_number,
+        'kwh': kwh,
+        'price': price,
+        'kva': np.where(demand, df['kva'].to_numpy(dtype=float), np.nan),
+    })
+    months = (
+        intervals.groupby(['meter', 'month_number'])
+        .agg(kwh=('kwh', 'sum'), price=('price', 'sum'), kva=('kva', 'max'))
+        .reset_index()
+    )
+    months['kva'] = months['kva'].fillna(0)  # a month without peak or standard intervals has no demand
+    months['year'] = months['month_number'] // 12
+    months['month'] = months['month_number'] % 12 + 1
+    month_voltages = voltages[months['meter']]
+    month_seasons = compiled.season_of_month[months['month']]
+
+    lines = []
+    for name in compiled.charges:
+        charge = next(charge for charge in tariff["charges"] if charge["name"] == name)
+        units_type = get_clean_label(charge.get("rate_billing_type") or "-")
+        if name in MONTHLY_CHARGES:
+            rate = compiled.fixed_rates[month_voltages, MONTHLY_CHARGES.index(name)]
+            units = np.ones(len(months))
+            total = rate
+        elif name == "demand_charge":
+            rate = compiled.demand_rates[month_voltages, month_seasons]
+            units = months['kva'].to_numpy()
+            total = rate * units
+        elif name == "network_access_charge":
+            rate = compiled.nac_rates[month_voltages]
+            units = rolling_demand(months)
+            total = rate * units
+        elif name == "energy_charge":
+            units = months['kwh'].to_numpy()
+            total = months['price'].to_numpy()
+        else:
+            raise ValueError(f"Charge {name} of {tariff['code']} cannot be billed in batch")
+        if np.isnan(total).any():
+            raise ValueError(f"No {name} rate of {tariff['code']} for some voltage types")
+
+        if exact:
+            line_costs = total if name == "energy_charge" else costs(to_milli_cents(rate), quantize(units))
+            cents = costs_to_cents(line_costs)
+            total = cents / 100
+        if name == "energy_charge":
+            rate = np.divide(total, units, out=np.zeros(len(months)), where=units != 0)
+
+        lines.append(pd.DataFrame({
+            'meter': meter_names[months['meter']],
+            'tariff': tariff["code"],
+            'voltage_type': np.array(compiled.voltage_types, dtype=object)[month_voltages],
+            'year': months['year'],
+            'month': months['month'],
+            'charge': CHARGE_NAMES[name],
+            'units': units,
+            'units_type': units_type,
+            'rate': rate,
+            'total': total,
+        }))
+        if exact:
+            lines[-1]['total_cents'] = cents
+    return pd.concat(lines, ignore_index=True)
+
+
+def meter_interval_hours(dates, meter_codes, n_meters):
+    """Returns the metering interval of every meter from its own timestamps, see `tariff.aggregates.interval_hours`."""
+    order = np.argsort(meter_codes, kind='stable')
+    bounds = np.cumsum(np.bincount(meter_codes, minlength=n_meters))[:-1]
+    return np.array([interval_hours(dates[rows]) for rows in np.split(order, bounds)], dtype=float)
+
+
+def rolling_demand(months):
+    """Returns the rolling 12-month max kVA of every meter month, months sorted within each meter."""
+    return np.array(rolling_max(months['month_number'].tolist(), months['kva'].tolist(),
+                                ROLLING_DEMAND_MONTHS, groups=months['meter'].tolist()), dtype=float)
+
+
+def bill_summary(bills, tariffs):
+    """
+    Totals a bill table per meter and month, with VAT. Exact bills are totalled in cents, with
+    the VAT of every meter month rounded to the cent.
+
+    Parameters:
+        bills (pd.DataFrame): A bill table of `bill_meters`.
+        tariffs (list): The tariffs of the billed meters, for their VAT rates.
+
+    Returns:
+        pd.DataFrame: 'total', 'vat_rate', 'vat_amount' and 'total_incl_vat', indexed by meter, year and month.
+        Exact summaries also have 'total_cents', 'vat_cents' and 'total_incl_vat_cents'.
+    """
+    vat_rates = {tariff["code"]: tariff["vat_rate"] for tariff in tariffs}
+    if 'total_cents' in bills:
+        summary = bills.groupby(['meter', 'tariff', 'year', 'month'], sort=True)['total_cents'].sum().reset_index()
+        summary['vat_rate'] = summary['tariff'].map(vat_rates)
+        vat = np.zeros(len(summary), dtype=np.int64)
+        for code, vat_rate in vat_rates.items():
+            rows = (summary['tariff'] == code).to_numpy()
+            vat[rows] = vat_cents(summary['total_cents'].to_numpy()[rows], vat_rate)
+        summary['vat_cents'] = vat
+        summary['total_incl_vat_cents'] = summary['total_cents'] + summary['vat_cents']
+        summary['total'] = summary['total_cents'] / 100
+        summary['vat_amount'] = summary['vat_cents'] / 100
+        summary['total_incl_vat'] = summary['total_incl_vat_cents'] / 100
+        return summary.set_index(['meter', 'year', 'month'])
+
+    summary = bills.groupby(['meter', 'tariff', 'year', 'month'], sort=True)['total'].sum().reset_index()
+    summary['vat_rate'] = summary['tariff'].map(vat_rates)
+    summary['vat_amount'] = summary['total'] * summary['vat_rate']
+    summary['total_incl_vat'] = summary['total'] + summary['vat_amount']
+    return summary.set_index(['meter', 'year', 'month'])
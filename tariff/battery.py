@@ -0,0 +1,168 @@
+import numpy as np
+
+from tariff.compare import price_tariff
+from tariff.constants import OFF_PEAK, PEAK, STANDARD
+from tariff.scenarios import Transformation
+
+
+def dispatch(need, room, power_kw, energy_kwh, efficiency=0.9, hours=0.5, initial_soc=1.0):
+    """
+    Greedy threshold dispatch of a battery over a year of intervals.
+
+    The battery discharges in every interval with a need, as much as it needs or holds, and
+    charges at the first intervals with room after a discharge until full. Only the runs of
+    consecutive intervals with a need are walked one by one, the discharging within them and
+    the charging between them are settled with cumulative sums.
+
+    Parameters:
+        need (np.ndarray): kW to discharge in every interval, in time order.
+        room (np.ndarray): kW the battery may charge in every interval, ignored where there is a need.
+        power_kw (float): Charge and discharge power limit.
+        energy_kwh (float): Usable capacity.
+        efficiency (float): Round-trip efficiency, lost when charging.
+        hours (float): Interval length in hours.
+        initial_soc (float): Stored share of the capacity before the first interval.
+
+    Returns:
+        tuple: The battery kW of every interval, positive discharging and negative charging, and
+        the kWh stored at the end of every interval.
+    """
+    need = np.minimum(np.maximum(need, 0), power_kw)
+    room = np.where(need > 0, 0, np.minimum(np.maximum(room, 0), power_kw))
+    # kWh stored before every interval when charging at every room since the first interval
+    charged = np.concatenate([[0.0], np.cumsum(room * hours * efficiency)])
+
+    # Runs of consecutive intervals with a need, the battery never charges within a run
+    events = np.flatnonzero(need > 0)
+    firsts = np.flatnonzero(np.diff(events, prepend=-2) > 1)
+    run_starts = events[firsts]
+    lasts = np.append(firsts[1:], len(events)) - 1 if len(events) else firsts
+    run_ends = events[lasts] + 1
+    asked = need[events] * hours
+    run_asked = np.add.reduceat(asked, firsts) if len(events) else asked
+
+    run_soc = []  # kWh stored at the start of every run
+    gap_soc = []  # kWh stored at the start of every gap before a run, and after the last run
+    soc, gap_start = initial_soc * energy_kwh, 0
+    charged_list = charged.tolist()
+    for start, end, kwh in zip(run_starts.tolist(), run_ends.tolist(), run_asked.tolist()):
+        gap_soc.append(soc)
+        soc += charged_list[start] - charged_list[gap_start]
+        if soc > energy_kwh:
+            soc = energy_kwh
+        run_soc.append(soc)
+        soc = soc - kwh if kwh < soc else 0.0
+        gap_start = end
+    gap_soc.append(soc)
+    run_soc, gap_soc = np.array(run_soc), np.array(gap_soc)
+
+    # Discharging within every run, as asked until the battery is empty
+    runs = np.repeat(np.arange(len(firsts)), np.diff(np.append(firsts, len(events))))
+    asked_after = np.cumsum(asked)
+    asked_before = asked_after - asked
+    run_offsets = asked_before[firsts][runs]
+    delivered_before = np.minimum(asked_before - run_offsets, run_soc[runs])
+    delivered_after = np.minimum(asked_after - run_offsets, run_soc[runs])
+
+    # Charging in every gap, the earliest rooms first until the battery is full
+    positions = np.arange(len(need))
+    gaps = np.searchsorted(run_starts, positions)
+    starts = np.append(0, run_ends)[gaps]
+    deficits = energy_kwh - gap_soc[gaps]
+    stored_before = np.minimum(charged[positions] - charged[starts], deficits)
+    stored_after = np.minimum(charged[positions + 1] - charged[starts], deficits)
+
+    battery_kw = (stored_before - stored_after) / (hours * efficiency)
+    battery_kw[events] = (delivered_after - delivered_before) / hours
+    stored = gap_soc[gaps] + stored_after
+    stored[events] = run_soc[runs] - delivered_after
+    return battery_kw, stored
+
+
+class PeakShaving(Transformation):
+    """
+    A battery holding the kVA of the demand periods at a cap, for the scenario engine. It
+    discharges in the demand periods wherever the kVA is above the cap, and recharges in the
+    charge periods, without raising the kVA of a demand period above the cap.
+
+    The battery supplies real power only, so the reactive power of every interval is kept. The
+    battery kW and the kWh stored at every interval are added to the profile as 'battery_kw'
+    and 'stored_kwh'. Sizing studies price many batteries in one call of
+    `ScenarioEngine.evaluate`.
+
+    With months selected, the battery starts every run of consecutive months at the initial
+    state of charge, no charge is carried over the months it does not run in.
+
+    :param power_kw charge and discharge power limit
+    :param energy_kwh usable capacity
+    :param cap_kva the kVA the battery holds the demand periods at
+    :param efficiency round-trip efficiency, lost when charging
+    :param initial_soc stored share of the capacity before the first interval
+    :param charge_periods the periods the battery charges in
+    :param months calendar months the battery runs in, every month if None
+    :param periods the demand periods the battery discharges in
+    """
+
+    def __init__(self, power_kw, energy_kwh, cap_kva, efficiency=0.9, initial_soc=1.0, charge_periods=(OFF_PEAK,),
+                 months=None, periods=(PEAK, STANDARD)):
+        super().__init__(months, periods)
+        if power_kw < 0 or energy_kwh < 0 or cap_kva < 0:
+            raise ValueError("Battery power, capacity and kVA cap must not be negative")
+        if not 0 < efficiency <= 1 or not 0 <= initial_soc <= 1:
+            raise ValueError("Efficiency must be in (0, 1] and initial state of charge in [0, 1]")
+        self.power_kw = power_kw
+        self.energy_kwh = energy_kwh
+        self.cap_kva = cap_kva
+        self.efficiency = efficiency
+        self.initial_soc = initial_soc
+        self.charge_periods = tuple(charge_periods)
+
+    def runs(self, intervals):
+        """
+        Returns the positions of the intervals of every run of consecutive billing months the
+        battery runs in, the battery starts each at the initial state of charge.
+        """
+        if self.months is None:
+            positions = np.arange(len(intervals.kw))
+        else:
+            positions = np.flatnonzero(np.isin(intervals.calendar_months, self.months))
+        breaks = (np.diff(positions) > 1) | (np.diff(intervals.month_codes[positions]) > 1)
+        return [run for run in np.split(positions, np.flatnonzero(breaks) + 1) if len(run)]
+
+    def apply(self, intervals):
+        demand = self.selects(intervals)
+        charge = self.selects(intervals, self.charge_periods)
+        kvar = np.sqrt(np.maximum(intervals.kva ** 2 - intervals.kw ** 2, 0))
+        # The most kW an interval can draw and stay within the cap
+        limit_kw = np.sqrt(np.maximum(self.cap_kva ** 2 - kvar ** 2, 0))
+
+        need = np.where(demand, intervals.kw - limit_kw, 0)
+        room = np.where(charge, np.where(demand, limit_kw - intervals.kw, np.inf), 0)
+        battery_kw, stored = np.zeros(len(need)), np.zeros(len(need))
+        for run in self.runs(intervals):
+            battery_kw[run], stored[run] = dispatch(need[run], room[run], self.power_kw, self.energy_kwh,
+                                                    self.efficiency, intervals.hours, self.initial_soc)
+
+        kw = intervals.kw - battery_kw
+        intervals.kva = np.where(battery_kw != 0, np.sqrt(kw ** 2 + kvar ** 2), intervals.kva)
+        intervals.kw = kw
+        intervals.columns['battery_kw'] = battery_kw
+        intervals.columns['stored_kwh'] = stored
+
+
+def battery_savings(engine, battery):
+    """
+    Runs a battery over the profile of a scenario engine.
+
+    Parameters:
+        engine (ScenarioEngine): The profile and tariff.
+        battery (PeakShaving): The battery.
+
+    Returns:
+        tuple: The shaved profile of `ScenarioEngine.profile`, and the saving on every charge and
+        'total', by name.
+    """
+    charges = price_tariff(engine.aggregates([battery]), engine.tariff, engine.voltage_type)
+    savings = {charge: engine.base_charges[charge] - charges[charge] for charge in charges}
+    savings['total'] = sum(savings.values())
+    return engine.profile([battery]), savings
@@ -1,38 +1,41 @@
 import datetime
 import decimal
+import logging
 import math
 
-from core.utils.app_logging import log_error
-from energy_manager.constants import (
-    OFF_PEAK,
+import numpy as np
+import pandas as pd
+from tariff.aggregates import kw_to_kwh, rolling_max_demand
+from tariff.constants import (
     LOW_DEMAND,
     HIGH_DEMAND,
     STANDARD,
     PEAK,
+    ROLLING_DEMAND_MONTHS,
 )
-from energy_manager.utils.file_parser import kw_to_kwh
-
-
-def get_tariff_type(date_time: datetime.datetime, tariff_intervals):
-    # print(f"tariff check {date_time}, for tar {tariff_intervals}")
-
-    holidays = [datetime.datetime.now().date]
-    # date - check if it is a holiday
-
-    if date_time.date in holidays or date_time.weekday() == 6:
-        return OFF_PEAK
+from tariff.fixed_point import (
+    amount_to_cents,
+    cents_to_rand,
+    costs,
+    costs_to_cents,
+    quantize,
+    to_milli_cents,
+    vat_cents,
+)
+from tariff.holidays import holidays_for
+from tariff.loader import validate_tariff
+from tariff.tou import PERIODS, SEASONS, classify_tou
 
-    month = date_time.month
-    if month in tariff_intervals["high_demand_months"]:
-        tariff_period = tariff_intervals[LOW_DEMAND]
-    else:
-        tariff_period = tariff_intervals[HIGH_DEMAND]
+logger = logging.getLogger(__name__)
 
-    # return half hourly tariff type
-    tariff = tariff_period.get(str(date_time.hour))
 
-    tariff_type = tariff["0"] if date_time.minute == 0 else tariff["1"]
-    return tariff_type
+def get_tariff_type(date_time: datetime.datetime, tariff_intervals):
+    """
+    Returns the time-of-use period of a timestamp under a tariff map, off peak on Sundays and
+    public holidays. Intervals shorter than half an hour take the half hour they start in.
+    """
+    _, period = classify_tou([date_time], tariff_intervals, holidays_for([date_time]))
+    return period[0]
 
 
 def get_max_kva(df_consumption, month=None):
@@ -40,7 +43,6 @@ def get_max_kva(df_consumption, month=None):
     # https://towardsdatascience.com/filtering-data-frames-in-pandas-b570b1f834b9
 
     try:
-        print(df_consumption.head(), "max_kva")
         df_max_kva = df_consumption[df_consumption["period"].isin([PEAK, STANDARD])]
 
         # filter for only a month if provide
@@ -49,8 +51,57 @@ def get_max_kva(df_consumption, month=None):
 
         max_value = df_max_kva["kva"].max()
         return max_value
-    except Exception as e:
-        log_error(e, get_max_kva.__name__)
+    except Exception:
+        logger.exception(get_max_kva.__name__)
+
+
+def get_monthly_max_kva(df_consumption):
+    """
+    Get the max peak and standard kva of every billing month, indexed by (year, month).
+    The year comes from a "year" or "date" column, a frame without either is one year.
+    """
+    df = df_consumption[df_consumption["period"].isin([PEAK, STANDARD])]
+    if "year" in df:
+        years = df["year"]
+    elif "date" in df:
+        years = df["date"].dt.year
+    else:
+        years = 0
+
+    monthly = df.assign(year=years).groupby(["year", "month"])["kva"].max()
+    return monthly.rename("kva")
+
+
+def get_month_label(year, month):
+    return f"{year}-{month:02d}" if year else str(month)
+
+
+def get_demand_line_items(df_consumption, tariff_charge, charge_voltage_type, high_demand_months):
+    """
+    Get the demand charge of every billing month from one pass over the dataframe:
+    year, month, season, the max peak and standard kva, the rate and the total.
+    A month without peak or standard intervals has no demand
+    """
+    monthly = get_monthly_max_kva(df_consumption)
+    if "year" in df_consumption:
+        years = df_consumption["year"]
+    elif "date" in df_consumption:
+        years = df_consumption["date"].dt.year
+    else:
+        years = pd.Series(0, index=df_consumption.index)
+    months = pd.MultiIndex.from_arrays([years, df_consumption["month"]], names=["year", "month"])
+    monthly = monthly.reindex(months.unique().sort_values(), fill_value=0)
+
+    items = monthly.reset_index()
+    high = items["month"].isin(high_demand_months)
+    items["season"] = np.where(high, HIGH_DEMAND, LOW_DEMAND)
+    rates = {
+        season: tariff_charge["types"][season][charge_voltage_type]
+        for season in (HIGH_DEMAND, LOW_DEMAND)
+    }
+    items["rate"] = np.where(high, rates[HIGH_DEMAND], rates[LOW_DEMAND])
+    items["total"] = items["rate"] * items["kva"].astype(float)
+    return items[["year", "month", "season", "kva", "rate", "total"]]
 
 
 def get_peak_charge(period, kwh, season, charge_voltage_type, rates_dic):
@@ -63,25 +114,77 @@ def get_season_type(high_demand_mnths, month):
     return HIGH_DEMAND if month in high_demand_mnths else LOW_DEMAND
 
 
+def get_rate_table(rates_dic, charge_voltage_type):
+    """Returns the energy rates of a voltage type as an array indexed by (season, period) code"""
+    table = np.empty((len(SEASONS), len(PERIODS)))
+    for s, season in enumerate(SEASONS):
+        for p, period in enumerate(PERIODS):
+            table[s, p] = rates_dic[season][charge_voltage_type][period]
+    return table
+
+
+def get_codes(labels, categories, column):
+    """Returns the position of every label in categories, raises on labels not in them"""
+    codes = pd.Categorical(labels, categories=categories).codes
+    if (codes < 0).any():
+        unknown = sorted(set(pd.Series(labels)[codes < 0].astype(str)))
+        raise KeyError(f"unknown {column} {unknown}")
+    return codes
+
+
+def get_period_sums(dataframe, columns):
+    """
+    Sums columns per period with one groupby, missing values skipped as in a filtered column sum,
+    periods without rows sum to zero
+    """
+    sums = dataframe.groupby("period", observed=True)[columns].sum().reindex(PERIODS, fill_value=0)
+    return sums.to_dict(orient="index")
+
+
 def apply_energy_charge(charge_voltage_type, tariff_charge, dataframe):
-    """add the energy charge"""
+    """
+    add the energy rate and charge, one rate lookup and multiply for all intervals,
+    at the rates of tariff_charge for the voltage type
+    """
 
-    dataframe["kwh"] = dataframe["kw"].apply(lambda x: kw_to_kwh(x))
-    rates_dic = tariff_charge["types"]
-    # https://towardsdatascience.com/apply-and-lambda-usage-in-pandas-b13a1ea037f7
+    dataframe["kwh"] = kw_to_kwh(dataframe["kw"], dataframe["date"] if "date" in dataframe else None)
     try:
-        dataframe["price_per_kwh"] = dataframe.apply(
-            lambda x: get_peak_charge(
-                x["period"], x["kwh"], x["season"], charge_voltage_type, rates_dic
-            ),
-            axis=1,
-        )
+        rates = get_rate_table(tariff_charge["types"], charge_voltage_type)
+        season_codes = get_codes(dataframe["season"], SEASONS, "season")
+        period_codes = get_codes(dataframe["period"], PERIODS, "period")
+        dataframe["rate_per_kwh"] = rates[season_codes, period_codes]
+        dataframe["price_per_kwh"] = dataframe["kwh"].astype(float) * dataframe["rate_per_kwh"]
     except Exception as e:
         raise Exception(f"error {e} cannot add energy")
 
     return dataframe
 
 
+def get_billing_months(dataframe):
+    """Returns the billing month number (year * 12 + month - 1) of every interval, year 0 without dates"""
+    if "year" in dataframe:
+        years = dataframe["year"].to_numpy()
+    elif "date" in dataframe:
+        years = dataframe["date"].dt.year.to_numpy()
+    else:
+        years = 0
+    return years * 12 + dataframe["month"].to_numpy() - 1
+
+
+def get_exact_cents(rates, units, months=None):
+    """
+    Returns the exact cost of units at rates in whole cents, see the rounding policy in
+    `tariff.fixed_point`: int64 milli-cent costs of quantized units, rounded to the cent once
+    per billing month when months are given, as `tariff.batch.bill_meters` bills, else once
+    """
+    line_costs = pd.Series(costs(to_milli_cents(np.atleast_1d(rates)), quantize(np.atleast_1d(units))))
+    if months is None:
+        line_costs = line_costs.sum()
+    else:
+        line_costs = line_costs.groupby(np.asarray(months)).sum().to_numpy()
+    return int(np.sum(costs_to_cents(line_costs)))
+
+
 def get_clean_label(data):
     return data.replace("_", " ")
 
@@ -96,6 +199,7 @@ class TariffCalculator:
     """
 
     def __init__(self, charge_voltage_type, tariff, df, current_charges=None):
+        validate_tariff(tariff)
         self.charge_voltage_type = charge_voltage_type
         self.tariff = tariff
         self.high_demand_months = tariff["high_demand_months"]
@@ -119,7 +223,13 @@ class TariffCalculator:
         self.current_charges = current_charges
         return current_charges
 
-    def get_bill_summary(self):
+    def get_bill_summary(self, exact=False):
+        """
+        :param exact bill every charge in whole cents and the VAT on the total to the cent, amounts are
+            Decimal, see the rounding policy in `tariff.fixed_point`. Charges are billed in cents
+            per month as `tariff.batch.bill_meters` bills them
+        :return: Bill totals and VAT
+        """
 
         if self.current_charges is None:
             raise Exception(
@@ -130,10 +240,19 @@ class TariffCalculator:
         bill_total = 0
         vat_rate = self.tariff["vat_rate"]
 
-        for i in self.current_charges:
-            bill_total = bill_total + i["total"]
+        if exact:
+            # Charges billed here carry their exact cents, others are rounded from their totals
+            total_cents = sum(
+                i["total_cents"] if "total_cents" in i else amount_to_cents(i["total"])
+                for i in self.current_charges
+            )
+            bill_total = cents_to_rand(total_cents)
+            vat_amount = cents_to_rand(vat_cents(total_cents, vat_rate))
+        else:
+            for i in self.current_charges:
+                bill_total = bill_total + i["total"]
 
-        vat_amount = bill_total * vat_rate
+            vat_amount = bill_total * vat_rate
         bill_total_incl_vat = bill_total + vat_amount
 
         summary = {
@@ -159,6 +278,9 @@ class TariffCalculator:
         return {
             "name": "Fixed charge",
             "total": total,
+            "total_cents": get_exact_cents(
+                [rate_amount] * self.num_m_periods, [1] * self.num_m_periods, range(self.num_m_periods)
+            ),
             "units": self.num_m_periods,
             "units_type": get_clean_label(rate_billing_type),
             "rate": rate_amount,
@@ -175,6 +297,9 @@ class TariffCalculator:
         return {
             "name": "Internet based consumption display",
             "total": total,
+            "total_cents": get_exact_cents(
+                [rate_amount] * self.num_m_periods, [1] * self.num_m_periods, range(self.num_m_periods)
+            ),
             "units": self.num_m_periods,
             "units_type": get_clean_label(rate_billing_type),
             "rate": rate_amount,
@@ -182,98 +307,108 @@ class TariffCalculator:
         }
 
     def demand_charge(self, tariff_charge):
-        """ Calculate highest kva in month """
-        months = self.months
-        total = 0
+        """
+        Calculate highest kva in month, meta has the line items of every month.
+        rate is the average over the months, rate_label its display text
+        """
         rate_billing_type = tariff_charge.get("rate_billing_type", None)
-        for month in months:
-            try:
-                max_kva = get_max_kva(self.dataframe, month)
-                print(f"{max_kva}, demand_charge")
-                if month in self.high_demand_months:
-                    rate = tariff_charge["types"][HIGH_DEMAND][self.charge_voltage_type]
-
-                else:
-                    rate = tariff_charge["types"][LOW_DEMAND][self.charge_voltage_type]
-
-                total = (rate * float(max_kva)) + total
-
-                return {
-                    "name": "Demand charge",
-                    "total": total,
-                    "units": self.num_m_periods,
-                    "units_type": get_clean_label(rate_billing_type),
-                    "rate": rate,
-                    "meta": {},
-                }
+        try:
+            items = get_demand_line_items(
+                self.dataframe,
+                tariff_charge,
+                self.charge_voltage_type,
+                self.high_demand_months,
+            )
+            total = items["total"].sum()
+            kva = items["kva"].sum()
+            rate = total / kva if kva else 0
 
-            except Exception as e:
-                log_error(e, self.demand_charge.__name__)
-                raise Exception(f"{e} demand charge")
+            return {
+                "name": "Demand charge",
+                "total": total,
+                "total_cents": get_exact_cents(items["rate"], items["kva"].astype(float), items.index),
+                "units": len(items),
+                "units_type": get_clean_label(rate_billing_type),
+                "rate": rate,
+                "rate_label": f"{round(rate, 4)} (avg)",
+                "meta": {
+                    get_month_label(item.year, item.month): {
+                        "kva": item.kva,
+                        "season": item.season,
+                        "rate": item.rate,
+                        "total": item.total,
+                    }
+                    for item in items.itertuples()
+                },
+            }
+
+        except Exception as e:
+            logger.exception(self.demand_charge.__name__)
+            raise Exception(f"{e} demand charge")
 
     def network_access_charge(
         self,
         tariff_charge,
     ):
         """
-        Based on rolling 12 month period highest KVA
-        Dataframe must be filter to include past 12 months if used
-        Other base it off max kva
+        Based on rolling 12 month period highest KVA, at the last month of the dataframe.
+        Months before it in the dataframe are part of the rolling window,
+        meta has the rolling highest KVA of every month
         """
 
         try:
-
-            max_kva = get_max_kva(self.dataframe)
+            rolling_kva = rolling_max_demand(
+                get_monthly_max_kva(self.dataframe), months=ROLLING_DEMAND_MONTHS
+            )
+            # Without peak or standard intervals there is no demand, as in demand_charge
+            max_kva = rolling_kva.iloc[-1] if len(rolling_kva) else 0.0
 
             rate = tariff_charge["types"][self.charge_voltage_type]
             total = rate * float(max_kva)
             return {
                 "total": total,
+                "total_cents": get_exact_cents(rate, float(max_kva)),
                 "name": "Network access charge",
                 "units": float(max_kva),
                 "units_type": get_clean_label(
                     tariff_charge.get("rate_billing_type", "-")
                 ),
                 "rate": rate,
+                "meta": {
+                    get_month_label(year, month): float(kva)
+                    for (year, month), kva in rolling_kva.items()
+                },
             }
 
         except Exception as e:
-            log_error(e, self.network_access_charge.__name__)
+            logger.exception(self.network_access_charge.__name__)
             raise Exception(f"{e} network charge")
 
     def energy_charge(self, tariff_charge):
         """Returns the total energy charge for a dataframe"""
 
         try:
-            df = apply_energy_charge(
-                self.charge_voltage_type,
-                tariff_charge,
-                self.dataframe,
-            )
+            df = apply_energy_charge(self.charge_voltage_type, tariff_charge, self.dataframe)
 
             total = df["price_per_kwh"].sum()
             units = df["kwh"].sum()
             rate = total / units
 
-            items = [OFF_PEAK, PEAK, STANDARD]
-            meta = {}
-            kw = 0
-            kwh = 0
-            price_kwh = 0
-            for i in items:
-                filtered = df[df["period"] == i]
-                ikw = filtered["kw"].sum()
-                ikwh = filtered["kwh"].sum()
-                iprice = filtered["price_per_kwh"].sum()
-
-                price_kwh = price_kwh + iprice
-                kw = ikw + kw
-                kwh = ikwh + kwh
-                meta.update({i: {"kw": ikw, "kwh": ikwh, "price_per_kwh": iprice}})
-            meta.update({"total": {"kw": kw, "kwh": kwh, "price_per_kwh": price_kwh}})
+            meta = get_period_sums(df, ["kw", "kwh", "price_per_kwh"])
+            meta.update(
+                {
+                    "total": {
+                        col: sum(meta[i][col] for i in PERIODS)
+                        for col in ["kw", "kwh", "price_per_kwh"]
+                    }
+                }
+            )
             return {
                 "name": "Energy charge",
                 "total": total,
+                "total_cents": get_exact_cents(
+                    df["rate_per_kwh"], df["kwh"].to_numpy(dtype=float), get_billing_months(df)
+                ),
                 "units": units,
                 "units_type": "per kwh",
                 "rate": f"{round(rate, 4)} (avg)",
@@ -281,7 +416,7 @@ class TariffCalculator:
             }
 
         except Exception as e:
-            log_error(e, self.energy_charge.__name__)
+            logger.exception(self.energy_charge.__name__)
             raise Exception(f"{e} energy charge")
 
 
@@ -311,7 +446,7 @@ def _get_meta_stats(c_data):
             }
         )
 
-    except Exception as e:
-        log_error(e, "get_chartdata values:_get_meta_stats")
+    except Exception:
+        logger.exception("get_chartdata values:_get_meta_stats")
 
     return meta
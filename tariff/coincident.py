@@ -0,0 +1,279 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401, checkpoints are Feather files
+except ImportError:  # checkpoints need pyarrow, install the 'cache' extra
+    pyarrow = None
+
+from tariff.file_parse import add_demand_slots
+from tariff.merge import dedupe_timestamps
+from tariff.tou import PERIODS
+
+# Columns of the peak tables, before the per-meter columns
+PEAK_KEYS = ['year', 'month', 'rate']
+
+# Files of a CoincidentDemandAggregator checkpoint, one per month and the meter names
+CHECKPOINT_SUFFIX = '.feather'
+CHECKPOINT_METERS = 'meters.json'
+
+
+def top_positions(values, codes, n):
+    """
+    Selects the positions of the n largest values of every group, largest first.
+
+    Rows are bucketed by group with one stable integer sort, then each bucket is
+    partitioned around its n-th largest value, so only the selected values are ever fully
+    sorted. Of tied values the earliest row ranks first.
+
+    Parameters:
+        values (np.ndarray): The values to rank, NaN never ranks.
+        codes (np.ndarray): Non-negative integer group codes aligned with `values`.
+        n (int): The number of values to select per group.
+
+    Returns:
+        tuple: Arrays of the selected positions and their rank within their group, from 1.
+    """
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    ranked = np.where(np.isnan(values), -np.inf, values)
+
+    positions, ranks = [], []
+    for bucket in np.split(order, bounds):
+        k = min(n, len(bucket))
+        if k == 0:
+            continue
+        bucket_values = ranked[bucket]
+        threshold = -np.partition(-bucket_values, k - 1)[k - 1]
+        # Every value tied with the k-th is a candidate, so ties go to the earliest row
+        top = bucket[bucket_values >= threshold]
+        top = top[np.argsort(-ranked[top], kind='stable')[:k]]
+        positions.append(top)
+        ranks.append(np.arange(1, k + 1))
+
+    if not positions:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    return np.concatenate(positions), np.concatenate(ranks)
+
+
+def coincident_peaks(meters, n=3, by_period=True):
+    """
+    Finds the top N coincident peaks of a site for every month, and every time-of-use period
+    within the month, with the kVA of every meter at each peak.
+
+    A coincident peak is an interval of the highest summed kVA over all meters. Missing
+    readings count as zero in the sum, as in `aggregate_highest_kva`.
+
+    Parameters:
+        meters (pd.DataFrame): kVA readings indexed by date-time with one column per meter, such
+            as the first result of `merge_meters`.
+        n (int): The number of peaks per month, or per month and period.
+        by_period (bool): Rank the peaks of every time-of-use period separately.
+
+    Returns:
+        pd.DataFrame: One row per peak with 'year', 'month', 'rate' (if by period), 'rank', 'Date',
+        'Total kVA' and the kVA of every meter.
+    """
+    meters = meters[meters.index.notna()]
+    dates = pd.DatetimeIndex(meters.index)
+    total = np.nansum(meters.to_numpy(dtype=np.float64), axis=1)
+
+    # One integer code per (month, period), months counted from the first one
+    month_index = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+    codes = month_index - (month_index.min() if len(dates) else 0)
+    if by_period:
+        rates = add_demand_slots(pd.DataFrame({'Date': dates}))['rate']
+        codes = codes * len(PERIODS) + pd.Categorical(rates, categories=PERIODS).codes
+
+    positions, ranks = top_positions(total, codes, n)
+
+    peaks = pd.DataFrame({'year': dates.year[positions], 'month': dates.month[positions]})
+    if by_period:
+        peaks['rate'] = rates.to_numpy()[positions]
+    peaks['rank'] = ranks
+    peaks['Date'] = dates[positions]
+    peaks['Total kVA'] = total[positions]
+    contributions = meters.iloc[positions].reset_index(drop=True)
+    return pd.concat([peaks, contributions], axis=1)
+
+
+def contribution_shares(peaks):
+    """Returns the share of every meter in the total kVA of each peak of `coincident_peaks`."""
+    columns = [col for col in peaks.columns if col not in PEAK_KEYS + ['rank', 'Date', 'Total kVA']]
+    shares = peaks[columns].fillna(0).div(peaks['Total kVA'].where(peaks['Total kVA'] != 0), axis=0)
+    return pd.concat([peaks.drop(columns=columns), shares], axis=1)
+
+
+class CoincidentDemandAggregator:
+    """
+    Keeps the site kVA of every interval and the coincident peaks of every month, updated from
+    interval data appended one meter at a time.
+
+    Readings are held per billing month, so a batch only touches the months it has data for:
+    their readings are merged, their site sums and peaks recomputed, and only they are written
+    by `save`. Peak queries read the stored monthly peaks, never the intervals. A later reading
+    of a meter replaces an earlier one for the same interval, so corrected data can be sent
+    again. Missing readings count as zero in the site sum.
+
+    :param directory checkpoint directory used by `save` and `load`
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory is not None else None
+        self.meters = []
+        self._readings = {}  # (year, month) -> readings indexed by 'Date', a column per meter
+        self._totals = {}  # (year, month) -> site kVA of every interval
+        self._peaks = {}  # (year, month) -> the coincident peak of the month, a row of `monthly_peaks`
+        self._dirty = set()
+
+    def __len__(self):
+        return sum(len(readings) for readings in self._readings.values())
+
+    def update(self, meter, df, column='KVA'):
+        """
+        Adds a batch of readings of one meter.
+
+        Parameters:
+            meter (str): The meter name.
+            df (pd.DataFrame): Parsed interval data with 'Date' and `column` columns.
+            column (str): The column with the kVA readings.
+        """
+        dates = pd.DatetimeIndex(df['Date']).values
+        values = np.asarray(df[column], dtype=np.float64)
+        dates, values, _ = dedupe_timestamps(dates, values)
+        if not len(dates):
+            return self
+
+        if meter not in self.meters:
+            self.meters.append(meter)
+
+        months = dates.astype('datetime64[M]')
+        bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+        for month_dates, month_values in zip(np.split(dates, bounds), np.split(values, bounds)):
+            first = pd.Timestamp(month_dates[0])
+            self._update_month((first.year, first.month), meter, month_dates, month_values)
+        return self
+
+    def _update_month(self, key, meter, dates, values):
+        batch = pd.Series(values, index=pd.DatetimeIndex(dates, name='Date'))
+        readings = self._readings.get(key)
+        if readings is None:
+            readings = batch.to_frame(meter)
+        else:
+            if meter not in readings:
+                readings[meter] = np.nan
+            new = batch.index.difference(readings.index)
+            if len(new):
+                readings = pd.concat([readings, pd.DataFrame(np.nan, index=new, columns=readings.columns)])
+                readings = readings.sort_index()
+            batch = batch.dropna()  # a missing reading does not replace a known one
+            readings.loc[batch.index, meter] = batch.to_numpy()
+
+        self._set_month(key, readings)
+        self._dirty.add(key)
+
+    def _set_month(self, key, readings):
+        # The site sums and peak of a month are recomputed only when its readings change
+        totals = readings.sum(axis=1).rename('Total kVA')
+        position = int(np.argmax(totals.to_numpy()))
+        self._readings[key] = readings
+        self._totals[key] = totals
+        self._peaks[key] = {'year': key[0], 'month': key[1], 'Date': totals.index[position],
+                            'Total kVA': totals.iloc[position], **readings.iloc[position].to_dict()}
+
+    def site_demand(self):
+        """
+        Returns the site kVA of every interval.
+
+        Returns:
+            pd.Series: The summed kVA of all meters indexed by 'Date'.
+        """
+        if not self._totals:
+            return pd.Series(dtype=np.float64, name='Total kVA', index=pd.DatetimeIndex([], name='Date'))
+        return pd.concat([self._totals[key] for key in sorted(self._totals)])
+
+    def readings(self):
+        """Returns the readings of every interval, a column per meter, for `coincident_peaks`."""
+        frames = [self._readings[key].reindex(columns=self.meters) for key in sorted(self._readings)]
+        if not frames:
+            return pd.DataFrame(columns=self.meters, index=pd.DatetimeIndex([], name='Date'), dtype=np.float64)
+        return pd.concat(frames)
+
+    def monthly_peaks(self):
+        """
+        Returns the coincident peak of every month, the earliest interval if tied.
+
+        Returns:
+            pd.DataFrame: 'year', 'month', 'Date', 'Total kVA' and the kVA of every meter, a row per month.
+        """
+        rows = [self._peaks[key] for key in sorted(self._peaks)]
+        return pd.DataFrame(rows, columns=['year', 'month', 'Date', 'Total kVA'] + self.meters)
+
+    def peak(self):
+        """Returns the all-time coincident peak, the highest of the monthly peaks, the earliest if tied."""
+        if not self._peaks:
+            raise ValueError("No interval data added")
+        highest = None
+        for key in sorted(self._peaks):
+            if highest is None or self._peaks[key]['Total kVA'] > highest['Total kVA']:
+                highest = self._peaks[key]
+        return pd.Series(highest).reindex(['year', 'month', 'Date', 'Total kVA'] + self.meters)
+
+    def save(self, directory=None):
+        """
+        Checkpoints the readings to a directory, one Feather file per month. Only the months
+        changed since the last save or load are written.
+
+        Raises:
+            ImportError: pyarrow is not installed.
+        """
+        _require_pyarrow()
+        directory = Path(directory) if directory is not None else self.directory
+        if directory is None:
+            raise ValueError("No checkpoint directory")
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for key in sorted(self._dirty):
+            readings = self._readings[key].reset_index()
+            _write_atomic(directory / f"{key[0]}-{key[1]:02d}{CHECKPOINT_SUFFIX}", readings.to_feather)
+        meters = json.dumps(self.meters).encode()
+        _write_atomic(directory / CHECKPOINT_METERS, lambda path: Path(path).write_bytes(meters))
+
+        self.directory = directory
+        self._dirty.clear()
+
+    @classmethod
+    def load(cls, directory):
+        """Returns the aggregator checkpointed to a directory by `save`, raises ImportError without pyarrow."""
+        _require_pyarrow()
+        directory = Path(directory)
+        aggregator = cls(directory)
+        aggregator.meters = json.loads((directory / CHECKPOINT_METERS).read_text())
+
+        for path in sorted(directory.glob(f"*{CHECKPOINT_SUFFIX}")):
+            year, month = path.name[:-len(CHECKPOINT_SUFFIX)].split('-')
+            readings = pd.read_feather(path).set_index('Date')
+            aggregator._set_month((int(year), int(month)), readings)
+        return aggregator
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("Coincident demand checkpoints need pyarrow, install the 'cache' extra")
+
+
+def _write_atomic(path, write):
+    """Writes a file through `write(tmp_path)` then renames it, so readers never see a partly written file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+from tariff.aggregates import kw_to_kwh, rolling_max
+from tariff.batch import CHARGE_NAMES
+from tariff.compiled import MONTHLY_CHARGES, compile_tariff
+from tariff.constants import PEAK, ROLLING_DEMAND_MONTHS, STANDARD
+from tariff.holidays import holidays_for
+from tariff.loader import validate_tariff
+from tariff.tariff_maps import tariff_a, tariff_c, tariff_d, tariff_intervals
+from tariff.tou import PERIODS, classify_codes, season_lookup, tou_grid
+
+DEFAULT_TARIFFS = (tariff_a, tariff_c, tariff_d)
+
+
+class ProfileAggregates:
+    """
+    The monthly figures every charge of a tariff is priced from, for one load profile under
+    one time-of-use map.
+
+    :param months month numbers (year * 12 + month - 1) of the billing months, increasing
+    :param seasons season code of every month under the map, see `tariff.tou.SEASONS`
+    :param kwh kWh of every month and period, shaped (month, period)
+    :param kva max kVA of every month and period, shaped (month, period), zero without intervals
+    """
+
+    def __init__(self, months, seasons, kwh, kva):
+        self.months = months
+        self.seasons = seasons
+        self.kwh = kwh
+        self.kva = kva
+        # Demand is measured over the peak and standard periods
+        self.demand = kva[:, [PERIODS.index(PEAK), PERIODS.index(STANDARD)]].max(axis=1)
+        self.rolling_demand = np.array(rolling_max(months.tolist(), self.demand.tolist(), ROLLING_DEMAND_MONTHS))
+
+    @classmethod
+    def from_profile(cls, df, tariff_map, holidays=()):
+        """
+        Aggregates a profile with 'date', 'kw' and 'kva' columns in one pass, kWh over the
+        metering interval of the timestamps.
+
+        Parameters:
+            df (pd.DataFrame): The load profile.
+            tariff_map (dict): A time-of-use map such as `coe_tariff_e_2020_2021`.
+            holidays (list): Dates billed as off peak all day, in addition to Sundays.
+        """
+        df = df[df['date'].notna()]
+        months, month_codes, month_seasons, period_codes = classify_profile(df['date'], tariff_map, holidays)
+        kwh = np.asarray(kw_to_kwh(df['kw'], df['date']), dtype=float)
+        kwh, kva = aggregate_months(len(months), month_codes, period_codes, kwh, df['kva'].to_numpy(dtype=float))
+        return cls(months, month_seasons, kwh, kva)
+
+
+def classify_profile(dates, tariff_map, holidays=()):
+    """
+    Classifies the intervals of a profile into billing months and time-of-use periods.
+
+    Returns:
+        tuple: The month numbers of the billing months (year * 12 + month - 1), the month code of
+        every interval (index into the month numbers), the season code of every month and the
+        period code of every interval.
+    """
+    if not len(dates):
+        raise ValueError("No intervals in the profile")
+
+    dates = pd.DatetimeIndex(dates)
+    season_codes, period_codes = classify_codes(dates, tou_grid(tariff_map),
+                                                season_lookup(tariff_map["high_demand_months"]), holidays)
+    numbers = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+    months, month_codes = np.unique(numbers, return_inverse=True)
+
+    # Months are wholly in one season
+    month_seasons = np.zeros(len(months), dtype=np.int8)
+    month_seasons[month_codes] = season_codes
+    return months, month_codes, month_seasons, period_codes
+
+
+def aggregate_months(n_months, month_codes, period_codes, kwh, kva):
+    """
+    Returns the kWh and max kVA of every month and period, shaped (month, period), kVA zero for
+    months and periods without intervals.
+    """
+    cells = month_codes * len(PERIODS) + period_codes
+    size = n_months * len(PERIODS)
+    kwh = np.bincount(cells, weights=kwh, minlength=size)
+    highest = np.full(size, -np.inf)
+    np.maximum.at(highest, cells, np.where(np.isnan(kva), -np.inf, kva))
+    kva = np.where(np.isneginf(highest), 0, highest)
+    return kwh.reshape(n_months, len(PERIODS)), kva.reshape(n_months, len(PERIODS))
+
+
+def price_tariff(aggregates, tariff, voltage_type):
+    """
+    Prices the charges of a tariff and voltage type from profile aggregates, as
+    `TariffCalculator.calculate_tariff` would bill the profile.
+
+    Returns:
+        dict: The total of every charge by name.
+    """
+    compiled = compile_tariff(tariff)
+    v = compiled.voltage_code(voltage_type)
+    n_months = len(aggregates.months)
+
+    totals = {}
+    for name in compiled.charges:
+        if name in MONTHLY_CHARGES:
+            total = compiled.fixed_rates[v, MONTHLY_CHARGES.index(name)] * n_months
+        elif name == "demand_charge":
+            rates = compiled.demand_rates[v, compiled.season_of_month[aggregates.months % 12 + 1]]
+            total = rates @ aggregates.demand
+        elif name == "network_access_charge":
+            total = compiled.nac_rates[v] * aggregates.rolling_demand[-1]
+        elif name == "energy_charge":
+            total = (aggregates.kwh * compiled.energy_rates[v, aggregates.seasons]).sum()
+        else:
+            raise ValueError(f"Charge {name} of {tariff['code']} cannot be compared")
+        totals[CHARGE_NAMES[name]] = float(total)
+    return totals
+
+
+def compare_tariffs(df, tariffs=DEFAULT_TARIFFS, holidays=None):
+    """
+    Prices one load profile on every tariff and each of its meter voltage types, cheapest first.
+
+    The profile is aggregated once per time-of-use map, each candidate is then priced from the
+    monthly aggregates alone.
+
+    Parameters:
+        df (pd.DataFrame): The load profile, with 'date', 'kw' and 'kva' columns.
+        tariffs (list): The candidate tariffs.
+        holidays (list): Dates billed as off peak all day, in addition to Sundays. The South African
+            public holidays of the years of the data if None.
+
+    Returns:
+        pd.DataFrame: A row per tariff and voltage type with the total of every charge, 'total',
+        'vat_amount', 'total_incl_vat' and 'rank'.
+    """
+    if holidays is None:
+        holidays = holidays_for(df['date'])
+    aggregates = {}
+    rows = []
+    for tariff in tariffs:
+        validate_tariff(tariff)
+        tariff_map = tariff["tariff_map"] or tariff_intervals
+        if id(tariff_map) not in aggregates:
+            aggregates[id(tariff_map)] = ProfileAggregates.from_profile(df, tariff_map, holidays)
+
+        for voltage_type in tariff["meter_voltage_types"]:
+            charges = price_tariff(aggregates[id(tariff_map)], tariff, voltage_type)
+            total = sum(charges.values())
+            vat_amount = total * tariff["vat_rate"]
+            rows.append({
+                'tariff': tariff["code"],
+                'voltage_type': voltage_type,
+                **charges,
+                'total': total,
+                'vat_amount': vat_amount,
+                'total_incl_vat': total + vat_amount,
+            })
+
+    table = pd.DataFrame(rows).fillna({name: 0.0 for name in CHARGE_NAMES.values()})
+    table = table.sort_values('total', kind='stable', ignore_index=True)
+    table['rank'] = np.arange(1, len(table) + 1)
+    return table
@@ -0,0 +1,105 @@
+import numpy as np
+
+from tariff.loader import tariff_hash
+from tariff.tariff_maps import tariff_intervals
+from tariff.tou import PERIODS, SEASONS, classify_codes, season_lookup, tou_grid
+
+# Charges billed at a flat amount per month, the columns of `CompiledTariff.fixed_rates`
+MONTHLY_CHARGES = ('fixed_charge', 'internet_based_consumption_display')
+
+# Compiled tariffs by content hash, see `tariff.loader.tariff_hash`
+_compiled = {}
+
+
+class CompiledTariff:
+    """
+    A tariff dict compiled into read-only arrays, so billing and classification index arrays
+    instead of walking the nested dicts. Rates a voltage type has no entry for are NaN.
+
+    :param code tariff code
+    :param vat_rate VAT rate of the tariff
+    :param voltage_types the meter voltage types, their position is the voltage code
+    :param charges names of the charges of the tariff, in billing order
+    :param periods period grid shaped (season, weekday, half-hour slot), see `tariff.tou.build_tou_grid`
+    :param tou_seasons season code of every month number for classification, from the tariff map
+    :param season_of_month season code of every month number for the demand charge, from the tariff
+    :param energy_rates energy rates shaped (voltage, season, period)
+    :param demand_rates demand rates shaped (voltage, season)
+    :param nac_rates network access rates shaped (voltage,)
+    :param fixed_rates monthly rates shaped (voltage, MONTHLY_CHARGES)
+    """
+
+    __slots__ = (
+        'code', 'vat_rate', 'voltage_types', 'charges', 'periods', 'tou_seasons', 'season_of_month',
+        'energy_rates', 'demand_rates', 'nac_rates', 'fixed_rates', '_voltage_codes',
+    )
+
+    def __init__(self, tariff):
+        tariff_map = tariff["tariff_map"] or tariff_intervals
+        voltage_types = tuple(tariff["meter_voltage_types"])
+        charges = {charge["name"]: charge["types"] for charge in tariff["charges"]}
+
+        energy = np.full((len(voltage_types), len(SEASONS), len(PERIODS)), np.nan)
+        demand = np.full((len(voltage_types), len(SEASONS)), np.nan)
+        nac = np.full(len(voltage_types), np.nan)
+        fixed = np.full((len(voltage_types), len(MONTHLY_CHARGES)), np.nan)
+        for v, voltage in enumerate(voltage_types):
+            for s, season in enumerate(SEASONS):
+                rates = charges.get("energy_charge", {}).get(season, {}).get(voltage, {})
+                energy[v, s] = [rates.get(period, np.nan) for period in PERIODS]
+                demand[v, s] = charges.get("demand_charge", {}).get(season, {}).get(voltage, np.nan)
+            nac[v] = charges.get("network_access_charge", {}).get(voltage, np.nan)
+            fixed[v] = [charges.get(name, {}).get(voltage, np.nan) for name in MONTHLY_CHARGES]
+
+        values = {
+            'code': tariff["code"],
+            'vat_rate': tariff["vat_rate"],
+            'voltage_types': voltage_types,
+            'charges': tuple(charges),
+            'periods': tou_grid(tariff_map),
+            'tou_seasons': season_lookup(tariff_map["high_demand_months"]),
+            'season_of_month': season_lookup(tariff["high_demand_months"]),
+            'energy_rates': energy,
+            'demand_rates': demand,
+            'nac_rates': nac,
+            'fixed_rates': fixed,
+            '_voltage_codes': {voltage: v for v, voltage in enumerate(voltage_types)},
+        }
+        for name, value in values.items():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.code!r})"
+
+    def voltage_code(self, voltage_type):
+        """Returns the position of a voltage type, raises KeyError if the tariff has no such type."""
+        try:
+            return self._voltage_codes[voltage_type]
+        except KeyError:
+            raise KeyError(f"{self.code} has no voltage type {voltage_type}") from None
+
+    def classify(self, dates, holidays=()):
+        """Returns the season and period codes of timestamps under the tariff map, see `tariff.tou.classify_codes`."""
+        return classify_codes(dates, self.periods, self.tou_seasons, holidays)
+
+
+def compile_tariff(tariff):
+    """
+    Returns the compiled tariff of a tariff dict, compiled once per content. A tariff changed
+    after it was compiled, even under the same code, is compiled again.
+    """
+    key = tariff_hash(tariff)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = CompiledTariff(tariff)
+    return compiled
+
+
+def clear_compiled():
+    """Drops the compiled tariffs, to free the arrays of tariffs no longer billed."""
+    _compiled.clear()
@@ -68,6 +68,7 @@ ELS_F = "els"
 
 # dateformats
 DAYFIRST = "dayfirst"
+MONTHFIRST = "monthfirst"
 YEARFIRST = "yearfirst"
 
 # header identifier for file formats
@@ -115,6 +116,18 @@ KVARH = "kvarh"
 KVARH_M = "kvarh-"
 KVARH_P = "kvarh+"
 
+# Length of a metering interval when the timestamps do not tell, meter data is half-hourly
+DEFAULT_INTERVAL_HOURS = 0.5
+
+# The network access charge is billed on the highest demand of this many months
+ROLLING_DEMAND_MONTHS = 12
+
+# Exact billing keeps amounts as int64 milli-cents and bills line items in whole cents
+MILLI_CENTS_PER_RAND = 100_000
+MILLI_CENTS_PER_CENT = 1_000
+# Interval kWh and kVA are priced in whole Wh and VA in exact billing
+UNITS_PER_KILO = 1_000
+
 # Tariffs
 PEAK = "peak"
 OFF_PEAK = "off_peak"
@@ -1,13 +1,47 @@
-from datetime import datetime
-import pandas as pd
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from importlib.util import find_spec
+from io import BytesIO, StringIO
 
-from io import BytesIO
+import numpy as np
+import openpyxl
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
 
-from tariff.constants import HIGH_DEMAND, LOW_DEMAND
+from tariff.constants import COMMA, CSV, DAYFIRST, MONTHFIRST, SEMICOLON, XLS, XLSX, YEARFIRST
+from tariff.holidays import holidays_for
 from tariff.tariff_maps import coe_tariff_e_2020_2021
+from tariff.tou import PERIODS, SEASONS, classify_tou
+from tariff.merge import merge_meters
+from tariff.parse_cache import ParseCache
+from tariff.workbook import DEFAULT_FILE_PATH, content_hash, read_file_bytes, resolve_sheet_name, workbook_cache
 
 OFF_PEAK = "off_peak"
 
+# CSV files are read with pyarrow when it is installed
+CSV_ENGINE = 'pyarrow' if find_spec('pyarrow') else 'c'
+# Separator, decimal mark and date order are sniffed from the start of the file
+SNIFF_BYTES = 64 * 1024
+# Text date fields: first, date separator, second, third, date-time separator, hour:minute, seconds
+DATE_PATTERN = r'^\s*(\d{1,4})([/.-])(\d{1,2})[/.-](\d{1,4})(?:([ T])(\d{1,2}:\d{2})(:\d{2})?)?\s*$'
+
+# Bump when a parsing change changes the parsed frames, so cached frames are parsed again
+PARSER_VERSION = 2
+parse_cache = ParseCache(version=PARSER_VERSION)
+
+# Executors of parse_sheets
+PROCESS = 'process'
+THREAD = 'thread'
+
+# Columns holding meter readings, scaled by the multiplier
+NUMERIC_COLUMNS = ['KW', 'KVAR', 'KVA']
+# Format of text dates in the 'Date' column
+DATE_FORMAT = '%d/%m/%Y %H:%M'
+
+logger = logging.getLogger(__name__)
+
 
 def add_demand_slots(df):
     """
@@ -22,30 +56,23 @@ def add_demand_slots(df):
     # Extract month from the 'Date' column
     df['month'] = df['Date'].dt.month
     
-    # Determine the season (high_demand or low_demand) based on the month
-    df['season'] = df['month'].apply(
-        lambda x: HIGH_DEMAND if x in coe_tariff_e_2020_2021["high_demand_months"] else LOW_DEMAND)
+    # Determine the season (high_demand or low_demand) and the rate (off_peak, peak, or standard)
+    # with one table lookup per row, rows without a date are left unclassified. Public holidays
+    # of the years of the data are off peak all day, as Sundays.
+    valid = df['Date'].notna().to_numpy()
+    season = np.full(len(df), np.nan, dtype=object)
+    rate = np.full(len(df), np.nan, dtype=object)
+    season[valid], rate[valid] = classify_tou(df['Date'][valid], coe_tariff_e_2020_2021,
+                                              holidays_for(df['Date'][valid]))
     
-    # Holidays and their treatment
-    default_holidays = [datetime.strptime(f"{datetime.now().year}-06-16", "%Y-%m-%d").date(),
-                        datetime.strptime(f"{datetime.now().year}-08-09", "%Y-%m-%d").date()]
-    
-    # Determine the rate (off_peak, peak, or standard) based on the season and hour
-    def get_rate(row):
-        date_time = row['Date']
-        if date_time.date() in default_holidays or date_time.weekday() == 6:
-            return OFF_PEAK
-        
-        hour = date_time.hour
-        season = row['season']
-        return coe_tariff_e_2020_2021[season][hour][0]
-    
-    df['rate'] = df.apply(get_rate, axis=1)
+    df['season'] = season
+    df['rate'] = rate
     
     return df
 
 
-def aggregate_highest_kva(file_obj=None, sheet_range=(0, 6), multiplier=200000):
+def aggregate_highest_kva(file_obj=None, sheet_range=(0, 6), multiplier=200000, report=None, executor=None,
+                          max_workers=None):
     """
     Aggregates the highest total kVA across all meters for each sheet and returns the original values.
 
@@ -53,20 +80,21 @@ def aggregate_highest_kva(file_obj=None, sheet_range=(0, 6), multiplier=200000):
         file_obj (file object): The file object of the Excel file.
         sheet_range (tuple): The range of sheet numbers to consider.
         multiplier (int): The multiplier for kVA.
+        report (ParseReport): Collects parse errors and sheets that failed, errors are logged if None.
+        executor (str or Executor): PROCESS, THREAD or an executor to parse sheets concurrently.
+        max_workers (int): The number of parallel workers, the number of CPUs if None.
 
     Returns:
         pd.DataFrame: The aggregated DataFrame containing the row with the highest total kVA.
     """
     dfs = []  # List to hold individual DataFrames
 
-    for i in range(sheet_range[0], sheet_range[1] + 1):
-        try:
-            df = read_and_parse_excel(file_obj, sheet_name=i, multiplier=1)  # Note the multiplier is set to 1
-            df['Meter'] = f'Mtr{i+1}'
-            df.rename(columns={'KVA': 'KVA_value'}, inplace=True)
-            dfs.append(df)
-        except Exception as e:
-            print("error", e)
+    sheets = range(sheet_range[0], sheet_range[1] + 1)
+    # Note the multiplier is set to 1
+    for i, df in parse_sheets(file_obj, sheets, multiplier=1, report=report, executor=executor, max_workers=max_workers):
+        df['Meter'] = f'Mtr{i+1}'
+        df.rename(columns={'KVA': 'KVA_value'}, inplace=True)
+        dfs.append(df)
 
     # Concatenate all DataFrames
     master_df = pd.concat(dfs, ignore_index=True)
@@ -92,35 +120,45 @@ def aggregate_highest_kva(file_obj=None, sheet_range=(0, 6), multiplier=200000):
     return highest_kva_df
 
 
-def concate_all_sheets(file_obj=None, sheet_range=(0, 5), multiplier=200000):
-    col_dfs = []  # List to hold individual columns
-    
-    for i in range(sheet_range[0], sheet_range[1] + 1):
-        try:
-            df = read_and_parse_excel(file_obj, sheet_name=i, multiplier=1)  # Note the multiplier is set to 1
-            meter_name = f'Mtr{i + 1}'
-            df.rename(columns={'KVA': 'KVA_value'}, inplace=True)
-            
-            # Take just the 'Date' and 'KVA_value' columns and rename 'KVA_value' to include the meter name
-            col_df = df[['Date', 'KVA_value']].copy()
-            col_df.rename(columns={'KVA_value': f'KVA_value_{meter_name}'}, inplace=True)
-            col_dfs.append(col_df)
-        except Exception as e:
-            print("error", e)
-    
-    # Concatenate all DataFrames by 'Date'
-    master_df = pd.concat(col_dfs, ignore_index=True)
-    
-    # Convert 'Date' to datetime and set as index
-    master_df['Date'] = pd.to_datetime(master_df['Date'])
-    master_df.set_index('Date', inplace=True)
-    
-    # Merge all columns based on 'Date'
-    master_df = master_df.groupby('Date').first()
-    
+def concate_all_sheets(file_obj=None, sheet_range=(0, 5), multiplier=200000, report=None, executor=None,
+                       max_workers=None, sheets=None, meter_names=None):
+    """
+    Lines up the kVA of every meter, one sheet per meter, and sums it per timestamp.
+
+    Parameters:
+        file_obj (file object): The file object of the Excel file.
+        sheet_range (tuple): The first and last sheet index, used if `sheets` is None.
+        multiplier (int): The multiplier for the summed kVA.
+        report (ParseReport): Collects parse errors, duplicate and missing timestamps, they are logged if None.
+        executor (str or Executor): PROCESS, THREAD or an executor to parse sheets concurrently.
+        max_workers (int): The number of parallel workers, the number of CPUs if None.
+        sheets (list): The names or indexes of the meter sheets, any number of them.
+        meter_names (dict): Meter names by sheet, 'Mtr{index + 1}' or the sheet name if missing.
+
+    Returns:
+        pd.DataFrame: A 'KVA_value_{meter}' column per meter, 'Sum_KVA_value' and
+        'Sum_KVA_value_x200000', indexed by 'Date'.
+    """
+    merge_report = ParseReport() if report is None else report
+    if sheets is None:
+        sheets = range(sheet_range[0], sheet_range[1] + 1)
+    meter_names = meter_names or {}
+
+    meters = {}
+    # Note the multiplier is set to 1
+    for sheet, df in parse_sheets(file_obj, sheets, multiplier=1, report=report, executor=executor,
+                                  max_workers=max_workers):
+        name = meter_names.get(sheet, f'Mtr{sheet + 1}' if isinstance(sheet, int) else sheet)
+        meters[name] = df
+
+    # Merge all meters based on 'Date'
+    master_df, _ = merge_meters(meters, column='KVA', report=merge_report)
+    master_df.columns = [f'KVA_value_{name}' for name in master_df.columns]
+    if report is None and merge_report.errors:
+        logger.warning(merge_report.summary())
+
     # Sum up all KVA_value columns
-    kva_cols = [col for col in master_df.columns if 'KVA_value_' in col]
-    master_df['Sum_KVA_value'] = master_df[kva_cols].sum(axis=1)
+    master_df['Sum_KVA_value'] = master_df.sum(axis=1)
     
     # Multiply the summed up column by 200000
     master_df['Sum_KVA_value_x200000'] = master_df['Sum_KVA_value'] * multiplier
@@ -137,36 +175,625 @@ def max_kva(df):
     return max_row
 
 
-def read_and_parse_excel(file_obj=None, sheet_name=0, multiplier=200000):
+def read_and_parse_excel(file_obj=None, sheet_name=0, multiplier=200000, report=None, use_cache=True, compact=False,
+                         float32=False):
     """
     Reads an Excel file from a file object and parses the table data into a DataFrame.
 
+    The workbook is read once and cached by the content of the file, so repeated calls for
+    other sheets of the same file do not open it again. When the on-disk `parse_cache` is
+    configured, parsed sheets are also kept in it, so later runs load them without parsing
+    the workbook.
+
     Parameters:
         file_obj (file object): The file object of the Excel file.
         sheet_name (str or int): The name or index of the sheet to read. Default is 0 (first sheet).
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+        use_cache (bool): Read and write the on-disk cache of parsed sheets.
+        compact (bool): Store the labels as categoricals, see `compact_dtypes`.
+        float32 (bool): Also store the meter readings as float32, implies `compact`.
 
     Returns:
         pd.DataFrame: The parsed DataFrame.
     """
-    
-    if file_obj is None:
-        with open('./ncp-data.xlsx', 'rb') as f:
-            file_obj = f
-    # Read the Excel file into a DataFrame, using the first column as the index
-            df = pd.read_excel(BytesIO(file_obj.read()), sheet_name=sheet_name, index_col=0, engine='openpyxl')
+    sheet_report = ParseReport() if report is None else report
+    df, _ = parse_excel_bytes(read_file_bytes(file_obj), sheet_name, multiplier, use_cache=use_cache,
+                              report=sheet_report)
+
+    if report is None and sheet_report.errors:
+        logger.warning(sheet_report.summary())
+
+    return compact_dtypes(df, float32=float32) if compact or float32 else df
+
+
+def parse_excel_bytes(data, sheet_name=0, multiplier=200000, use_cache=True, source_hash=None, sheet_title=None,
+                      report=None):
+    """
+    Parses one sheet of an Excel file, going through the on-disk and workbook caches.
+
+    Without `sheet_title` the whole workbook is loaded into the shared workbook cache. With
+    the title of the sheet given only that sheet is read, which is how parallel workers read.
+
+    Parameters:
+        data (bytes): The content of the Excel file.
+        sheet_name (str or int): The name or index of the sheet to read.
+        multiplier (int): The multiplier for the energy values.
+        use_cache (bool): Read and write the on-disk cache of parsed sheets.
+        source_hash (str): The content hash of `data`, if already known.
+        sheet_title (str): The name of the sheet, to read it alone.
+        report (ParseReport): Collects parse errors and stage timings, a report of the sheet is made if None.
+
+    Returns:
+        tuple: The parsed DataFrame and the ParseReport the sheet was recorded in.
+    """
+    sheet_report = ParseReport() if report is None else report
+
+    start = time.perf_counter()
+    source_hash = source_hash or content_hash(data)
+
+    use_cache = use_cache and parse_cache.enabled
+    cache_key = parse_cache.key(source_hash, sheet_name, multiplier)
+    cached = parse_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        df, errors = cached
+        sheet_report.errors.extend(errors)
+        sheet_report.add_timing("read_cache", time.perf_counter() - start)
+        return df, sheet_report
+
+    if sheet_title is None:
+        workbook = workbook_cache.load_bytes(data, key=source_hash)
+        df = workbook.sheet(sheet_name)
+        sheet_title = workbook.sheet_name(sheet_name)
     else:
-        df = pd.read_excel(BytesIO(file_obj.read()), sheet_name=sheet_name, index_col=0, engine='openpyxl')
-    
-    # Replace commas with dots in the numeric columns to ensure they are read as floats
-    numeric_columns = ['KW', 'KVAR', 'KVA']
-    for col in numeric_columns:
+        df = pd.read_excel(BytesIO(data), sheet_name=sheet_title, index_col=0, engine='openpyxl')
+    sheet_report.add_timing("read", time.perf_counter() - start)
+
+    df = parse_sheet(df, multiplier=multiplier, report=sheet_report, sheet=sheet_title)
+    if use_cache:
+        parse_cache.put(cache_key, df, sheet_report.errors)
+
+    return df, sheet_report
+
+
+def parse_sheets(file_obj=None, sheets=(0,), multiplier=200000, report=None, executor=None, max_workers=None,
+                 use_cache=True):
+    """
+    Parses several sheets of an Excel file, one meter per sheet.
+
+    Sheets are parsed one after another unless an executor is given: PROCESS for a process
+    pool, THREAD for a thread pool, or any `concurrent.futures.Executor`. Pools made here use
+    `max_workers` workers and each worker reads only its own sheet.
+
+    A sheet that fails is recorded in the report and left out of the result.
+
+    Parameters:
+        file_obj (file object): The file object of the Excel file.
+        sheets (list): The names or indexes of the sheets to read.
+        multiplier (int): The multiplier for the energy values.
+        report (ParseReport): Collects parse errors, failed sheets and stage timings, errors are logged if None.
+        executor (str or Executor): PROCESS, THREAD or an executor to parse sheets concurrently.
+        max_workers (int): The number of workers of a pool made here, the number of CPUs if None.
+        use_cache (bool): Read and write the on-disk cache of parsed sheets.
+
+    Returns:
+        list: (sheet, pd.DataFrame) pairs of the parsed sheets, in the order of `sheets`.
+
+    Raises:
+        ValueError: The executor is a string other than PROCESS or THREAD.
+    """
+    if isinstance(executor, str) and executor not in (PROCESS, THREAD):
+        raise ValueError(f"Unknown executor {executor!r}, use {PROCESS!r}, {THREAD!r} or an Executor")
+
+    sheets_report = ParseReport() if report is None else report
+    data = read_file_bytes(file_obj)
+    source_hash = content_hash(data)
+    with pd.ExcelFile(BytesIO(data), engine='openpyxl') as excel_file:
+        sheet_names = excel_file.sheet_names
+
+    pool = executor
+    if executor == PROCESS:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    elif executor == THREAD:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        jobs = []
+        for sheet in sheets:
+            try:
+                title = resolve_sheet_name(sheet_names, sheet)
+            except (IndexError, KeyError) as e:
+                jobs.append((sheet, None, e))
+                continue
+
+            if pool is None:
+                job = partial(parse_excel_bytes, data, sheet, multiplier, use_cache, source_hash)
+            else:
+                job = pool.submit(parse_excel_bytes, data, sheet, multiplier, use_cache, source_hash, title)
+            jobs.append((sheet, title, job))
+
+        results = []
+        for sheet, title, job in jobs:
+            try:
+                if isinstance(job, Exception):
+                    raise job
+                df, sheet_report = job() if pool is None else job.result()
+            except Exception as e:
+                sheets_report.add(None, message=f"sheet not parsed: {e}", sheet=title or sheet)
+                continue
+            sheets_report.extend(sheet_report)
+            results.append((sheet, df))
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+
+    if report is None and sheets_report.errors:
+        logger.warning(sheets_report.summary())
+
+    return results
+
+
+def read_and_parse_file(file_obj=None, sheet_name=0, multiplier=200000, report=None, compact=False,
+                        float32=False):
+    """
+    Reads and parses an uploaded CSV or Excel file, based on its file name.
+
+    Parameters:
+        file_obj (file object): The uploaded file, the default Excel file is used if None.
+        sheet_name (str or int): The sheet to read from an Excel file.
+        multiplier (int): The multiplier for the energy values.
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+        compact (bool): Store the labels as categoricals, see `compact_dtypes`.
+        float32 (bool): Also store the meter readings as float32, implies `compact`.
+
+    Returns:
+        pd.DataFrame: The parsed DataFrame.
+    """
+    if file_obj is not None and file_type(file_obj) == CSV:
+        return read_and_parse_csv(file_obj, multiplier=multiplier, report=report, compact=compact, float32=float32)
+    return read_and_parse_excel(file_obj, sheet_name=sheet_name, multiplier=multiplier, report=report,
+                                compact=compact, float32=float32)
+
+
+def file_type(file_obj):
+    """Returns CSV, XLSX or XLS from the file name extension, XLSX if there is no name."""
+    name = str(getattr(file_obj, 'name', '')).lower()
+    for extension in (CSV, XLSX, XLS):
+        if name.endswith(f".{extension}"):
+            return extension
+    return XLSX
+
+
+def read_and_parse_csv(file_obj, multiplier=200000, sep=None, date_order=None, report=None, compact=False,
+                       float32=False):
+    """
+    Reads a CSV file into the same parsed DataFrame as `read_and_parse_excel`.
+
+    The separator, decimal mark and date order are sniffed from the start of the file unless
+    given. The file is then read with the pyarrow engine when it is installed, with float
+    columns and a fixed date format.
+
+    Parameters:
+        file_obj (file object): The file object of the CSV file.
+        multiplier (int): The multiplier for the energy values.
+        sep (str): SEMICOLON or COMMA, sniffed if None.
+        date_order (str): DAYFIRST, MONTHFIRST or YEARFIRST, sniffed if None.
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+        compact (bool): Store the labels as categoricals, see `compact_dtypes`.
+        float32 (bool): Also store the meter readings as float32, implies `compact`.
+
+    Returns:
+        pd.DataFrame: The parsed DataFrame.
+    """
+    sheet_report = ParseReport() if report is None else report
+
+    start = time.perf_counter()
+    data = read_file_bytes(file_obj)
+    sample = data[:SNIFF_BYTES].decode('utf-8-sig', errors='replace')
+    if len(data) > SNIFF_BYTES:
+        sample = sample[:sample.rfind('\n') + 1]  # drop the cut-off last line
+
+    sep = sep or sniff_separator(sample)
+    head = pd.read_csv(StringIO(sample), sep=sep, dtype=str)
+    # A blank first header is an index column, as written by DataFrame.to_csv
+    index_col = 0 if str(head.columns[0]).startswith('Unnamed') else None
+    numeric_columns = [col for col in NUMERIC_COLUMNS if col in head]
+
+    decimal = '.'
+    if sep == SEMICOLON and any(head[col].str.contains(',', regex=False).any() for col in numeric_columns):
+        decimal = ','
+
+    if 'Date' in head:
+        date_order = date_order or sniff_date_order(head['Date'].dropna())
+        date_format = sniff_date_format(head['Date'].dropna(), date_order)
+    else:
+        date_format = None
+
+    options = dict(sep=sep, decimal=decimal, index_col=index_col, engine=CSV_ENGINE)
+    try:
+        df = pd.read_csv(BytesIO(data), dtype={'Date': str, **{col: 'float64' for col in numeric_columns}}, **options)
+    except ValueError:
+        # Thousands separators or bad cells, read the numbers as text and let clean_numerics report them
+        df = pd.read_csv(BytesIO(data), dtype={'Date': str, **{col: str for col in numeric_columns}}, **options)
+    if index_col is not None:
+        df.index.name = None
+    sheet_report.add_timing("read", time.perf_counter() - start)
+
+    df = parse_sheet(df, multiplier=multiplier, report=sheet_report, date_format=date_format,
+                     date_order=date_order or DAYFIRST)
+    if report is None and sheet_report.errors:
+        logger.warning(sheet_report.summary())
+    return compact_dtypes(df, float32=float32) if compact or float32 else df
+
+
+def sniff_separator(sample):
+    """Returns SEMICOLON if the header line uses semicolons, COMMA otherwise."""
+    header = sample.split('\n', 1)[0]
+    return SEMICOLON if header.count(SEMICOLON) > header.count(COMMA) else COMMA
+
+
+def sniff_date_order(dates):
+    """
+    Returns the date order of text dates: YEARFIRST when they start with a four digit year,
+    DAYFIRST or MONTHFIRST when a field is over 12. When every field is 12 or less the field
+    with more distinct values is taken as the day, as interval data changes day before month.
+    """
+    parts = dates.str.extract(DATE_PATTERN)
+    if parts.empty or parts[0].isna().all():
+        return DAYFIRST
+
+    if (parts[0].str.len() == 4).any():
+        return YEARFIRST
+    first = pd.to_numeric(parts[0], errors='coerce')
+    second = pd.to_numeric(parts[2], errors='coerce')
+    if (first > 12).any():
+        return DAYFIRST
+    if (second > 12).any():
+        return MONTHFIRST
+    return MONTHFIRST if second.nunique() > first.nunique() else DAYFIRST
+
+
+def sniff_date_format(dates, date_order):
+    """
+    Returns the strptime format shared by all the text dates, or None if they differ.
+
+    Parameters:
+        dates (pd.Series): Sample dates, such as "01/07/2023 00:30".
+        date_order (str): DAYFIRST, MONTHFIRST or YEARFIRST.
+
+    Returns:
+        str: The date format.
+    """
+    parts = dates.str.extract(DATE_PATTERN)
+    if parts.empty or parts.isna()[[0, 1, 2, 3]].any().any():
+        return None
+
+    def shape(values):
+        values = values.unique()
+        return values[0] if len(values) == 1 else None
+
+    date_sep, time_sep, seconds = shape(parts[1]), shape(parts[4].fillna('')), shape(parts[6].notna())
+    if date_sep is None or time_sep is None or seconds is None:
+        return None
+
+    year = '%Y' if (parts[0 if date_order == YEARFIRST else 3].str.len() == 4).all() else '%y'
+    fields = {
+        DAYFIRST: ['%d', '%m', year],
+        MONTHFIRST: ['%m', '%d', year],
+        YEARFIRST: [year, '%m', '%d'],
+    }[date_order]
+
+    date_format = date_sep.join(fields)
+    if time_sep:
+        date_format += f"{time_sep}%H:%M" + (":%S" if seconds else "")
+    return date_format
+
+
+def iter_excel_chunks(file_obj=None, sheet_name=0, chunksize=50000, multiplier=200000, report=None):
+    """
+    Reads a sheet in chunks of rows and yields each chunk parsed like `read_and_parse_excel`.
+
+    The workbook is opened in openpyxl read-only mode and rows are read one at a time, so
+    only one chunk is held in memory. Use this for workbooks too large to load at once.
+
+    Parameters:
+        file_obj (file object): The file object of the Excel file, the default file is used if None.
+        sheet_name (str or int): The name or index of the sheet to read. Default is 0 (first sheet).
+        chunksize (int): The number of rows per chunk.
+        multiplier (int): The multiplier for the energy values.
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+
+    Yields:
+        pd.DataFrame: The parsed rows, indexed by the first column of the sheet.
+    """
+    if file_obj is None:
+        file_obj = DEFAULT_FILE_PATH
+    elif hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+
+    workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_name, int):
+            worksheet = workbook.worksheets[sheet_name]
+        else:
+            worksheet = workbook[sheet_name]
+
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Same column and index names as pd.read_excel, the first column is the index
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)][1:]
+        index_name = header[0]
+
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) == chunksize:
+                yield _parse_chunk(chunk, columns, index_name, multiplier, report, worksheet.title)
+                chunk = []
+
+        if chunk:
+            yield _parse_chunk(chunk, columns, index_name, multiplier, report, worksheet.title)
+    finally:
+        workbook.close()
+
+
+def _parse_chunk(rows, columns, index_name, multiplier, report, sheet):
+    index = pd.Index([row[0] for row in rows], name=index_name)
+    df = pd.DataFrame([row[1:len(columns) + 1] for row in rows], index=index, columns=columns)
+    return parse_sheet(df, multiplier=multiplier, report=report, sheet=sheet)
+
+
+def parse_sheet(df, multiplier=200000, report=None, sheet=None, date_format=DATE_FORMAT, date_order=DAYFIRST):
+    """
+    Parses the raw data of one sheet.
+
+    The sheet goes through the parse stages in order: clean numerics, clean text, parse
+    timestamps, apply multiplier and classify time of use. Each stage runs once and its time is added
+    to the report.
+
+    Parameters:
+        df (pd.DataFrame): The sheet as read from the Excel file.
+        multiplier (int): The multiplier for the energy values.
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+        sheet (str): The sheet name used in the report.
+        date_format (str): The format of text dates, inferred if None.
+        date_order (str): The date order used when the format is inferred.
+
+    Returns:
+        pd.DataFrame: The parsed DataFrame.
+    """
+    sheet_report = ParseReport() if report is None else report
+
+    stages = [
+        ("clean_numerics", lambda frame: clean_numerics(frame, report=sheet_report, sheet=sheet)),
+        ("clean_text", clean_text),
+        ("parse_timestamps", lambda frame: parse_timestamps(frame, date_format, date_order)),
+        ("apply_multiplier", lambda frame: apply_multiplier(frame, multiplier)),
+        ("classify_tou", add_demand_slots),
+    ]
+    df = run_stages(df, stages, sheet_report, sheet=sheet)
+
+    if report is None and sheet_report.errors:
+        logger.warning(sheet_report.summary())
+
+    return df
+
+
+def run_stages(df, stages, report, sheet=None):
+    """
+    Runs the parse stages in order, timing each one.
+
+    A stage that fails is recorded in the report and the remaining stages still run, so the
+    columns that could be parsed are kept.
+
+    Parameters:
+        df (pd.DataFrame): The frame to parse.
+        stages (list): (name, function) pairs, each function takes and returns the frame.
+        report (ParseReport): Collects parse errors and stage timings.
+        sheet (str): The sheet name used in the report.
+
+    Returns:
+        pd.DataFrame: The parsed DataFrame.
+    """
+    for name, stage in stages:
+        start = time.perf_counter()
         try:
-            df[col] = df[col].apply(lambda x: float(str(x).replace(',', '.'))  if pd.notnull(x) else x)
-            df[col] = df[col] * multiplier
-            # Convert the 'HEX' column to datetime format (the name seems to be 'HEX' based on your sample data)
-            df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y %H:%M')
-            df = add_demand_slots(df)
+            df = stage(df)
         except Exception as e:
-            print("error", e)
-    
+            report.add(None, message=f"{name}: {e}", sheet=sheet)
+        report.add_timing(name, time.perf_counter() - start)
+
+    return df
+
+
+def clean_numerics(df, report=None, sheet=None):
+    """Reads the numeric columns as floats, accepting decimal commas and thousands separators."""
+    for col in NUMERIC_COLUMNS:
+        if col not in df:
+            if report is not None:
+                report.add(col, message="column not found", sheet=sheet)
+            continue
+        df[col] = to_numeric_column(df[col], report=report, sheet=sheet)
+    return df
+
+
+def clean_text(df):
+    """
+    Stores columns of mixed numbers and text as text, such as the HEX status word where
+    Excel reads "008000C4" as text and "00800000" as the number 800000.
+    """
+    for col in df.columns:
+        if df[col].dtype == object and infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
     return df
+
+
+def parse_timestamps(df, date_format=DATE_FORMAT, date_order=DAYFIRST):
+    """
+    Converts the 'Date' column to datetime, unless the reader already did.
+
+    Dates are parsed with `date_format` when it is given, and by inferring the format in the
+    `date_order` (DAYFIRST, MONTHFIRST or YEARFIRST) otherwise.
+    """
+    if is_datetime64_any_dtype(df['Date']):
+        return df
+
+    if date_format is not None:
+        df['Date'] = pd.to_datetime(df['Date'], format=date_format)
+    else:
+        df['Date'] = pd.to_datetime(df['Date'], dayfirst=date_order == DAYFIRST, yearfirst=date_order == YEARFIRST)
+    return df
+
+
+def apply_multiplier(df, multiplier):
+    """Scales the numeric columns by the meter multiplier."""
+    for col in NUMERIC_COLUMNS:
+        if col in df:
+            df[col] = df[col] * multiplier
+    return df
+
+
+def compact_dtypes(df, float32=False):
+    """
+    Stores a parsed frame in less memory.
+
+    'season' and 'rate' become categoricals and 'month' int8, which keeps every value. With
+    `float32` the meter readings are also stored as float32, which keeps about seven
+    significant digits.
+
+    Parameters:
+        df (pd.DataFrame): A parsed frame.
+        float32 (bool): Store the numeric columns as float32.
+
+    Returns:
+        pd.DataFrame: The frame with compact dtypes.
+    """
+    df = df.copy()
+    for col, labels in (('season', SEASONS), ('rate', PERIODS)):
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Fixed categories, so frames of different sheets concatenate as categoricals
+            extra = sorted(set(df[col].dropna()) - set(labels), key=str)
+            df[col] = pd.Categorical(df[col], categories=list(labels) + extra)
+
+    if 'month' in df:
+        df['month'] = df['month'].astype('Int8' if df['month'].isna().any() else np.int8)
+
+    if float32:
+        for col in NUMERIC_COLUMNS:
+            if col in df and is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(np.float32)
+    return df
+
+
+def memory_report(df):
+    """
+    Reports the memory used by each column of a frame, object columns counted in full.
+
+    Returns:
+        pd.DataFrame: The dtype, bytes and share of the total of the index and every column,
+        with a 'total' row.
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    dtypes = pd.Series({col: str(dtype) for col, dtype in df.dtypes.items()})
+    dtypes['Index'] = str(df.index.dtype)
+
+    report = pd.DataFrame({'dtype': dtypes.reindex(usage.index), 'bytes': usage})
+    report['share'] = report['bytes'] / max(int(usage.sum()), 1)
+    report.loc['total'] = ['', int(usage.sum()), 1.0]
+    return report
+
+
+class ParseReport:
+    """
+    The problems found while parsing a file and the time spent in each parse stage, shared by
+    all the sheets of that file.
+
+    :param source name of the parsed file
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        self.errors = []
+        self.timings = {}
+
+    def add(self, column, rows=(None,), values=(None,), message="", sheet=None):
+        """Records one error per row, a column level error has no row."""
+        for row, value in zip(rows, values):
+            self.errors.append(
+                {"sheet": sheet, "column": column, "row": row, "value": value, "message": message}
+            )
+
+    def extend(self, other):
+        """Adds the errors and timings of another report."""
+        self.errors.extend(other.errors)
+        for stage, seconds in other.timings.items():
+            self.add_timing(stage, seconds)
+
+    def add_timing(self, stage, seconds):
+        """Adds the seconds spent in a stage, summed over sheets."""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def summary(self):
+        source = self.source or "file"
+        return f"{len(self.errors)} parse errors in {source}"
+
+    def to_frame(self):
+        return pd.DataFrame(self.errors, columns=["sheet", "column", "row", "value", "message"])
+
+
+def to_numeric_column(series, report=None, sheet=None):
+    """
+    Converts a column of meter values to floats.
+
+    Numeric columns are returned as they are. Text cells may use a decimal comma ("0,068"),
+    and thousands separators ("1 234,5", "1.234,5", "1,234.5"). A single comma is read as the
+    decimal separator. Cells that still cannot be read become NaN and are added to the report.
+
+    Parameters:
+        series (pd.Series): The column to convert.
+        report (ParseReport): Collects the cells that could not be converted.
+        sheet (str): The sheet name used in the report.
+
+    Returns:
+        pd.Series: The float column.
+    """
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        return series
+
+    # Every cell as text, with missing cells as "nan": numbers and decimal-comma strings then
+    # convert in one cast, which covers almost every export
+    text = series.astype(str)
+    if series.hasnans:
+        text = text.where(series.notna(), "nan")
+    text = text.str.replace(",", ".", regex=False)
+    try:
+        return text.astype('float64')
+    except ValueError:
+        pass
+
+    # Some cells use thousands separators or are not numbers, clean just those cells
+    numbers = pd.to_numeric(text, errors='coerce')
+    pending = numbers.isna() & series.notna()
+
+    text = series[pending].astype(str).str.replace(r"[\s'\u00a0]", "", regex=True)
+    commas = text.str.count(",")
+    dots = text.str.count(r"\.")
+    comma_decimal = (commas == 1) & (text.str.rfind(",") > text.str.rfind("."))
+
+    # Drop the thousands separators, then make the decimal separator a dot
+    text = text.mask(comma_decimal | (dots > 1), text.str.replace(".", "", regex=False))
+    text = text.mask(comma_decimal, text.str.replace(",", ".", regex=False))
+    text = text.mask(~comma_decimal, text.str.replace(",", "", regex=False))
+
+    parsed = pd.to_numeric(text, errors='coerce')
+    numbers[pending] = parsed
+
+    failed = parsed.isna()
+    if report is not None and failed.any():
+        report.add(series.name, rows=failed.index[failed], values=series[pending][failed],
+                   message="not a number", sheet=sheet)
+
+    return numbers
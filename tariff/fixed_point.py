@@ -0,0 +1,90 @@
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+
+import numpy as np
+
+from tariff.constants import MILLI_CENTS_PER_CENT, MILLI_CENTS_PER_RAND, UNITS_PER_KILO
+
+# Rounding policy of exact billing:
+#   1. Rates are converted to whole milli-cents exactly, finer rates are rejected.
+#   2. Interval kWh and monthly max kVA are rounded half to even to whole Wh and VA.
+#   3. Costs are rate x units in int64, milli-cents per thousand units, so interval costs and
+#      their sums are exact.
+#   4. Every line item is rounded once, half away from zero, to a whole cent. The bill total is
+#      the exact sum of its line items.
+#   5. VAT is the bill total times the VAT rate as the exact decimal fraction it is written as,
+#      rounded half away from zero to a whole cent, once per bill.
+
+# Costs per cent, see `costs`
+COSTS_PER_CENT = UNITS_PER_KILO * MILLI_CENTS_PER_CENT
+
+
+def to_milli_cents(rates):
+    """
+    Converts rates in rand to int64 milli-cents.
+
+    Raises:
+        ValueError: A rate is missing or finer than a milli-cent.
+    """
+    scaled = np.asarray(rates, dtype=np.float64) * MILLI_CENTS_PER_RAND
+    milli_cents = np.rint(scaled)
+    # Decimal rates such as 2.3382 are a hair off in binary, anything further is real precision
+    if not np.isfinite(scaled).all() or (np.abs(scaled - milli_cents) > 1e-6 * np.maximum(1, np.abs(scaled))).any():
+        raise ValueError("Rates must be finite and in whole milli-cents")
+    return milli_cents.astype(np.int64)
+
+
+def quantize(values, scale=UNITS_PER_KILO):
+    """Returns values times a scale rounded half to even to int64, missing values as zero."""
+    scaled = np.multiply(values, scale, dtype=np.float64)
+    np.rint(scaled, out=scaled)
+    return np.nan_to_num(scaled, copy=False).astype(np.int64)
+
+
+def round_div(numerators, denominator):
+    """Divides int64 numerators by a positive integer, rounding half away from zero."""
+    numerators = np.asarray(numerators, dtype=np.int64)
+    quotient, remainder = np.divmod(np.abs(numerators), denominator)
+    return np.sign(numerators) * (quotient + (2 * remainder >= denominator))
+
+
+def costs(rates, units):
+    """
+    Returns the exact cost of quantities at rates, in milli-cents per thousand units.
+
+    Parameters:
+        rates (np.ndarray): Rates in milli-cents per kWh, kVA or month, see `to_milli_cents`.
+        units (np.ndarray): Quantities in Wh, VA or thousandths of a month, see `quantize`.
+
+    Raises:
+        OverflowError: A cost does not fit in int64.
+    """
+    rates, units = np.asarray(rates, dtype=np.int64), np.asarray(units, dtype=np.int64)
+    if rates.size and units.size and _max_abs(rates) * _max_abs(units) > np.iinfo(np.int64).max:
+        raise OverflowError("Costs do not fit in int64")
+    return rates * units
+
+
+def _max_abs(values):
+    return max(abs(int(values.min())), abs(int(values.max())))
+
+
+def costs_to_cents(line_costs):
+    """Rounds the costs of line items to whole cents, half away from zero."""
+    return round_div(line_costs, COSTS_PER_CENT)
+
+
+def amount_to_cents(amount):
+    """Rounds an amount in rand to whole cents, half away from zero, as the decimal the float is written as."""
+    return int(Decimal(repr(float(amount))).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def vat_cents(total_cents, vat_rate):
+    """Returns the VAT on totals in cents, rounded half away from zero."""
+    fraction = Fraction(str(vat_rate))
+    return round_div(np.asarray(total_cents, dtype=np.int64) * fraction.numerator, fraction.denominator)
+
+
+def cents_to_rand(cents):
+    """Returns an amount in cents as an exact Decimal in rand."""
+    return Decimal(int(cents)).scaleb(-2)
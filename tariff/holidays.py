@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# Public holidays of the Public Holidays Act 1994, (month, day), in force from 1995
+FIRST_YEAR = 1995
+FIXED_HOLIDAYS = (
+    (1, 1),  # New Year's Day
+    (3, 21),  # Human Rights Day
+    (4, 27),  # Freedom Day
+    (5, 1),  # Workers' Day
+    (6, 16),  # Youth Day
+    (8, 9),  # National Women's Day
+    (9, 24),  # Heritage Day
+    (12, 16),  # Day of Reconciliation
+    (12, 25),  # Christmas Day
+    (12, 26),  # Day of Goodwill
+)
+# Good Friday and Family Day, in days from Easter Sunday
+EASTER_HOLIDAYS = (-2, 1)
+# Once-off public holidays declared by the President, elections mostly
+DECLARED_HOLIDAYS = (
+    "1999-06-02",
+    "2004-04-14",
+    "2006-03-01",
+    "2009-04-22",
+    "2011-05-18",
+    "2014-05-07",
+    "2016-08-03",
+    "2019-05-08",
+    "2021-11-01",
+    "2023-12-15",
+    "2024-05-29",
+)
+
+# Public holidays by year
+_holidays = {}
+
+
+def easter_sunday(year):
+    """Returns the date of Easter Sunday of a year in the Gregorian calendar (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return np.datetime64(f"{year}-{month:02d}-{day + 1:02d}", 'D')
+
+
+def build_public_holidays(year):
+    """
+    Builds the South African public holidays of a year.
+
+    A holiday on a Sunday makes the following Monday a public holiday. When that Monday is a
+    holiday already, as the Day of Goodwill after a Sunday Christmas, the next day is.
+
+    Returns:
+        pd.DatetimeIndex: The holiday dates, sorted.
+    """
+    if year < FIRST_YEAR:
+        raise ValueError(f"No public holiday rules before {FIRST_YEAR}, got {year}")
+
+    days = [np.datetime64(f"{year}-{month:02d}-{day:02d}", 'D') for month, day in FIXED_HOLIDAYS]
+    easter = easter_sunday(year)
+    days += [easter + np.timedelta64(offset, 'D') for offset in EASTER_HOLIDAYS]
+    days += [np.datetime64(day, 'D') for day in DECLARED_HOLIDAYS if day.startswith(f"{year}-")]
+
+    holidays = set(days)
+    for day in sorted(days):
+        if pd.Timestamp(day).weekday() == 6:
+            observed = day + np.timedelta64(1, 'D')
+            while observed in holidays:
+                observed += np.timedelta64(1, 'D')
+            holidays.add(observed)
+    return pd.DatetimeIndex(sorted(holidays))
+
+
+def public_holidays(year):
+    """Returns the public holidays of a year, built once per year."""
+    holidays = _holidays.get(year)
+    if holidays is None:
+        holidays = _holidays[year] = build_public_holidays(year)
+    return holidays
+
+
+def holidays_between(first_year, last_year):
+    """Returns the public holidays of a range of years, both included. Years before FIRST_YEAR have none."""
+    years = range(max(first_year, FIRST_YEAR), last_year + 1)
+    if not len(years):
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(np.concatenate([public_holidays(year).values for year in years]))
+
+
+def holidays_for(dates):
+    """Returns the public holidays of every year spanned by timestamps, empty without timestamps."""
+    dates = pd.DatetimeIndex(dates)
+    dates = dates[dates.notna()]
+    if not len(dates):
+        return pd.DatetimeIndex([])
+    return holidays_between(dates.min().year, dates.max().year)
+
+
+def is_holiday(dates):
+    """Returns whether every timestamp falls on a public holiday, with one `isin` over the column."""
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return np.asarray(dates.normalize().isin(holidays_for(dates)))
+
+
+def is_off_peak_day(dates):
+    """Returns whether every timestamp falls on a public holiday or a Sunday, off peak all day."""
+    dates = pd.DatetimeIndex(dates)
+    return is_holiday(dates) | np.asarray(dates.weekday == 6)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+
+from tariff.constants import HIGH_DEMAND, LOW_DEMAND, OFF_PEAK, PEAK, STANDARD
+from tariff.schemas import coe_tariff_schema
+from tariff.tariff_maps import tariff_a, tariff_c, tariff_d
+
+from jsonschema import Draft7Validator
+
+# How the rates of every charge are keyed, below the voltage type for energy
+SEASONAL_CHARGES = ('demand_charge', 'energy_charge')
+PERIOD_CHARGES = ('energy_charge',)
+
+_validator = None
+# Validation errors of every tariff checked, by content hash, empty for valid tariffs
+_validated = {}
+# Registered tariffs by tariff code
+_tariffs = {}
+
+
+class TariffValidationError(ValueError):
+    """
+    A tariff does not match `coe_tariff_schema` or lacks rates for some of its voltage types.
+
+    :param code tariff code, None if missing
+    :param errors the error messages, each prefixed by the path of the offending value
+    """
+
+    def __init__(self, code, errors):
+        self.code = code
+        self.errors = list(errors)
+        super().__init__(f"Invalid tariff {code}:\n" + "\n".join(f"  {error}" for error in self.errors))
+
+
+def tariff_validator():
+    """Returns the validator of `coe_tariff_schema`, compiled on first use."""
+    global _validator
+    if _validator is None:
+        Draft7Validator.check_schema(coe_tariff_schema)
+        _validator = Draft7Validator(coe_tariff_schema)
+    return _validator
+
+
+def tariff_hash(tariff):
+    """Returns the SHA-256 hash of the content of a tariff, equal for equal tariffs."""
+    content = json.dumps(_canonical(tariff), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _canonical(value):
+    # Tariff maps are keyed by hour numbers, JSON only has text keys
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def tariff_errors(tariff):
+    """
+    Checks a tariff against `coe_tariff_schema`, then checks that every charge has a rate for
+    every meter voltage type of the tariff, and every season and period where rates vary.
+
+    Returns:
+        list: The error messages, each prefixed by the path of the offending value.
+    """
+    # A value can fail the same way under several subschemas, each message is kept once
+    errors = list(dict.fromkeys(
+        f"{'/'.join(map(str, error.absolute_path)) or '<root>'}: {error.message}"
+        for error in sorted(tariff_validator().iter_errors(tariff), key=lambda error: list(map(str, error.path)))
+    ))
+    if errors:
+        return errors
+    return _coverage_errors(tariff)
+
+
+def _coverage_errors(tariff):
+    errors = []
+    for i, charge in enumerate(tariff.get("charges", [])):
+        name, types = charge.get("name"), charge.get("types", {})
+        seasons = (HIGH_DEMAND, LOW_DEMAND) if name in SEASONAL_CHARGES else (None,)
+        for season in seasons:
+            rates = types.get(season, {}) if season else types
+            for voltage in tariff.get("meter_voltage_types", []):
+                path = '/'.join(str(key) for key in ('charges', i, 'types', season, voltage) if key is not None)
+                if voltage not in rates:
+                    errors.append(f"{path}: no {name} rate for {voltage}")
+                elif name in PERIOD_CHARGES:
+                    missing = [period for period in (PEAK, STANDARD, OFF_PEAK) if period not in rates[voltage]]
+                    if missing:
+                        errors.append(f"{path}: no {name} rate for the periods {missing}")
+    return errors
+
+
+def validate_tariff(tariff):
+    """
+    Validates a tariff, see `tariff_errors`. A tariff is validated once per content, later calls
+    with an equal tariff only hash it.
+
+    Returns:
+        str: The content hash of the tariff.
+
+    Raises:
+        TariffValidationError: The tariff is invalid.
+    """
+    key = tariff_hash(tariff)
+    errors = _validated.get(key)
+    if errors is None:
+        errors = _validated[key] = tuple(tariff_errors(tariff))
+    if errors:
+        raise TariffValidationError(tariff.get("code"), errors)
+    return key
+
+
+def register_tariff(tariff):
+    """Validates a tariff and registers it by its code, replacing a tariff of the same code."""
+    validate_tariff(tariff)
+    _tariffs[tariff["code"]] = tariff
+    return tariff
+
+
+def get_tariff(code):
+    """Returns the registered tariff of a tariff code."""
+    try:
+        return _tariffs[code]
+    except KeyError:
+        raise KeyError(f"No tariff registered as {code}") from None
+
+
+def registered_tariffs():
+    """Returns the registered tariffs, in registration order."""
+    return list(_tariffs.values())
+
+
+for _tariff in (tariff_a, tariff_c, tariff_d):
+    register_tariff(_tariff)
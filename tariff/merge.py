@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+def dedupe_timestamps(dates, values):
+    """
+    Sorts the readings of one meter by timestamp and keeps one reading per timestamp.
+
+    Of duplicate timestamps the first reading with a value is kept. Readings without a
+    timestamp are dropped.
+
+    Parameters:
+        dates (np.ndarray): datetime64 timestamps.
+        values (np.ndarray): float readings aligned with `dates`.
+
+    Returns:
+        tuple: The unique sorted timestamps, their readings and the duplicated timestamps.
+    """
+    valid = ~np.isnat(dates)
+    dates, values = dates[valid], values[valid]
+
+    # Meter exports are nearly always sorted and unique, which needs no sort
+    if len(dates) < 2 or (dates[1:] > dates[:-1]).all():
+        return dates, values, dates[:0]
+
+    order = np.lexsort((np.isnan(values), dates))  # by timestamp, readings with a value first
+    dates, values = dates[order], values[order]
+    first = np.r_[True, dates[1:] != dates[:-1]]
+    return dates[first], values[first], np.unique(dates[~first])
+
+
+def union_index(indexes):
+    """
+    Outer joins sorted unique DatetimeIndexes.
+
+    The indexes are joined in pairs, then the pairs in pairs, so every timestamp takes part in
+    about log2(k) linear merges of sorted indexes, and none in a sort or hash of all the rows.
+    """
+    indexes = list(indexes)
+    if not indexes:
+        return pd.DatetimeIndex([], name='Date')
+
+    while len(indexes) > 1:
+        merged = [a.union(b) for a, b in zip(indexes[::2], indexes[1::2])]
+        if len(indexes) % 2:
+            merged.append(indexes[-1])
+        indexes = merged
+    return indexes[0].rename('Date')
+
+
+def merge_meters(meters, column='KVA', report=None):
+    """
+    Lines up one column of any number of meters on their timestamps.
+
+    Every meter is sorted and deduplicated on its own, the timestamps of all meters are outer
+    joined, and each meter's readings are placed at their positions in the joined timestamps.
+    A timestamp missing from a meter has no reading for that meter.
+
+    Parameters:
+        meters (dict): Parsed frames, with 'Date' and `column` columns, by meter name.
+        column (str): The column to merge.
+        report (ParseReport): Collects the duplicate timestamps and the missing timestamps of every meter.
+
+    Returns:
+        tuple: The readings indexed by 'Date' with a column per meter, and a summary indexed by
+        meter with the counts of rows, duplicate and missing timestamps, and the first and last
+        timestamp.
+    """
+    names = list(meters)
+    series = []
+    summary = []
+    for name in names:
+        df = meters[name]
+        dates = pd.DatetimeIndex(df['Date']).values
+        values = np.asarray(df[column], dtype=np.float64)
+        dates, values, duplicates = dedupe_timestamps(dates, values)
+        series.append((dates, values))
+
+        if report is not None and len(duplicates):
+            report.add('Date', rows=[None] * len(duplicates), values=duplicates,
+                       message="duplicate timestamp, first reading kept", sheet=name)
+        summary.append({
+            'meter': name,
+            'rows': len(df),
+            'timestamps': len(dates),
+            'duplicates': len(duplicates),
+            'first': dates[0] if len(dates) else pd.NaT,
+            'last': dates[-1] if len(dates) else pd.NaT,
+        })
+
+    index = union_index(pd.DatetimeIndex(dates) for dates, _ in series)
+
+    merged = np.full((len(index), len(names)), np.nan)
+    for j, (dates, values) in enumerate(series):
+        # Every timestamp of the meter is in the joined index, both are sorted
+        merged[index.values.searchsorted(dates), j] = values
+
+    summary = pd.DataFrame(summary, columns=['meter', 'rows', 'timestamps', 'duplicates', 'first', 'last'])
+    summary.insert(4, 'missing', len(index) - summary['timestamps'])
+    summary = summary.set_index('meter')
+
+    if report is not None:
+        for name, missing in summary['missing'].items():
+            if missing:
+                report.add('Date', message=f"{missing} of {len(index)} timestamps missing", sheet=name)
+
+    return pd.DataFrame(merged, index=index, columns=names), summary
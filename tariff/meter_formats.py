@@ -0,0 +1,236 @@
+import logging
+import re
+import time
+from io import BytesIO
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from tariff.aggregates import infer_interval_hours
+from tariff.constants import (
+    ALS,
+    ALS_F,
+    ALS_HEADERS_SET,
+    CSV,
+    ELS_2_HEADERS_SET,
+    ELS_F,
+    ELS_HEADERS_SET,
+    ELSTER,
+    LANDIS_GYR,
+    LGZ_F,
+    LGZ_HEADERS_SET,
+)
+from tariff.file_parse import (
+    ParseReport,
+    compact_dtypes,
+    file_type,
+    parse_sheet,
+    parse_timestamps,
+    read_and_parse_file,
+    sniff_date_format,
+    sniff_date_order,
+    sniff_separator,
+    to_numeric_column,
+)
+from tariff.workbook import read_file_bytes
+
+# Only the start of a file is read to detect its format
+HEADER_BYTES = 4 * 1024
+
+# Columns every vendor parser returns, the same as a parsed sheet before classification
+CANONICAL_COLUMNS = ['Date', 'KW', 'KVAR', 'KVA']
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_header(name):
+    """Lower case without whitespace, the form used in the header sets of `tariff.constants`."""
+    return re.sub(r"\s+", "", str(name).lower())
+
+
+class MeterFormat:
+    """
+    A vendor file format, recognised by its header.
+
+    :param name file format id, such as LGZ_F
+    :param meter meter vendor, such as LANDIS_GYR
+    :param header_sets header sets of the format, any one of them identifies it
+    :param parse function taking the raw table, with normalized headers, and returning the canonical columns
+    """
+
+    def __init__(self, name, meter, header_sets, parse):
+        self.name = name
+        self.meter = meter
+        self.header_sets = [frozenset(normalize_header(h) for h in headers) for headers in header_sets]
+        self.parse = parse
+
+    def matches(self, columns, line):
+        """True if the header has every field of a header set, or is a header set written as one line."""
+        fields = {normalize_header(c) for c in columns}
+        line = normalize_header(line)
+        return any(headers <= fields or line in headers for headers in self.header_sets)
+
+
+METER_FORMATS = {}
+
+
+def register_meter_format(name, meter, *header_sets):
+    """Registers the decorated function as the parser of a vendor file format."""
+
+    def decorator(parse):
+        METER_FORMATS[name] = MeterFormat(name, meter, header_sets, parse)
+        return parse
+
+    return decorator
+
+
+def read_head(file_obj, size=HEADER_BYTES):
+    """Reads at most `size` bytes from the start of a stream and rewinds it for the reader that follows."""
+    file_obj.seek(0)
+    try:
+        return file_obj.read(size)
+    finally:
+        file_obj.seek(0)
+
+
+def read_header(file_obj):
+    """
+    Reads only the header of a file, the first HEADER_BYTES of a CSV file or the first row
+    of an Excel file.
+
+    Returns:
+        tuple: The header fields and the header line.
+    """
+    if file_type(file_obj) == CSV:
+        sample = read_head(file_obj).decode('utf-8-sig', errors='replace')
+        line = sample.split('\n', 1)[0].strip()
+        return [field.strip() for field in line.split(sniff_separator(line))], line
+
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    fields = [str(value) for value in header if value is not None]
+    return fields, ",".join(fields)
+
+
+def detect_meter_format(file_obj):
+    """Returns the MeterFormat of a file, or None if its header matches no vendor."""
+    columns, line = read_header(file_obj)
+    for meter_format in METER_FORMATS.values():
+        if meter_format.matches(columns, line):
+            return meter_format
+    return None
+
+
+def read_meter_file(file_obj, sheet_name=0, multiplier=200000, report=None, compact=False, float32=False):
+    """
+    Reads a meter export of any registered vendor into a parsed DataFrame.
+
+    The vendor is detected from the header, the file is read by that vendor's parser and
+    then goes through the usual parse stages. Files of no registered vendor are read with
+    `read_and_parse_file`.
+
+    Parameters:
+        file_obj (file object): The uploaded file.
+        sheet_name (str or int): The sheet to read from an Excel file of no registered vendor.
+        multiplier (int): The multiplier for the energy values.
+        report (ParseReport): Collects parse errors and stage timings, errors are logged if None.
+        compact (bool): Store the labels as categoricals, see `compact_dtypes`.
+        float32 (bool): Also store the meter readings as float32, implies `compact`.
+
+    Returns:
+        pd.DataFrame: The parsed DataFrame.
+    """
+    meter_format = detect_meter_format(file_obj)
+    if meter_format is None:
+        return read_and_parse_file(file_obj, sheet_name=sheet_name, multiplier=multiplier, report=report,
+                                   compact=compact, float32=float32)
+
+    sheet_report = ParseReport() if report is None else report
+
+    start = time.perf_counter()
+    data = read_file_bytes(file_obj)
+    if file_type(file_obj) == CSV:
+        sep = sniff_separator(data[:HEADER_BYTES].decode('utf-8-sig', errors='replace'))
+        # The C engine keeps text as written, pyarrow would drop leading zeros of status words
+        raw = pd.read_csv(BytesIO(data), sep=sep, dtype=str, engine='c')
+    else:
+        raw = pd.read_excel(BytesIO(data), dtype=str, engine='openpyxl')
+    raw.columns = [normalize_header(c) for c in raw.columns]
+    df = meter_format.parse(raw, sheet_report)
+    missing = [col for col in CANONICAL_COLUMNS if col not in df]
+    if missing:
+        raise ValueError(f"The {meter_format.name} parser did not return the columns {missing}")
+    sheet_report.add_timing("read", time.perf_counter() - start)
+
+    df = parse_sheet(df, multiplier=multiplier, report=sheet_report, sheet=meter_format.name)
+    if report is None and sheet_report.errors:
+        logger.warning(sheet_report.summary())
+    return compact_dtypes(df, float32=float32) if compact or float32 else df
+
+
+def _timestamps(text):
+    """Parses text timestamps with the format sniffed from them."""
+    text = text.str.strip()
+    date_order = sniff_date_order(text.dropna())
+    frame = parse_timestamps(pd.DataFrame({'Date': text}), sniff_date_format(text.dropna(), date_order), date_order)
+    return frame['Date']
+
+
+def _apparent_power(kw, kvar):
+    return pd.Series(np.hypot(kw, kvar), index=kw.index)
+
+
+@register_meter_format(LGZ_F, LANDIS_GYR, LGZ_HEADERS_SET)
+def parse_lgz(raw, report=None):
+    """Landis+Gyr load profile: demand registers in kW and kvar, with a hex status word."""
+    kw = to_numeric_column(raw['1-1:1.5.0[kw]'].rename('KW'), report=report, sheet=LGZ_F)
+    kvar = to_numeric_column(raw['1-1:5.5.0[kvar]'].rename('KVAR'), report=report, sheet=LGZ_F)
+    return pd.DataFrame({
+        'Date': _timestamps(raw['0-0:1.0.0']),
+        'HEX': raw['0-0:96.240.12[hex]'],
+        'KW': kw,
+        'KVAR': kvar,
+        'KVA': _apparent_power(kw, kvar),
+    })
+
+
+@register_meter_format(ALS_F, ALS, ALS_HEADERS_SET)
+def parse_als(raw, report=None):
+    """ALS load profile: energy per interval in kWh and kvarh, converted to demand."""
+    dates = _timestamps(raw['rdate'].str.strip() + ' ' + raw['rtime'].str.strip())
+    hours = infer_interval_hours(dates.dropna())
+    return pd.DataFrame({
+        'Date': dates,
+        'KW': to_numeric_column(raw['kwh+'].rename('KW'), report=report, sheet=ALS_F) / hours,
+        'KVAR': to_numeric_column(raw['kvarh+'].rename('KVAR'), report=report, sheet=ALS_F) / hours,
+        'KVA': to_numeric_column(raw['kva'].rename('KVA'), report=report, sheet=ALS_F),
+        'status': raw['status'],
+    })
+
+
+@register_meter_format(ELS_F, ELSTER, ELS_HEADERS_SET, ELS_2_HEADERS_SET)
+def parse_els(raw, report=None):
+    """
+    Elster load profile: import kW and inductive kvar per interval, stamped with the end of
+    the interval like the other formats.
+    """
+    start = _timestamps(raw['date'].str.strip() + ' ' + raw['starttime'].str.strip())
+    end = _timestamps(raw['date'].str.strip() + ' ' + raw['endtime'].str.strip())
+    # The interval ending at midnight carries the date it started on
+    end = end.mask(end <= start, end + pd.Timedelta(days=1))
+
+    kw = to_numeric_column(raw['1:importkw'].rename('KW'), report=report, sheet=ELS_F)
+    kvar = to_numeric_column(raw['3:q1inductiveimport'].rename('KVAR'), report=report, sheet=ELS_F)
+    return pd.DataFrame({
+        'Date': end,
+        'KW': kw,
+        'KVAR': kvar,
+        'KVA': _apparent_power(kw, kvar),
+        'flags': raw['flags'],
+    })
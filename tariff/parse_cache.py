@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pandas.api.types import infer_dtype
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # the cache is disabled without pyarrow, install the 'cache' extra
+    pa = None
+
+# Location and limits of the on-disk cache of parsed sheets, the cache is off unless a directory is set
+CACHE_DIR = os.environ.get('TARIFF_CACHE_DIR') or None
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+MAX_AGE_DAYS = 30
+
+SUFFIX = '.feather'
+ERRORS_KEY = b'tariff.parse_errors'
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed sheets, stored as uncompressed Feather files and read back
+    memory-mapped.
+
+    Entries are keyed by the content hash of the source file, the sheet, the multiplier and
+    the parser version. Entries of other parser versions, or older than `max_age_days`, are
+    stale and removed when the cache is pruned. After that the least recently used entries
+    are removed until the cache fits in `max_bytes`.
+
+    Object columns holding values of mixed types are stored as text, parsed sheets have none
+    as the parse stages already store them as text.
+
+    The cache is opt-in: it is off without a directory, which defaults to the TARIFF_CACHE_DIR
+    environment variable, and without pyarrow, which is logged.
+
+    :param directory directory of the cache files, the cache is off if None
+    :param version parser version, entries of other versions are never read
+    :param max_bytes size limit of the cache directory
+    :param max_age_days entries unused for longer are removed
+    """
+
+    def __init__(self, directory=CACHE_DIR, version='1', max_bytes=MAX_CACHE_BYTES, max_age_days=MAX_AGE_DAYS):
+        self.directory = Path(directory) if directory is not None else None
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        if self.directory is not None and pa is None:
+            logger.warning("The parse cache in %s is off, it needs pyarrow: install the 'cache' extra", directory)
+
+    @property
+    def enabled(self):
+        return self.directory is not None and pa is not None
+
+    def key(self, source_hash, sheet, multiplier):
+        """Returns the cache key of one parsed sheet."""
+        return hashlib.sha256(f"{source_hash}:{sheet!r}:{multiplier!r}".encode()).hexdigest()
+
+    def path(self, key):
+        return self.directory / f"{key}.v{self.version}{SUFFIX}"
+
+    def get(self, key):
+        """
+        Returns the cached frame and its parse errors, or None if the entry is missing.
+
+        Returns:
+            tuple: The parsed DataFrame and the list of parse errors of the sheet.
+        """
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        if not path.exists():
+            return None
+
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            path.unlink(missing_ok=True)  # a corrupt entry is parsed again
+            return None
+
+        os.utime(path)  # recently used, for pruning
+        metadata = table.schema.metadata or {}
+        errors = json.loads(metadata.get(ERRORS_KEY, b'[]'))
+        return table.to_pandas(), errors
+
+    def put(self, key, df, errors=()):
+        """Writes a parsed frame with its parse errors, then prunes the cache."""
+        if not self.enabled:
+            return
+
+        table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[ERRORS_KEY] = json.dumps(list(errors), default=str).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partly written file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            feather.write_feather(table, tmp, compression='uncompressed')
+            os.replace(tmp, self.path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self.prune()
+
+    def prune(self):
+        """Removes stale entries, then the least recently used ones over the size limit."""
+        if self.directory is None or not self.directory.exists():
+            return
+
+        current = f".v{self.version}{SUFFIX}"
+        oldest = time.time() - self.max_age_days * 24 * 3600
+        entries = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            stat = path.stat()
+            if not path.name.endswith(current) or stat.st_mtime < oldest:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        if self.directory is None:
+            return
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            path.unlink(missing_ok=True)
+
+
+def _arrow_safe(df):
+    """Returns the frame with mixed-type object columns as text, which Arrow can store."""
+    mixed = [
+        col for col in df.columns
+        if df[col].dtype == object and infer_dtype(df[col], skipna=True).startswith('mixed')
+    ]
+    if not mixed:
+        return df
+
+    df = df.copy()
+    for col in mixed:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
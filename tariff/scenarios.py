@@ -0,0 +1,281 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from tariff.aggregates import interval_hours
+from tariff.compare import ProfileAggregates, aggregate_months, classify_profile, price_tariff
+from tariff.constants import OFF_PEAK, PEAK
+from tariff.holidays import holidays_for
+from tariff.loader import validate_tariff
+from tariff.tariff_maps import tariff_intervals
+from tariff.tou import PERIODS
+
+
+class ScenarioIntervals:
+    """
+    The intervals a scenario changes, the load arrays are changed in place by transformations.
+
+    :param kw kW of every interval
+    :param kva kVA of every interval
+    :param month_codes billing month code of every interval, see `tariff.compare.classify_profile`
+    :param calendar_months calendar month number of every interval, 1 to 12
+    :param period_codes time-of-use period code of every interval
+    :param n_months the number of billing months of the profile
+    :param hours interval length in hours
+    """
+
+    def __init__(self, kw, kva, month_codes, calendar_months, period_codes, n_months, hours):
+        self.kw = kw
+        self.kva = kva
+        self.month_codes = month_codes
+        self.calendar_months = calendar_months
+        self.period_codes = period_codes
+        self.n_months = n_months
+        self.hours = hours
+        self.columns = {}  # further per-interval results of transformations, such as battery dispatch
+
+    def set_kw(self, kw):
+        """Changes the kW of every interval, the kVA by the change over the interval's power factor, unity at zero kW."""
+        ratio = np.divide(self.kva, self.kw, out=np.ones(len(self.kw)), where=self.kw > 0)
+        self.kva = np.maximum(self.kva + (kw - self.kw) * ratio, 0)
+        self.kw = kw
+
+
+class Transformation(ABC):
+    """
+    A change to the load of the intervals of some calendar months and time-of-use periods.
+
+    :param months calendar month numbers 1 to 12 the change applies to, every month if None
+    :param periods time-of-use periods the change applies to, every period if None
+    """
+
+    def __init__(self, months=None, periods=None):
+        self.months = None if months is None else tuple(months)
+        self.periods = None if periods is None else tuple(periods)
+
+    def __repr__(self):
+        params = ', '.join(f"{name}={value!r}" for name, value in vars(self).items() if value is not None)
+        return f"{type(self).__name__}({params})"
+
+    def selects(self, intervals, periods=None):
+        """Returns whether every interval is in the months, and the periods if given, of the change."""
+        selected = np.ones(len(intervals.kw), dtype=bool)
+        if self.months is not None:
+            months = np.zeros(13, dtype=bool)
+            months[list(self.months)] = True
+            selected &= months[intervals.calendar_months]
+        periods = self.periods if periods is None else periods
+        if periods is not None:
+            codes = np.zeros(len(PERIODS), dtype=bool)
+            codes[[PERIODS.index(period) for period in periods]] = True
+            selected &= codes[intervals.period_codes]
+        return selected
+
+    @abstractmethod
+    def apply(self, intervals):
+        """Changes the load of the selected intervals in place."""
+
+
+class Scale(Transformation):
+    """Scales the load of the selected intervals by a factor."""
+
+    def __init__(self, factor, months=None, periods=None):
+        super().__init__(months, periods)
+        if factor < 0:
+            raise ValueError(f"Scale factor must not be negative, got {factor}")
+        self.factor = factor
+
+    def apply(self, intervals):
+        selected = self.selects(intervals)
+        intervals.kw = np.where(selected, intervals.kw * self.factor, intervals.kw)
+        intervals.kva = np.where(selected, intervals.kva * self.factor, intervals.kva)
+
+
+class AddLoad(Transformation):
+    """Adds a constant load to the selected intervals, negative to remove load, at a power factor."""
+
+    def __init__(self, kw, months=None, periods=None, power_factor=1.0):
+        super().__init__(months, periods)
+        if not 0 < power_factor <= 1:
+            raise ValueError(f"Power factor must be in (0, 1], got {power_factor}")
+        self.kw = kw
+        self.power_factor = power_factor
+
+    def apply(self, intervals):
+        selected = self.selects(intervals)
+        kw = np.maximum(intervals.kw + self.kw, 0)
+        intervals.kva = np.where(selected, np.maximum(intervals.kva + (kw - intervals.kw) / self.power_factor, 0),
+                                 intervals.kva)
+        intervals.kw = np.where(selected, kw, intervals.kw)
+
+
+class Cap(Transformation):
+    """Caps the kVA of the selected intervals, their kW reduced at the same power factor."""
+
+    def __init__(self, kva, months=None, periods=None):
+        super().__init__(months, periods)
+        if kva < 0:
+            raise ValueError(f"kVA cap must not be negative, got {kva}")
+        self.kva = kva
+
+    def apply(self, intervals):
+        capped = self.selects(intervals) & (intervals.kva > self.kva)
+        ratio = np.divide(self.kva, intervals.kva, out=np.ones(len(intervals.kva)), where=capped)
+        intervals.kw = intervals.kw * ratio
+        intervals.kva = np.where(capped, self.kva, intervals.kva)
+
+
+class Shift(Transformation):
+    """
+    Moves up to a kW of load out of the intervals of some periods and spreads the energy moved
+    evenly over the intervals of other periods in the same billing month. A month without
+    intervals to move to keeps its load.
+
+    :param kw load moved out of every interval, less where the interval has less load
+    :param from_periods the periods load is moved out of
+    :param to_periods the periods load is moved to
+    """
+
+    def __init__(self, kw, from_periods=(PEAK,), to_periods=(OFF_PEAK,), months=None):
+        super().__init__(months, from_periods)
+        if kw < 0:
+            raise ValueError(f"Shifted kW must not be negative, got {kw}")
+        self.kw = kw
+        self.to_periods = tuple(to_periods)
+
+    def apply(self, intervals):
+        source = self.selects(intervals)
+        target = self.selects(intervals, self.to_periods)
+        targets = np.bincount(intervals.month_codes, weights=target, minlength=intervals.n_months)
+        source &= targets[intervals.month_codes] > 0
+
+        moved = np.where(source, np.clip(intervals.kw, 0, self.kw), 0)
+        moved_by_month = np.bincount(intervals.month_codes, weights=moved, minlength=intervals.n_months)
+        per_target = np.divide(moved_by_month, targets, out=np.zeros(intervals.n_months), where=targets > 0)
+        added = np.where(target, per_target[intervals.month_codes], 0)
+        intervals.set_kw(intervals.kw - moved + added)
+
+
+class ScenarioEngine:
+    """
+    Evaluates what-if changes to one load profile on a tariff, as bill deltas against the profile
+    as it is.
+
+    The profile is classified and aggregated once. A scenario only touches the intervals of the
+    calendar months its transformations select: their load is changed with array operations,
+    the aggregates of their billing months recomputed and patched into the baseline ones, then
+    every charge is priced from the monthly aggregates, see `tariff.compare.price_tariff`.
+
+    :param df load profile with 'date', 'kw' and 'kva' columns, of regular intervals
+    :param tariff the tariff
+    :param voltage_type the charge voltage type
+    :param holidays dates billed as off peak all day, in addition to Sundays, the South African public
+        holidays of the years of the profile if None
+    """
+
+    def __init__(self, df, tariff, voltage_type, holidays=None):
+        validate_tariff(tariff)
+        self.tariff = tariff
+        self.voltage_type = voltage_type
+
+        df = df[df['date'].notna()].sort_values('date', kind='stable')
+        self.dates = pd.DatetimeIndex(df['date'])
+        if holidays is None:
+            holidays = holidays_for(self.dates)
+        # Interval length, for the kWh of intervals and transformations that carry energy between them
+        self.hours = float(interval_hours(self.dates))
+
+        tariff_map = tariff["tariff_map"] or tariff_intervals
+        self.months, self.month_codes, self.month_seasons, self.period_codes = classify_profile(df['date'], tariff_map,
+                                                                                             holidays)
+        self.calendar_months = self.months[self.month_codes] % 12 + 1
+        self.kw = df['kw'].to_numpy(dtype=float)
+        self.kva = df['kva'].to_numpy(dtype=float)
+
+        kwh, kva = aggregate_months(len(self.months), self.month_codes, self.period_codes,
+                                    self.kw * self.hours, self.kva)
+        self.baseline = ProfileAggregates(self.months, self.month_seasons, kwh, kva)
+        self.base_charges = price_tariff(self.baseline, tariff, voltage_type)
+        self._rows_by_month = {month: np.flatnonzero(self.calendar_months == month) for month in range(1, 13)}
+
+    def apply(self, transformations):
+        """
+        Applies transformations in order to the intervals of the calendar months they select.
+
+        Returns:
+            tuple: The positions of the changed intervals, in time order, and their `ScenarioIntervals`,
+            None without transformations.
+        """
+        months = set()
+        for transformation in transformations:
+            if transformation.months is None:
+                months = set(range(1, 13))
+                break
+            months.update(transformation.months)
+        if not months:
+            return None
+        rows = np.sort(np.concatenate([self._rows_by_month[month] for month in months]))
+
+        intervals = ScenarioIntervals(self.kw[rows], self.kva[rows], self.month_codes[rows], self.calendar_months[rows],
+                                      self.period_codes[rows], len(self.months), self.hours)
+        for transformation in transformations:
+            transformation.apply(intervals)
+        return rows, intervals
+
+    def profile(self, transformations):
+        """
+        Returns the profile changed by transformations.
+
+        Returns:
+            pd.DataFrame: 'date', 'kw' and 'kva' of every interval, with any further columns of the
+            transformations, zero outside the months they select.
+        """
+        profile = pd.DataFrame({'date': self.dates, 'kw': self.kw, 'kva': self.kva})
+        applied = self.apply(transformations)
+        if applied is not None:
+            rows, intervals = applied
+            for column, values in {'kw': intervals.kw, 'kva': intervals.kva, **intervals.columns}.items():
+                if column not in profile:
+                    profile[column] = np.zeros(len(profile))
+                profile.loc[profile.index[rows], column] = values
+        return profile
+
+    def aggregates(self, transformations):
+        """Returns the monthly aggregates of the profile changed by transformations, applied in order."""
+        applied = self.apply(transformations)
+        if applied is None:
+            return self.baseline
+        _, intervals = applied
+
+        kwh, kva = aggregate_months(len(self.months), intervals.month_codes, intervals.period_codes,
+                                    intervals.kw * intervals.hours, intervals.kva)
+        changed = np.unique(intervals.month_codes)
+        scenario_kwh, scenario_kva = self.baseline.kwh.copy(), self.baseline.kva.copy()
+        scenario_kwh[changed], scenario_kva[changed] = kwh[changed], kva[changed]
+        return ProfileAggregates(self.months, self.month_seasons, scenario_kwh, scenario_kva)
+
+    def evaluate(self, scenarios):
+        """
+        Prices a batch of scenarios against the baseline.
+
+        Parameters:
+            scenarios (dict): The transformations of every scenario by scenario name.
+
+        Returns:
+            pd.DataFrame: A row per scenario with the change of every charge, 'total' and 'delta',
+            the change of the total, negative for savings.
+        """
+        base_total = sum(self.base_charges.values())
+        rows = []
+        for name, transformations in scenarios.items():
+            charges = price_tariff(self.aggregates(transformations), self.tariff, self.voltage_type)
+            total = sum(charges.values())
+            rows.append({
+                'scenario': name,
+                **{charge: charges[charge] - self.base_charges[charge] for charge in charges},
+                'total': total,
+                'delta': total - base_total,
+            })
+        columns = ['scenario', *self.base_charges, 'total', 'delta']
+        return pd.DataFrame(rows, columns=columns).set_index('scenario')
@@ -118,6 +118,8 @@ coe_tariff_schema = {
         "period_end",
         "expires",
         "meta",
+        "meter_voltage_types",
+        "vat_rate",
         "charges",
     ],
     "properties": {
@@ -155,9 +157,10 @@ coe_tariff_schema = {
         },
         "tariff_map": {
             "$id": "#/properties/tariff_map",
-            "type": "array",
+            "type": ["array", "object"],
             "title": "The tariff_map schema",
-            "description": "An explanation about the purpose of this instance.",
+            "description": "The time-of-use map of the tariff, empty for the default map.",
+            "required": ["high_demand_months"],
             "default": [],
             "examples": [[]],
             "additionalItems": True,
@@ -225,6 +228,28 @@ coe_tariff_schema = {
             "default": "",
             "examples": ["2021-06-30"],
         },
+        "currency_symbol": {
+            "$id": "#/properties/currency_symbol",
+            "type": "string",
+            "title": "The currency_symbol schema",
+            "default": "",
+            "examples": ["R"],
+        },
+        "vat_rate": {
+            "$id": "#/properties/vat_rate",
+            "type": "number",
+            "title": "The vat_rate schema",
+            "minimum": 0,
+            "examples": [0.15],
+        },
+        "meter_voltage_types": {
+            "$id": "#/properties/meter_voltage_types",
+            "type": "array",
+            "title": "The meter_voltage_types schema",
+            "description": "The voltage types every charge has rates for.",
+            "minItems": 1,
+            "items": {"type": "string"},
+        },
         "meta": {
             "$id": "#/properties/meta",
             "type": "object",
@@ -335,251 +360,92 @@ coe_tariff_schema = {
             "additionalItems": True,
             "items": {
                 "$id": "#/properties/charges/items",
-                "anyOf": [
-                    {
-                        "$id": "#/properties/charges/items/anyOf/0",
-                        "type": "object",
-                        "title": "The first anyOf schema",
-                        "description": "An explanation about the purpose of this instance.",
-                        "default": {},
-                        "examples": [
-                            {
-                                "name": "fixed_charge",
-                                "rate_billing_type": "per_month",
-                                "types": {
-                                    "230_400_V": 2273.82,
-                                    "LESS_11KV_230_400_V": 3227.17,
-                                },
-                            }
+                "type": "object",
+                "title": "The charge schema",
+                "description": "A charge with its rates by meter voltage type, and by season and period where they vary.",
+                "default": {},
+                "required": ["name", "rate_billing_type", "types"],
+                "properties": {
+                    "name": {
+                        "$id": "#/properties/charges/items/properties/name",
+                        "type": "string",
+                        "enum": [
+                            "fixed_charge",
+                            "internet_based_consumption_display",
+                            "demand_charge",
+                            "network_access_charge",
+                            "energy_charge",
                         ],
-                        "required": ["name", "rate_billing_type", "types"],
-                        "properties": {
-                            "name": {
-                                "$id": "#/properties/charges/items/anyOf/0/properties/name",
-                                "type": "string",
-                                "title": "The name schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": "",
-                                "examples": ["fixed_charge"],
-                            },
-                            "rate_billing_type": {
-                                "$id": "#/properties/charges/items/anyOf/0/properties/rate_billing_type",
-                                "type": "string",
-                                "title": "The rate_billing_type schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": "",
-                                "examples": ["per_month"],
-                            },
-                            "types": {
-                                "$id": "#/properties/charges/items/anyOf/0/properties/types",
-                                "type": "object",
-                                "title": "The types schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": {},
-                                "examples": [
-                                    {
-                                        "230_400_V": 2273.82,
-                                        "LESS_11KV_230_400_V": 3227.17,
-                                    }
-                                ],
-                                "required": ["230_400_V", "LESS_11KV_230_400_V"],
-                                "properties": {
-                                    "230_400_V": {
-                                        "$id": "#/properties/charges/items/anyOf/0/properties/types/properties/230_400_V",
-                                        "type": "number",
-                                        "title": "The 230_400_V schema",
-                                        "description": "An explanation about the purpose of this instance.",
-                                        "default": 0.0,
-                                        "examples": [2273.82],
-                                    },
-                                    "LESS_11KV_230_400_V": {
-                                        "$id": "#/properties/charges/items/anyOf/0/properties/types/properties/LESS_11KV_230_400_V",
-                                        "type": "number",
-                                        "title": "The LESS_11KV_230_400_V schema",
-                                        "description": "An explanation about the purpose of this instance.",
-                                        "default": 0.0,
-                                        "examples": [3227.17],
-                                    },
-                                },
-                                "additionalProperties": True,
-                            },
-                        },
-                        "additionalProperties": True,
                     },
+                    "rate_billing_type": {
+                        "$id": "#/properties/charges/items/properties/rate_billing_type",
+                        "type": "string",
+                    },
+                    "types": {"$id": "#/properties/charges/items/properties/types", "type": "object"},
+                    "base_rate": {"$id": "#/properties/charges/items/properties/base_rate", "type": "object"},
+                },
+                "allOf": [
                     {
-                        "$id": "#/properties/charges/items/anyOf/1",
-                        "type": "object",
-                        "title": "The second anyOf schema",
-                        "description": "An explanation about the purpose of this instance.",
-                        "default": {},
-                        "examples": [
-                            {
-                                "name": "demand_charge",
-                                "rate_billing_type": "per_max_kva_per_month",
-                                "types": {
-                                    "high_demand": {
-                                        "230_400_V": 168.48,
-                                        "LESS_11KV_230_400_V": 165.46,
-                                        "230_400_V_DIRECT": 162.44,
-                                    },
-                                    "low_demand": {
-                                        "230_400_V": 140.4,
-                                        "LESS_11KV_230_400_V": 137.91,
-                                        "230_400_V_DIRECT": 135.37,
-                                    },
-                                },
-                                "base_rate": {},
+                        "if": {
+                            "properties": {
+                                "name": {
+                                    "enum": ["fixed_charge", "internet_based_consumption_display", "network_access_charge"]
+                                }
                             }
-                        ],
-                        "required": ["name", "rate_billing_type", "types", "base_rate"],
-                        "properties": {
-                            "name": {
-                                "$id": "#/properties/charges/items/anyOf/1/properties/name",
-                                "type": "string",
-                                "title": "The name schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": "",
-                                "examples": ["demand_charge"],
-                            },
-                            "rate_billing_type": {
-                                "$id": "#/properties/charges/items/anyOf/1/properties/rate_billing_type",
-                                "type": "string",
-                                "title": "The rate_billing_type schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": "",
-                                "examples": ["per_max_kva_per_month"],
-                            },
-                            "types": {
-                                "$id": "#/properties/charges/items/anyOf/1/properties/types",
-                                "type": "object",
-                                "title": "The types schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": {},
-                                "examples": [
-                                    {
-                                        "high_demand": {
-                                            "230_400_V": 168.48,
-                                            "LESS_11KV_230_400_V": 165.46,
-                                            "230_400_V_DIRECT": 162.44,
-                                        },
-                                        "low_demand": {
-                                            "230_400_V": 140.4,
-                                            "LESS_11KV_230_400_V": 137.91,
-                                            "230_400_V_DIRECT": 135.37,
-                                        },
-                                    }
-                                ],
-                                "required": ["high_demand", "low_demand"],
-                                "properties": {
-                                    "high_demand": {
-                                        "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/high_demand",
-                                        "type": "object",
-                                        "title": "The high_demand schema",
-                                        "description": "An explanation about the purpose of this instance.",
-                                        "default": {},
-                                        "examples": [
-                                            {
-                                                "230_400_V": 168.48,
-                                                "LESS_11KV_230_400_V": 165.46,
-                                                "230_400_V_DIRECT": 162.44,
-                                            }
-                                        ],
-                                        "required": [
-                                            "230_400_V",
-                                            "LESS_11KV_230_400_V",
-                                            "230_400_V_DIRECT",
-                                        ],
-                                        "properties": {
-                                            "230_400_V": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/high_demand/properties/230_400_V",
-                                                "type": "number",
-                                                "title": "The 230_400_V schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [168.48],
-                                            },
-                                            "LESS_11KV_230_400_V": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/high_demand/properties/LESS_11KV_230_400_V",
-                                                "type": "number",
-                                                "title": "The LESS_11KV_230_400_V schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [165.46],
-                                            },
-                                            "230_400_V_DIRECT": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/high_demand/properties/230_400_V_DIRECT",
-                                                "type": "number",
-                                                "title": "The 230_400_V_DIRECT schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [162.44],
-                                            },
-                                        },
-                                        "additionalProperties": True,
-                                    },
-                                    "low_demand": {
-                                        "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/low_demand",
-                                        "type": "object",
-                                        "title": "The low_demand schema",
-                                        "description": "An explanation about the purpose of this instance.",
-                                        "default": {},
-                                        "examples": [
-                                            {
-                                                "230_400_V": 140.4,
-                                                "LESS_11KV_230_400_V": 137.91,
-                                                "230_400_V_DIRECT": 135.37,
-                                            }
-                                        ],
-                                        "required": [
-                                            "230_400_V",
-                                            "LESS_11KV_230_400_V",
-                                            "230_400_V_DIRECT",
-                                        ],
-                                        "properties": {
-                                            "230_400_V": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/low_demand/properties/230_400_V",
-                                                "type": "number",
-                                                "title": "The 230_400_V schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [140.4],
-                                            },
-                                            "LESS_11KV_230_400_V": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/low_demand/properties/LESS_11KV_230_400_V",
-                                                "type": "number",
-                                                "title": "The LESS_11KV_230_400_V schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [137.91],
-                                            },
-                                            "230_400_V_DIRECT": {
-                                                "$id": "#/properties/charges/items/anyOf/1/properties/types/properties/low_demand/properties/230_400_V_DIRECT",
-                                                "type": "number",
-                                                "title": "The 230_400_V_DIRECT schema",
-                                                "description": "An explanation about the purpose of this instance.",
-                                                "default": 0.0,
-                                                "examples": [135.37],
-                                            },
-                                        },
-                                        "additionalProperties": True,
-                                    },
-                                },
-                                "additionalProperties": True,
-                            },
-                            "base_rate": {
-                                "$id": "#/properties/charges/items/anyOf/1/properties/base_rate",
-                                "type": "object",
-                                "title": "The base_rate schema",
-                                "description": "An explanation about the purpose of this instance.",
-                                "default": {},
-                                "examples": [{}],
-                                "required": [],
-                                "additionalProperties": True,
-                            },
                         },
-                        "additionalProperties": True,
+                        "then": {"properties": {"types": {"$ref": "#/definitions/voltage_rates"}}},
+                    },
+                    {
+                        "if": {"properties": {"name": {"const": "demand_charge"}}},
+                        "then": {"properties": {"types": {"$ref": "#/definitions/seasonal_voltage_rates"}}},
+                    },
+                    {
+                        "if": {"properties": {"name": {"const": "energy_charge"}}},
+                        "then": {"properties": {"types": {"$ref": "#/definitions/seasonal_period_rates"}}},
                     },
                 ],
+                "additionalProperties": True,
+            },
+        },
+    },
+    "definitions": {
+        "rate": {"type": "number", "minimum": 0},
+        "voltage_rates": {
+            "type": "object",
+            "minProperties": 1,
+            "additionalProperties": {"$ref": "#/definitions/rate"},
+        },
+        "period_rates": {
+            "type": "object",
+            "required": ["peak", "standard", "off_peak"],
+            "properties": {
+                "peak": {"$ref": "#/definitions/rate"},
+                "standard": {"$ref": "#/definitions/rate"},
+                "off_peak": {"$ref": "#/definitions/rate"},
+            },
+        },
+        "seasonal_voltage_rates": {
+            "type": "object",
+            "required": ["high_demand", "low_demand"],
+            "properties": {
+                "high_demand": {"$ref": "#/definitions/voltage_rates"},
+                "low_demand": {"$ref": "#/definitions/voltage_rates"},
+            },
+        },
+        "seasonal_period_rates": {
+            "type": "object",
+            "required": ["high_demand", "low_demand"],
+            "properties": {
+                "high_demand": {
+                    "type": "object",
+                    "minProperties": 1,
+                    "additionalProperties": {"$ref": "#/definitions/period_rates"},
+                },
+                "low_demand": {
+                    "type": "object",
+                    "minProperties": 1,
+                    "additionalProperties": {"$ref": "#/definitions/period_rates"},
+                },
             },
         },
     },
@@ -195,6 +195,7 @@ tariff_a = {
     "country": "SA",
     "period_start": "2020-07-01",
     "period_end": "2021-06-30",
+    "expires": "2021-06-30",
     "meta": {
         "description": "Small business only",
         "description_extra": "This tariff will suit low consumption micro business customers "
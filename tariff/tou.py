@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from tariff.constants import HIGH_DEMAND, LOW_DEMAND, OFF_PEAK, PEAK, STANDARD
+
+# Axis labels of the time-of-use lookup table, the position of a label is its code
+SEASONS = (LOW_DEMAND, HIGH_DEMAND)
+PERIODS = (OFF_PEAK, PEAK, STANDARD)
+
+# Day types: holidays and Sundays are billed as off peak all day
+WEEKDAY = 0
+HOLIDAY = 1
+
+SLOTS_PER_HOUR = 2
+SLOTS_PER_DAY = 24 * SLOTS_PER_HOUR
+
+# Weekdays of the period grid, Monday is 0
+DAYS_PER_WEEK = 7
+SUNDAY = 6
+
+# Period grids by id of their map, with the map kept so a reused id is detected
+_grids = {}
+
+
+def build_tou_table(tariff_map):
+    """
+    Builds the period lookup table of a tariff map.
+
+    Parameters:
+        tariff_map (dict): A time-of-use map such as `coe_tariff_e_2020_2021`.
+
+    Returns:
+        np.ndarray: Period codes (index into PERIODS) shaped (season, day type, hour, half-hour slot).
+    """
+    table = np.empty((len(SEASONS), 2, 24, SLOTS_PER_HOUR), dtype=np.int8)
+    for s, season in enumerate(SEASONS):
+        for hour, slots in tariff_map[season].items():
+            for slot, period in slots.items():
+                table[s, WEEKDAY, int(hour), int(slot)] = PERIODS.index(period)
+
+    table[:, HOLIDAY] = PERIODS.index(OFF_PEAK)
+    return table
+
+
+def build_tou_grid(tariff_map):
+    """
+    Builds the period grid of a tariff map.
+
+    Returns:
+        np.ndarray: Period codes (index into PERIODS) shaped (season, weekday, half-hour slot of
+        the day), Sundays off peak.
+    """
+    table = build_tou_table(tariff_map)
+    weekday = table[:, WEEKDAY].reshape(len(SEASONS), SLOTS_PER_DAY)
+    grid = np.repeat(weekday[:, np.newaxis, :], DAYS_PER_WEEK, axis=1)
+    grid[:, SUNDAY] = PERIODS.index(OFF_PEAK)
+    return grid
+
+
+def tou_grid(tariff_map):
+    """Returns the read-only period grid of a tariff map, built once per map."""
+    entry = _grids.get(id(tariff_map))
+    if entry is None or entry[0] is not tariff_map:
+        grid = build_tou_grid(tariff_map)
+        grid.flags.writeable = False
+        entry = _grids[id(tariff_map)] = (tariff_map, grid)
+    return entry[1]
+
+
+def season_codes(months, high_demand_months):
+    """Returns the season code (index into SEASONS) of every month number."""
+    return season_lookup(high_demand_months)[months]
+
+
+def season_lookup(high_demand_months):
+    """Returns the season code of every month number, indexed by month number 1 to 12."""
+    lookup = np.zeros(13, dtype=np.int8)
+    lookup[list(high_demand_months)] = SEASONS.index(HIGH_DEMAND)
+    return lookup
+
+
+def classify_codes(dates, grid, seasons, holidays=()):
+    """
+    Classifies every timestamp into season and period codes with array lookups.
+
+    Parameters:
+        dates (pd.Series or pd.DatetimeIndex): The interval timestamps, without missing values.
+        grid (np.ndarray): A period grid of `build_tou_grid`.
+        seasons (np.ndarray): The season code of every month number, see `season_lookup`.
+        holidays (list): Dates billed as off peak all day, in addition to Sundays.
+
+    Returns:
+        tuple: Arrays of season codes and period codes, aligned with `dates`.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)  # classify on local wall time
+
+    # Calendar fields straight from the datetime64 values, cheaper than the pandas accessors
+    values = dates.values
+    minutes = values.astype("datetime64[m]").astype(np.int64)
+    days = minutes // (24 * 60)
+    months = values.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    weekdays = (days + 3) % DAYS_PER_WEEK  # 1970-01-01 was a Thursday
+    slots = minutes % (24 * 60) * SLOTS_PER_HOUR // 60
+
+    season = seasons[months]
+    period = grid[season, weekdays, slots]
+
+    holiday_days = pd.DatetimeIndex(holidays).values.astype("datetime64[D]").astype(np.int64)
+    if len(holiday_days):
+        period = np.where(np.isin(days, holiday_days), PERIODS.index(OFF_PEAK), period).astype(np.int8)
+    return season, period
+
+
+def classify_tou(dates, tariff_map, holidays=()):
+    """
+    Classifies every timestamp into a season and a time-of-use period with array lookups.
+
+    Parameters:
+        dates (pd.Series or pd.DatetimeIndex): The interval timestamps, without missing values.
+        tariff_map (dict): A time-of-use map such as `coe_tariff_e_2020_2021`.
+        holidays (list): Dates billed as off peak all day, in addition to Sundays.
+
+    Returns:
+        tuple: Arrays of season labels and period labels, aligned with `dates`.
+    """
+    season, period = classify_codes(dates, tou_grid(tariff_map), season_lookup(tariff_map["high_demand_months"]),
+                                    holidays)
+
+    season_labels = np.array(SEASONS, dtype=object)[season]
+    period_labels = np.array(PERIODS, dtype=object)[period]
+    return season_labels, period_labels
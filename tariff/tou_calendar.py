@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+from tariff.compiled import compile_tariff
+from tariff.loader import tariff_hash
+from tariff.tou import OFF_PEAK, PERIODS, SEASONS
+
+MINUTES_PER_DAY = 24 * 60
+
+# Calendars by (tariff content hash, resolution in minutes, year)
+_calendars = {}
+
+
+class TouCalendar:
+    """
+    The season and period of every slot of one year at a fixed resolution, under the tariff
+    map of a tariff. A slot is labelled by the period of its start, so at resolutions of 30
+    minutes or less every slot lies within one half-hour of the map.
+
+    :param code tariff code
+    :param resolution slot length in minutes
+    :param year calendar year
+    :param starts start of every slot, datetime64[ns], increasing
+    :param seasons season code of every slot, see `tariff.tou.SEASONS`
+    :param periods period code of every slot, see `tariff.tou.PERIODS`, Sundays off peak
+    """
+
+    def __init__(self, code, resolution, year, starts, seasons, periods):
+        self.code = code
+        self.resolution = resolution
+        self.year = year
+        self.starts = starts
+        self.seasons = seasons
+        self.periods = periods
+        for values in (starts, seasons, periods):
+            values.flags.writeable = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.code!r}, {self.resolution}min, {self.year})"
+
+    @classmethod
+    def build(cls, tariff, resolution, year):
+        """Materializes the calendar of a tariff for one year."""
+        compiled = compile_tariff(tariff)
+        starts = np.arange(np.datetime64(f"{year}-01-01", 'm'), np.datetime64(f"{year + 1}-01-01", 'm'),
+                           np.timedelta64(resolution, 'm')).astype('datetime64[ns]')
+        seasons, periods = compiled.classify(starts)
+        return cls(compiled.code, resolution, year, starts, seasons, periods)
+
+
+def slot_minutes(resolution):
+    """
+    Returns a resolution in whole minutes, from minutes or a pandas frequency such as '15min'.
+    Raises ValueError unless the slots tile a day.
+    """
+    minutes = resolution if isinstance(resolution, (int, np.integer)) else pd.Timedelta(resolution) / pd.Timedelta('1min')
+    if minutes != int(minutes) or minutes <= 0 or MINUTES_PER_DAY % int(minutes):
+        raise ValueError(f"Resolution {resolution} does not divide a day into whole-minute slots")
+    return int(minutes)
+
+
+def tou_calendar(tariff, resolution=30, year=None):
+    """
+    Returns the calendar of a tariff for one year, materialized once per tariff content,
+    resolution and year, see `tariff.loader.tariff_hash`.
+    """
+    minutes = slot_minutes(resolution)
+    key = (tariff_hash(tariff), minutes, int(year))
+    calendar = _calendars.get(key)
+    if calendar is None:
+        calendar = _calendars[key] = TouCalendar.build(tariff, minutes, int(year))
+    return calendar
+
+
+def clear_calendars():
+    """Drops the materialized calendars, to free the slots of tariffs no longer billed."""
+    _calendars.clear()
+
+
+def calendar_codes(dates, tariff, resolution=30, holidays=()):
+    """
+    Assigns the season and period codes of the calendar slot every timestamp falls in, with
+    one `searchsorted` over the calendars of the years spanned by the timestamps.
+
+    Parameters:
+        dates (pd.Series or pd.DatetimeIndex): The interval timestamps, without missing values.
+        tariff (dict): The tariff, its tariff map or the default map labels the slots.
+        resolution (int or str): Slot length in minutes or as a pandas frequency, such as '5min'.
+        holidays (list): Dates billed as off peak all day, in addition to Sundays.
+
+    Returns:
+        tuple: Arrays of season codes and period codes, aligned with `dates`.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)  # label on local wall time
+    values = dates.values
+    if not len(values):
+        return np.array([], dtype=np.int8), np.array([], dtype=np.int8)
+
+    years = np.unique(values.astype('datetime64[Y]').astype(np.int64)) + 1970
+    calendars = [tou_calendar(tariff, resolution, year) for year in years]
+    if len(calendars) == 1:
+        starts, seasons, periods = calendars[0].starts, calendars[0].seasons, calendars[0].periods
+    else:
+        # Years start on a slot boundary, so a timestamp never lands in the slots of another year
+        starts = np.concatenate([calendar.starts for calendar in calendars])
+        seasons = np.concatenate([calendar.seasons for calendar in calendars])
+        periods = np.concatenate([calendar.periods for calendar in calendars])
+
+    positions = np.searchsorted(starts, values, side='right') - 1
+    season, period = seasons[positions], periods[positions]
+
+    holiday_days = pd.DatetimeIndex(holidays).values.astype('datetime64[D]')
+    if len(holiday_days):
+        period = np.where(np.isin(values.astype('datetime64[D]'), holiday_days), PERIODS.index(OFF_PEAK),
+                          period).astype(np.int8)
+    return season, period
+
+
+def calendar_labels(dates, tariff, resolution=30, holidays=()):
+    """Returns the season and period labels of every timestamp, see `calendar_codes`."""
+    season, period = calendar_codes(dates, tariff, resolution, holidays)
+    return np.array(SEASONS, dtype=object)[season], np.array(PERIODS, dtype=object)[period]
@@ -0,0 +1,170 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+
+DEFAULT_FILE_PATH = './ncp-data.xlsx'
+
+# Upper bounds for the in-memory workbook cache
+MAX_CACHED_WORKBOOKS = 8
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def read_file_bytes(file_obj=None):
+    """
+    Returns the raw bytes of an uploaded file, or of the default file when no file is given.
+
+    The stream is rewound first, so the same upload can be read on every Streamlit rerun.
+
+    Parameters:
+        file_obj (file object): The file object of the Excel file.
+
+    Returns:
+        bytes: The file content.
+    """
+    if file_obj is None:
+        with open(DEFAULT_FILE_PATH, 'rb') as f:
+            return f.read()
+
+    # BytesIO and Streamlit's UploadedFile expose the whole buffer without moving the cursor
+    if hasattr(file_obj, 'getvalue'):
+        return file_obj.getvalue()
+
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    return file_obj.read()
+
+
+def content_hash(data):
+    """Returns the hex digest used to key cached files by content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def resolve_sheet_name(sheet_names, sheet):
+    """Resolves a sheet index or name to the sheet name, raising if the workbook has no such sheet."""
+    if isinstance(sheet, int):
+        if not 0 <= sheet < len(sheet_names):
+            raise IndexError(f"Worksheet index {sheet} is invalid, {len(sheet_names)} worksheets found")
+        return sheet_names[sheet]
+
+    if sheet not in sheet_names:
+        raise KeyError(f"Worksheet named '{sheet}' not found")
+    return sheet
+
+
+class Workbook:
+    """
+    Every sheet of an Excel file, read in a single pass.
+
+    :param key content hash of the file bytes
+    :param sheets dict of sheet name to the raw DataFrame of that sheet
+    """
+
+    def __init__(self, key, sheets):
+        self.key = key
+        self.sheets = sheets
+        self.sheet_names = list(sheets)
+        self.nbytes = sum(int(df.memory_usage(deep=True).sum()) for df in sheets.values())
+
+    @classmethod
+    def from_bytes(cls, data, key=None):
+        """Opens the workbook once and reads all sheets, using the first column as the index."""
+        sheets = pd.read_excel(BytesIO(data), sheet_name=None, index_col=0, engine='openpyxl')
+        return cls(key or content_hash(data), sheets)
+
+    def __len__(self):
+        return len(self.sheet_names)
+
+    def sheet_name(self, sheet):
+        """Resolves a sheet index or name to the sheet name."""
+        return resolve_sheet_name(self.sheet_names, sheet)
+
+    def sheet(self, sheet=0):
+        """
+        Returns a copy of a raw sheet, so callers can add and rename columns freely.
+
+        Parameters:
+            sheet (str or int): The name or index of the sheet.
+
+        Returns:
+            pd.DataFrame: The unparsed sheet data.
+        """
+        return self.sheets[self.sheet_name(sheet)].copy()
+
+
+class WorkbookCache:
+    """
+    LRU cache of workbooks keyed by the content hash of the file bytes.
+
+    Least recently used workbooks are evicted once either the number of workbooks or their
+    combined in-memory size goes over the limit. The most recent workbook is always kept.
+    """
+
+    def __init__(self, max_items=MAX_CACHED_WORKBOOKS, max_bytes=MAX_CACHE_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def nbytes(self):
+        return sum(wb.nbytes for wb in self._items.values())
+
+    def get(self, key):
+        with self._lock:
+            workbook = self._items.get(key)
+            if workbook is not None:
+                self._items.move_to_end(key)
+            return workbook
+
+    def put(self, workbook):
+        with self._lock:
+            self._items[workbook.key] = workbook
+            self._items.move_to_end(workbook.key)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def _evict(self):
+        while len(self._items) > 1 and (len(self._items) > self.max_items or self.nbytes > self.max_bytes):
+            self._items.popitem(last=False)
+
+    def load(self, file_obj=None):
+        """
+        Returns the workbook for a file, reading it only if its content has not been seen before.
+
+        Parameters:
+            file_obj (file object): The file object of the Excel file, the default file is used if None.
+
+        Returns:
+            Workbook: The workbook with every sheet loaded.
+        """
+        return self.load_bytes(read_file_bytes(file_obj))
+
+    def load_bytes(self, data, key=None):
+        """Returns the workbook for file bytes, `key` is their content hash if already known."""
+        key = key or content_hash(data)
+
+        workbook = self.get(key)
+        if workbook is None:
+            workbook = Workbook.from_bytes(data, key=key)
+            self.put(workbook)
+        return workbook
+
+
+workbook_cache = WorkbookCache()
+
+
+def load_workbook(file_obj=None):
+    """Loads a workbook through the shared cache."""
+    return workbook_cache.load(file_obj)
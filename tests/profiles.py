@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from tariff.tariff_maps import tariff_intervals
+from tariff.tou import classify_tou
+
+
+def billing_frame(dates, kw, kva):
+    """A consumption frame as billed by TariffCalculator, classified on the default tariff map."""
+    dates = pd.DatetimeIndex(dates)
+    season, period = classify_tou(dates, tariff_intervals)
+    return pd.DataFrame({
+        'date': dates,
+        'kw': np.asarray(kw, dtype=float),
+        'kva': np.asarray(kva, dtype=float),
+        'month': dates.month,
+        'season': season,
+        'period': period,
+    })
+
+
+def charge(tariff, name):
+    return next(charge for charge in tariff["charges"] if charge["name"] == name)
+
+
+def profile(meter, start, kw, freq="30min"):
+    """Long-format interval data of one meter, as billed by `bill_meters`, kVA a tenth above kW."""
+    dates = pd.date_range(start, periods=len(kw), freq=freq)
+    return pd.DataFrame({'meter': meter, 'date': dates, 'kw': kw, 'kva': [value * 1.1 for value in kw]})
@@ -0,0 +1,40 @@
+from io import BytesIO
+
+import pandas as pd
+
+
+def make_sheet(rows=4, kw=None):
+    """A raw sheet as exported by the meters: an unnamed index column and half-hourly text dates."""
+    dates = pd.date_range("2023-07-03 07:00", periods=rows, freq="30min")
+    return pd.DataFrame({
+        'Date': dates.strftime('%d/%m/%Y %H:%M'),
+        'HEX': 800000,
+        'KW': kw if kw is not None else [0.5] * rows,
+        'KVAR': [0.25] * rows,
+        'KVA': [0.75] * rows,
+    })
+
+
+def to_xlsx(df):
+    buffer = BytesIO()
+    df.to_excel(buffer, engine='openpyxl')
+    buffer.seek(0)
+    buffer.name = 'meter.xlsx'
+    return buffer
+
+
+def to_csv(df):
+    buffer = BytesIO(df.to_csv(index=False).encode())
+    buffer.name = 'meter.csv'
+    return buffer
+
+
+def to_workbook(sheets):
+    """An Excel upload with a sheet per frame, by sheet name."""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name)
+    buffer.seek(0)
+    buffer.name = 'meters.xlsx'
+    return buffer
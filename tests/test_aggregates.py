@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from tariff.aggregates import interval_hours, kw_to_kwh, rolling_max
+from tariff.constants import DEFAULT_INTERVAL_HOURS
+
+
+def test_kw_to_kwh_uses_the_interval_of_the_timestamps():
+    dates = pd.Series(pd.date_range("2023-07-01", periods=4, freq="15min"))
+
+    np.testing.assert_allclose(kw_to_kwh(pd.Series([4.0, 8.0, 0.0, 2.0]), dates), [1.0, 2.0, 0.0, 0.5])
+
+
+def test_interval_hours_defaults_to_half_an_hour():
+    assert interval_hours() == DEFAULT_INTERVAL_HOURS
+    assert interval_hours(pd.DatetimeIndex(["2023-07-01", None])) == DEFAULT_INTERVAL_HOURS
+    assert interval_hours(pd.date_range("2023-07-01", periods=3, freq="h")) == 1.0
+
+
+def test_rolling_max_counts_missing_months_as_no_demand():
+    numbers = [0, 1, 13, 14]  # January and February of two years
+
+    assert rolling_max(numbers, [5.0, 1.0, 2.0, 3.0], months=12) == [5.0, 5.0, 2.0, 3.0]
+    assert rolling_max(numbers, [5.0, 1.0, 2.0, 3.0], months=14) == [5.0, 5.0, 5.0, 3.0]
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from tariff.batch import bill_meters, bill_summary
+from tariff.billing import TariffCalculator
+from tariff.constants import ChargeVoltageType
+from tariff.tariff_maps import tariff_c
+from tests.profiles import billing_frame, charge, profile
+
+VOLTAGE = ChargeVoltageType.ANY_230_400_V
+
+
+def line(bills, meter, name):
+    return bills[(bills['meter'] == meter) & (bills['charge'] == name)].iloc[0]
+
+
+def test_bill_meters_matches_the_tariff_calculator():
+    # A July Monday from the early morning into the morning peak
+    df = pd.concat([profile('Mtr1', "2023-07-03 05:00", [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]),
+                    profile('Mtr2', "2023-07-03 05:00", [5.0] * 6)], ignore_index=True)
+
+    bills = bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE), 'Mtr2': (tariff_c, VOLTAGE)})
+
+    one = df[df['meter'] == 'Mtr1']
+    calculator = TariffCalculator(VOLTAGE, tariff_c, billing_frame(one['date'], one['kw'], one['kva']))
+    energy = calculator.energy_charge(charge(tariff_c, "energy_charge"))
+    demand = calculator.demand_charge(charge(tariff_c, "demand_charge"))
+    assert line(bills, 'Mtr1', "Energy charge")['total'] == pytest.approx(energy['total'])
+    assert line(bills, 'Mtr1', "Energy charge")['units'] == pytest.approx(energy['units'])
+    assert line(bills, 'Mtr1', "Demand charge")['total'] == pytest.approx(demand['total'])
+    assert line(bills, 'Mtr2', "Energy charge")['units'] == pytest.approx(15.0)
+    assert set(bills['meter']) == {'Mtr1', 'Mtr2'}
+
+
+def test_bill_meters_uses_the_interval_of_the_timestamps():
+    df = profile('Mtr1', "2023-07-03 10:00", [4.0] * 4, freq="15min")
+
+    bills = bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE)})
+
+    assert line(bills, 'Mtr1', "Energy charge")['units'] == pytest.approx(4.0)
+
+
+def test_exact_bills_total_in_whole_cents():
+    df = profile('Mtr1', "2023-07-03 05:00", [10.3, 20.7, 30.1, 40.9])
+
+    bills = bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE)}, exact=True)
+    summary = bill_summary(bills, [tariff_c])
+
+    assert bills['total_cents'].dtype.kind == 'i'
+    assert (bills['total'] * 100).round().astype(int).tolist() == bills['total_cents'].tolist()
+    assert summary['total_cents'].iloc[0] == bills['total_cents'].sum()
+    assert summary['total'].iloc[0] == pytest.approx(
+        bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE)})['total'].sum(), abs=0.05)
+
+
+def test_bill_meters_bills_public_holidays_off_peak():
+    df = profile('Mtr1', "2023-06-16 07:00", [10.0] * 4)  # Youth Day, a Friday, in the morning peak
+
+    holiday = line(bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE)}), 'Mtr1', "Demand charge")
+    working_day = line(bill_meters(df, {'Mtr1': (tariff_c, VOLTAGE)}, holidays=()), 'Mtr1', "Demand charge")
+
+    assert holiday['units'] == 0.0
+    assert working_day['units'] == pytest.approx(11.0)
+
+
+def test_every_meter_is_billed_over_its_own_interval():
+    # Standard hours of a July Monday: a 15-minute meter, a 30-minute one and a 30-minute one
+    # read a quarter past
+    df = pd.concat([profile('Mtr1', "2023-07-03 10:00", [4.0] * 8, freq="15min"),
+                    profile('Mtr2', "2023-07-03 10:00", [10.0] * 4),
+                    profile('Mtr3', "2023-07-03 10:15", [10.0] * 4)], ignore_index=True)
+
+    bills = bill_meters(df, {meter: (tariff_c, VOLTAGE) for meter in ('Mtr1', 'Mtr2', 'Mtr3')})
+
+    assert line(bills, 'Mtr1', "Energy charge")['units'] == pytest.approx(8.0)
+    assert line(bills, 'Mtr2', "Energy charge")['units'] == pytest.approx(20.0)
+    assert line(bills, 'Mtr3', "Energy charge")['units'] == pytest.approx(20.0)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.battery import PeakShaving, battery_savings, dispatch
+from tariff.constants import ChargeVoltageType
+from tariff.scenarios import ScenarioEngine
+from tariff.tariff_maps import tariff_c
+from tests.profiles import profile
+
+VOLTAGE = ChargeVoltageType.ANY_230_400_V
+
+
+def naive_dispatch(need, room, power_kw, energy_kwh, efficiency, hours, initial_soc):
+    """Walks the battery through the intervals one at a time."""
+    soc = initial_soc * energy_kwh
+    battery_kw, stored = [], []
+    for interval_need, interval_room in zip(need, room):
+        interval_need = min(max(interval_need, 0), power_kw)
+        if interval_need > 0:
+            delivered = min(interval_need * hours, soc)
+            soc -= delivered
+            battery_kw.append(delivered / hours)
+        else:
+            charged = min(min(max(interval_room, 0), power_kw) * hours * efficiency, energy_kwh - soc)
+            soc += charged
+            battery_kw.append(-charged / (hours * efficiency))
+        stored.append(soc)
+    return np.array(battery_kw), np.array(stored)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dispatch_matches_a_naive_loop(seed):
+    rng = np.random.default_rng(seed)
+    # Runs of need between runs of room, with some intervals of neither
+    need = np.where(rng.random(500) < 0.3, rng.uniform(-1, 40, 500), 0)
+    room = np.where(rng.random(500) < 0.6, rng.uniform(0, 40, 500), 0)
+    args = (25.0, 60.0, 0.9, 0.5, rng.uniform())
+
+    battery_kw, stored = dispatch(need, room, *args)
+
+    expected_kw, expected_stored = naive_dispatch(need, room, *args)
+    np.testing.assert_allclose(battery_kw, expected_kw, atol=1e-9)
+    np.testing.assert_allclose(stored, expected_stored, atol=1e-9)
+
+
+def test_dispatch_without_a_need_keeps_a_full_battery_idle():
+    battery_kw, stored = dispatch(np.zeros(4), np.full(4, 10.0), 5.0, 20.0)
+
+    assert list(battery_kw) == [0.0] * 4
+    assert list(stored) == [20.0] * 4
+
+
+def site(months):
+    """Weekdays of a load of 100 kW from 06:00 to 20:00, 40 kW otherwise, in the first week of some months."""
+    frames = []
+    for month in months:
+        dates = pd.date_range(f"2023-{month:02d}-02", periods=7 * 48, freq="30min")
+        frames.append(profile('site', dates[0], [100.0 if 6 <= date.hour < 20 else 40.0 for date in dates]))
+    return pd.concat(frames, ignore_index=True).drop(columns='meter')
+
+
+def test_battery_savings_shave_the_demand_charge():
+    engine = ScenarioEngine(site([7]), tariff_c, VOLTAGE)
+    battery = PeakShaving(power_kw=20.0, energy_kwh=400.0, cap_kva=100.0, efficiency=1.0)
+
+    shaved, savings = battery_savings(engine, battery)
+
+    assert shaved['kva'][shaved['battery_kw'] > 0].max() == pytest.approx(100.0)
+    assert savings["Demand charge"] > 0
+    assert savings['total'] == pytest.approx(-engine.evaluate({'battery': [battery]}).loc['battery', 'delta'])
+    assert shaved['stored_kwh'].between(0, 400.0).all()
+
+
+def test_battery_starts_every_run_of_months_charged():
+    engine = ScenarioEngine(site(range(1, 8)), tariff_c, VOLTAGE)
+    # Too small to last a day, so it is empty at the end of January
+    battery = PeakShaving(power_kw=50.0, energy_kwh=30.0, cap_kva=90.0, charge_periods=(), months=(1, 7))
+
+    shaved = engine.profile([battery])
+
+    months = shaved['date'].dt.month
+    assert shaved['stored_kwh'][months == 1].iloc[-1] == 0.0
+    assert shaved['battery_kw'][months == 7].sum() * 0.5 == pytest.approx(30.0)
+    assert (shaved['battery_kw'][months.between(2, 6)] == 0).all()
@@ -0,0 +1,149 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.billing import TariffCalculator, get_tariff_type
+from tariff.constants import HIGH_DEMAND, LOW_DEMAND, OFF_PEAK, PEAK, STANDARD, ChargeVoltageType
+from tariff.tariff_maps import tariff_c, tariff_intervals
+from tests.profiles import billing_frame, charge
+
+VOLTAGE = ChargeVoltageType.ANY_230_400_V
+
+
+def monthly_peaks(months, kva):
+    """One peak interval, Monday 08:00, of every month from January 2022."""
+    starts = pd.date_range("2022-01-01", periods=months, freq="MS")
+    dates = [start + pd.offsets.Week(weekday=0) + pd.Timedelta(hours=8) for start in starts]
+    return billing_frame(dates, kva, kva)
+
+
+def test_network_access_charge_bills_the_highest_kva_of_the_last_12_months():
+    kva = [500.0] + [100.0 + month for month in range(1, 15)]  # 15 months, January 2022 the highest
+    df = monthly_peaks(15, kva)
+    assert set(df['period']) == {PEAK}
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).network_access_charge(charge(tariff_c, "network_access_charge"))
+
+    rate = charge(tariff_c, "network_access_charge")["types"][VOLTAGE]
+    assert item["units"] == 114.0
+    assert item["total"] == pytest.approx(rate * 114.0)
+    assert item["rate"] == rate
+    # January 2022 stays in the window up to December 2022
+    assert item["meta"]["2022-12"] == 500.0
+    assert item["meta"]["2023-01"] == 112.0
+    assert list(item["meta"]) == [f"{date:%Y-%m}" for date in pd.date_range("2022-01", periods=15, freq="MS")]
+
+
+def test_network_access_charge_skips_months_without_demand():
+    df = monthly_peaks(14, [300.0] + [50.0] * 13)
+    df = df[df['date'] >= "2022-02-01"]  # the 13 months from February 2022, under the January peak
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).network_access_charge(charge(tariff_c, "network_access_charge"))
+
+    assert item["units"] == 50.0
+
+
+def test_network_access_charge_is_zero_without_demand_intervals():
+    df = billing_frame(pd.to_datetime(["2023-07-03 03:00", "2023-07-09 07:00"]), kw=[5.0] * 2, kva=[9.0] * 2)
+    calculator = TariffCalculator(VOLTAGE, tariff_c, df)
+
+    item = calculator.network_access_charge(charge(tariff_c, "network_access_charge"))
+
+    assert item["units"] == 0.0
+    assert item["total"] == 0.0
+    assert item["meta"] == {}
+    assert calculator.demand_charge(charge(tariff_c, "demand_charge"))["total"] == 0.0
+
+
+def test_energy_charge_matches_a_hand_computed_sum():
+    # Monday in July: off peak, standard and peak hours, then a Sunday which is off peak all day
+    dates = pd.to_datetime(["2023-07-03 03:00", "2023-07-03 10:00", "2023-07-03 07:30", "2023-07-03 07:00",
+                            "2023-07-09 07:00"])
+    # Without timestamps the intervals are half an hour
+    df = billing_frame(dates, kw=[10.0, 20.0, 30.0, 40.0, 50.0], kva=[1.0] * 5).drop(columns='date')
+    rates = charge(tariff_c, "energy_charge")["types"]
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).energy_charge(charge(tariff_c, "energy_charge"))
+
+    hours = 0.5
+    expected = sum(kw * hours * rates[season][VOLTAGE][period]
+                   for kw, season, period in zip(df['kw'], df['season'], df['period']))
+    assert list(df['period']) == [OFF_PEAK, STANDARD, PEAK, PEAK, OFF_PEAK]
+    assert item["total"] == pytest.approx(expected)
+    assert item["units"] == pytest.approx(150.0 * hours)
+    assert item["meta"][PEAK]["kwh"] == pytest.approx(70.0 * hours)
+    assert item["meta"][OFF_PEAK]["price_per_kwh"] == pytest.approx(
+        60.0 * hours * rates[HIGH_DEMAND][VOLTAGE][OFF_PEAK])
+    assert item["meta"]["total"]["price_per_kwh"] == pytest.approx(expected)
+
+
+def test_energy_charge_uses_the_interval_of_the_data():
+    dates = pd.date_range("2023-07-03 10:00", periods=4, freq="15min")  # standard hours
+    df = billing_frame(dates, kw=[4.0] * 4, kva=[1.0] * 4)
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).energy_charge(charge(tariff_c, "energy_charge"))
+
+    assert item["units"] == pytest.approx(4.0)
+
+
+def test_demand_charge_bills_every_month_at_its_season_rate():
+    # July peak and off peak, January standard, March off peak only
+    dates = pd.to_datetime(["2023-07-03 07:00", "2023-07-03 03:00", "2024-01-08 10:00", "2024-03-04 03:00"])
+    df = billing_frame(dates, kw=[1.0] * 4, kva=[100.0, 500.0, 50.0, 80.0])
+    rates = charge(tariff_c, "demand_charge")["types"]
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).demand_charge(charge(tariff_c, "demand_charge"))
+
+    high, low = rates[HIGH_DEMAND][VOLTAGE], rates[LOW_DEMAND][VOLTAGE]
+    assert item["total"] == pytest.approx(100.0 * high + 50.0 * low)
+    assert item["units"] == 3
+    assert list(item["meta"]) == ["2023-07", "2024-01", "2024-03"]
+    assert item["meta"]["2023-07"]["kva"] == 100.0
+    assert item["meta"]["2024-01"]["season"] == LOW_DEMAND
+    assert item["meta"]["2024-03"]["total"] == 0.0
+
+
+def test_demand_charge_rate_is_the_numeric_average():
+    dates = pd.to_datetime(["2023-07-03 07:00", "2024-01-08 10:00"])
+    df = billing_frame(dates, kw=[1.0] * 2, kva=[100.0, 300.0])
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).demand_charge(charge(tariff_c, "demand_charge"))
+
+    assert isinstance(item["rate"], float)
+    assert item["rate"] == pytest.approx(item["total"] / 400.0)
+    assert item["rate_label"] == f"{round(item['rate'], 4)} (avg)"
+
+
+@pytest.mark.parametrize('date_time, period', [
+    ("2023-07-03 06:15", PEAK),  # a July Monday, 06:00 is peak in the high demand season
+    ("2023-01-09 06:15", STANDARD),  # and standard in the low demand season
+    ("2023-01-09 09:45", PEAK),
+    ("2023-07-09 07:00", OFF_PEAK),  # a Sunday
+    ("2023-06-16 07:00", OFF_PEAK),  # Youth Day, a Friday
+])
+def test_get_tariff_type(date_time, period):
+    assert get_tariff_type(pd.Timestamp(date_time).to_pydatetime(), tariff_intervals) == period
+
+
+def test_energy_charge_meta_skips_missing_readings():
+    dates = pd.date_range("2023-07-03 10:00", periods=3, freq="30min")  # standard hours
+    df = billing_frame(dates, kw=[4.0, np.nan, 6.0], kva=[1.0] * 3)
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).energy_charge(charge(tariff_c, "energy_charge"))
+
+    assert item["meta"][STANDARD]["kwh"] == pytest.approx(5.0)
+    assert item["meta"][PEAK] == {"kw": 0, "kwh": 0, "price_per_kwh": 0}
+    assert item["meta"]["total"]["price_per_kwh"] == pytest.approx(item["total"])
+
+
+def test_energy_charge_bills_at_the_rates_of_the_charge_passed():
+    dates = pd.date_range("2023-07-03 10:00", periods=2, freq="30min")  # standard hours
+    df = billing_frame(dates, kw=[4.0] * 2, kva=[1.0] * 2)
+    energy = copy.deepcopy(charge(tariff_c, "energy_charge"))
+    energy["types"][HIGH_DEMAND][VOLTAGE][STANDARD] = 10.0
+
+    item = TariffCalculator(VOLTAGE, tariff_c, df).energy_charge(energy)
+
+    assert item["total"] == pytest.approx(4.0 * 10.0)
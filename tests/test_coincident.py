@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff import coincident
+from tariff.coincident import CHECKPOINT_SUFFIX, CoincidentDemandAggregator, coincident_peaks, top_positions
+
+
+def readings(start, kva, freq="30min"):
+    return pd.DataFrame({'Date': pd.date_range(start, periods=len(kva), freq=freq), 'KVA': kva})
+
+
+def test_top_positions_ranks_every_group_with_ties_to_the_earliest():
+    values = np.array([1.0, 5.0, 5.0, np.nan, 2.0, 7.0, 3.0])
+    codes = np.array([0, 0, 0, 0, 1, 1, 1])
+
+    positions, ranks = top_positions(values, codes, 2)
+
+    assert list(positions) == [1, 2, 5, 6]
+    assert list(ranks) == [1, 2, 1, 2]
+
+
+def test_coincident_peaks_sums_the_meters_of_every_interval():
+    dates = pd.date_range("2023-07-03 07:00", periods=4, freq="30min")
+    meters = pd.DataFrame({'Mtr1': [1.0, 4.0, 2.0, np.nan], 'Mtr2': [1.0, 1.0, 5.0, 9.0]}, index=dates)
+
+    peaks = coincident_peaks(meters, n=2, by_period=False)
+
+    assert list(peaks['Date']) == [dates[3], dates[2]]
+    assert list(peaks['Total kVA']) == [9.0, 7.0]
+    assert list(peaks['Mtr1'].fillna(0)) == [0.0, 2.0]
+
+
+def test_aggregator_monthly_peaks_and_later_readings_replace_earlier_ones():
+    aggregator = CoincidentDemandAggregator()
+    aggregator.update('Mtr1', readings("2023-07-31 23:00", [1.0, 2.0, 3.0]))
+    aggregator.update('Mtr2', readings("2023-07-31 23:00", [1.0, 1.0, 1.0]))
+    aggregator.update('Mtr1', readings("2023-07-31 23:30", [8.0]))
+
+    peaks = aggregator.monthly_peaks()
+
+    assert list(zip(peaks['month'], peaks['Total kVA'])) == [(7, 9.0), (8, 4.0)]
+    assert aggregator.peak()['Date'] == pd.Timestamp("2023-07-31 23:30")
+
+
+def test_peaks_are_stored_per_month_and_follow_corrections(monkeypatch):
+    aggregator = CoincidentDemandAggregator()
+    aggregator.update('Mtr1', readings("2023-06-30 23:00", [1.0, 6.0, 2.0, 3.0]))
+    aggregator.update('Mtr2', readings("2023-07-01 00:00", [1.0]))
+
+    # Queries read the stored peaks, not the site sums of the intervals
+    monkeypatch.setattr(aggregator, '_totals', {})
+    assert aggregator.peak()['Date'] == pd.Timestamp("2023-06-30 23:30")
+    assert aggregator.peak()['Mtr1'] == 6.0 and pd.isna(aggregator.peak()['Mtr2'])
+
+    aggregator.update('Mtr1', readings("2023-06-30 23:30", [0.5]))  # a corrected June reading
+    assert aggregator.peak()['Date'] == pd.Timestamp("2023-07-01 00:00")
+    assert list(aggregator.monthly_peaks()['Total kVA']) == [1.0, 3.0]
+
+
+def test_save_and_load_write_only_the_changed_months(tmp_path):
+    pytest.importorskip('pyarrow')
+    aggregator = CoincidentDemandAggregator(tmp_path)
+    aggregator.update('Mtr1', readings("2023-07-31 23:00", [1.0, 2.0, 3.0]))
+    aggregator.save()
+    july = tmp_path / f"2023-07{CHECKPOINT_SUFFIX}"
+    written = july.stat().st_mtime_ns
+
+    aggregator.update('Mtr2', readings("2023-08-01 00:00", [5.0]))
+    aggregator.save()
+    loaded = CoincidentDemandAggregator.load(tmp_path)
+
+    assert july.stat().st_mtime_ns == written
+    assert loaded.meters == ['Mtr1', 'Mtr2']
+    pd.testing.assert_series_equal(loaded.site_demand(), aggregator.site_demand(), check_freq=False)
+
+
+def test_checkpoints_need_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(coincident, 'pyarrow', None)
+    aggregator = CoincidentDemandAggregator(tmp_path).update('Mtr1', readings("2023-07-01", [1.0]))
+
+    with pytest.raises(ImportError, match="pyarrow"):
+        aggregator.save()
+    with pytest.raises(ImportError, match="pyarrow"):
+        CoincidentDemandAggregator.load(tmp_path)
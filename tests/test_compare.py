@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from tariff.batch import bill_meters
+from tariff.compare import compare_tariffs
+from tariff.tariff_maps import tariff_c, tariff_d
+from tests.profiles import profile
+
+
+def test_compare_tariffs_prices_every_voltage_type_as_batch_bills_it():
+    # One July day, so the monthly batch bill is the whole bill
+    df = profile('site', "2023-07-03 00:00", [float(10 + hour % 7) for hour in range(48)])
+
+    table = compare_tariffs(df.drop(columns='meter'), tariffs=(tariff_c, tariff_d))
+
+    assert len(table) == len(tariff_c["meter_voltage_types"]) + len(tariff_d["meter_voltage_types"])
+    assert list(table['rank']) == list(range(1, len(table) + 1))
+    assert table['total'].is_monotonic_increasing
+    for row in table.itertuples():
+        tariff = tariff_c if row.tariff == tariff_c["code"] else tariff_d
+        bills = bill_meters(df, {'site': (tariff, row.voltage_type)})
+        assert row.total == pytest.approx(bills['total'].sum())
+        assert row.total_incl_vat == pytest.approx(row.total * (1 + tariff["vat_rate"]))
+
+
+def test_compare_tariffs_uses_the_interval_of_the_timestamps():
+    hourly = profile('site', "2023-07-03 00:00", [10.0] * 24, freq="h").drop(columns='meter')
+    half_hourly = profile('site', "2023-07-03 00:00", [10.0] * 48).drop(columns='meter')
+
+    by_hour = compare_tariffs(hourly, tariffs=(tariff_c,)).set_index('voltage_type')
+    by_half_hour = compare_tariffs(half_hourly, tariffs=(tariff_c,)).set_index('voltage_type')
+
+    pd.testing.assert_series_equal(by_hour["Energy charge"], by_half_hour["Energy charge"])
@@ -0,0 +1,39 @@
+import copy
+
+import pandas as pd
+
+from tariff.compiled import compile_tariff
+from tariff.constants import HIGH_DEMAND, PEAK, ChargeVoltageType
+from tariff.tariff_maps import tariff_c, tariff_intervals
+from tariff.tou import PERIODS, SEASONS
+from tariff.tou_calendar import calendar_labels, tou_calendar
+from tests.profiles import charge
+
+VOLTAGE = ChargeVoltageType.ANY_230_400_V
+
+
+def test_equal_tariffs_share_their_compiled_tariff():
+    assert compile_tariff(copy.deepcopy(tariff_c)) is compile_tariff(tariff_c)
+
+
+def test_a_tariff_changed_under_the_same_code_is_compiled_again():
+    changed = copy.deepcopy(tariff_c)
+    charge(changed, "energy_charge")["types"][HIGH_DEMAND][VOLTAGE][PEAK] = 9.99
+    original = compile_tariff(tariff_c)
+
+    compiled = compile_tariff(changed)
+
+    rate = (compiled.voltage_code(VOLTAGE), SEASONS.index(HIGH_DEMAND), PERIODS.index(PEAK))
+    assert compiled.code == original.code
+    assert compiled.energy_rates[rate] == 9.99
+    assert original.energy_rates[rate] != 9.99
+
+
+def test_calendars_follow_the_content_of_the_tariff():
+    # The same code with January in the high demand season of its map
+    changed = {**tariff_c, "tariff_map": {**tariff_intervals, "high_demand_months": [1]}}
+    dates = pd.to_datetime(["2023-01-02 07:00"])
+
+    assert tou_calendar(changed, year=2023) is not tou_calendar(tariff_c, year=2023)
+    assert calendar_labels(dates, changed)[0][0] == HIGH_DEMAND
+    assert calendar_labels(dates, tariff_c)[0][0] != HIGH_DEMAND
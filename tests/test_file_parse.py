@@ -0,0 +1,133 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.constants import HIGH_DEMAND, OFF_PEAK, PEAK
+from tariff.file_parse import (
+    THREAD,
+    ParseReport,
+    compact_dtypes,
+    iter_excel_chunks,
+    memory_report,
+    parse_sheet,
+    parse_sheets,
+    read_and_parse_csv,
+    read_and_parse_excel,
+)
+from tests.sheets import make_sheet, to_csv, to_workbook, to_xlsx
+
+STAGES = {"clean_numerics", "clean_text", "parse_timestamps", "apply_multiplier", "classify_tou"}
+
+
+def test_parse_sheet_runs_every_stage():
+    report = ParseReport()
+
+    df = parse_sheet(make_sheet(kw=['0,5', '1 234,5', 'x', 0.25]), multiplier=2, report=report)
+
+    np.testing.assert_allclose(df['KW'], [1.0, 2469.0, np.nan, 0.5])
+    np.testing.assert_allclose(df['KVA'], [1.5] * 4)
+    assert df['Date'].iloc[0] == pd.Timestamp("2023-07-03 07:00")
+    assert list(df['season'].unique()) == [HIGH_DEMAND]
+    assert list(df['rate']) == [PEAK] * 4
+    assert [(error['column'], error['row'], error['value']) for error in report.errors] == [('KW', 2, 'x')]
+    assert set(report.timings) == STAGES
+
+
+def test_parse_sheet_sundays_are_off_peak():
+    sheet = make_sheet()
+    sheet['Date'] = pd.date_range("2023-07-02 07:00", periods=4, freq="30min").strftime('%d/%m/%Y %H:%M')
+
+    df = parse_sheet(sheet, report=ParseReport())
+
+    assert set(df['rate']) == {OFF_PEAK}
+
+
+def test_read_and_parse_excel_records_every_stage_in_one_report():
+    report = ParseReport()
+
+    df = read_and_parse_excel(to_xlsx(make_sheet()), multiplier=1, report=report, use_cache=False)
+
+    assert len(df) == 4
+    assert set(report.timings) == STAGES | {"read"}
+
+
+@pytest.mark.parametrize("reader, write", [
+    (lambda file_obj: read_and_parse_excel(file_obj, multiplier=1, use_cache=False), to_xlsx),
+    (lambda file_obj: read_and_parse_csv(file_obj, multiplier=1), to_csv),
+])
+def test_readers_log_the_errors_of_a_file_once(caplog, reader, write):
+    with caplog.at_level(logging.WARNING, logger='tariff'):
+        reader(write(make_sheet(kw=['x', 'y', 1, 2])))
+
+    assert [record.getMessage() for record in caplog.records] == ["2 parse errors in file"]
+
+
+def test_read_and_parse_csv_matches_excel():
+    sheet = make_sheet()
+
+    from_csv = read_and_parse_csv(to_csv(sheet), multiplier=1, report=ParseReport())
+    from_excel = read_and_parse_excel(to_xlsx(sheet), multiplier=1, report=ParseReport(), use_cache=False)
+
+    pd.testing.assert_frame_equal(from_csv, from_excel.reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("index_name", [None, "No"])
+def test_iter_excel_chunks_matches_read_and_parse_excel(index_name):
+    sheet = make_sheet(rows=10).rename_axis(index_name)
+
+    chunks = list(iter_excel_chunks(to_xlsx(sheet), chunksize=4, multiplier=1, report=ParseReport()))
+    whole = read_and_parse_excel(to_xlsx(sheet), multiplier=1, report=ParseReport(), use_cache=False)
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), whole)
+
+
+def test_parse_sheets_in_threads_matches_one_by_one():
+    upload = to_workbook({'a': make_sheet(), 'b': make_sheet(kw=[1.0, 2.0, 3.0, 4.0])})
+
+    one_by_one = parse_sheets(upload, sheets=[0, 'b'], multiplier=1, use_cache=False)
+    threaded = parse_sheets(upload, sheets=[0, 'b'], multiplier=1, executor=THREAD, max_workers=2, use_cache=False)
+
+    assert [sheet for sheet, _ in threaded] == [0, 'b']
+    for (_, expected), (_, df) in zip(one_by_one, threaded):
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_parse_sheets_reports_missing_sheets():
+    report = ParseReport()
+
+    parsed = parse_sheets(to_workbook({'a': make_sheet()}), sheets=[0, 3], report=report, use_cache=False)
+
+    assert [sheet for sheet, _ in parsed] == [0]
+    assert [error['sheet'] for error in report.errors] == [3]
+
+
+def test_parse_sheets_rejects_unknown_executors():
+    with pytest.raises(ValueError, match="Unknown executor"):
+        parse_sheets(to_workbook({'a': make_sheet()}), executor='threads')
+
+
+def test_compact_dtypes_keeps_every_value():
+    df = read_and_parse_excel(to_xlsx(make_sheet(rows=48)), multiplier=1, report=ParseReport(), use_cache=False)
+
+    compact = compact_dtypes(df)
+
+    assert isinstance(compact['season'].dtype, pd.CategoricalDtype)
+    assert isinstance(compact['rate'].dtype, pd.CategoricalDtype)
+    assert compact['month'].dtype == np.int8
+    assert compact['KW'].dtype == np.float64
+    pd.testing.assert_frame_equal(compact.astype(df.dtypes.to_dict()), df)
+    assert memory_report(compact).loc['total', 'bytes'] < memory_report(df).loc['total', 'bytes']
+
+
+@pytest.mark.parametrize("reader, write", [
+    (lambda file_obj, **options: read_and_parse_excel(file_obj, use_cache=False, **options), to_xlsx),
+    (read_and_parse_csv, to_csv),
+])
+def test_readers_pass_float32_to_compact_dtypes(reader, write):
+    df = reader(write(make_sheet()), report=ParseReport(), compact=True, float32=True)
+
+    assert {str(df[col].dtype) for col in ['KW', 'KVAR', 'KVA']} == {'float32'}
+    assert isinstance(df['rate'].dtype, pd.CategoricalDtype)
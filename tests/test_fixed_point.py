@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.batch import bill_meters, bill_summary
+from tariff.billing import TariffCalculator
+from tariff.constants import ChargeVoltageType
+from tariff.fixed_point import (amount_to_cents, cents_to_rand, costs, costs_to_cents, quantize, round_div,
+                                to_milli_cents, vat_cents)
+from tariff.tariff_maps import tariff_c
+from tests.profiles import billing_frame
+
+
+def test_to_milli_cents_is_exact_for_decimal_rates():
+    assert list(to_milli_cents([2.3382, 168.48, 0.00001])) == [233820, 16848000, 1]
+
+
+def test_to_milli_cents_rejects_finer_or_missing_rates():
+    with pytest.raises(ValueError):
+        to_milli_cents([0.000005])
+    with pytest.raises(ValueError):
+        to_milli_cents([np.nan])
+
+
+def test_quantize_rounds_half_to_even_and_zeroes_missing_values():
+    assert list(quantize([0.0005, 0.0015, 1.2344, np.nan])) == [0, 2, 1234, 0]
+
+
+def test_round_div_rounds_half_away_from_zero():
+    assert list(round_div([5, 15, -5, -15, 14, -14], 10)) == [1, 2, -1, -2, 1, -1]
+
+
+def test_costs_to_cents_rounds_the_exact_line_cost_once():
+    # Three intervals of 4 Wh at R1/kWh cost 0.4 cents each, 1.2 cents together
+    interval_costs = costs(to_milli_cents([1.0] * 3), quantize([0.004] * 3))
+
+    assert costs_to_cents(interval_costs.sum()) == 1
+    assert costs_to_cents(interval_costs).sum() == 0
+
+
+def test_costs_raise_instead_of_overflowing():
+    with pytest.raises(OverflowError):
+        costs([np.iinfo(np.int64).max // 2], [3])
+
+
+def test_amount_to_cents_rounds_the_written_decimal():
+    # 1.005 is 1.00499999... in binary, round() gives 1.0
+    assert amount_to_cents(1.005) == 101
+    assert amount_to_cents(-1.005) == -101
+    assert amount_to_cents(2.675) == 268
+
+
+def test_vat_cents_uses_the_decimal_vat_rate():
+    # 15% of 3.33 and of 0.10, half cents away from zero
+    assert list(vat_cents([333, 10, -10], 0.15)) == [50, 2, -2]
+    assert cents_to_rand(12345) == Decimal("123.45")
+
+
+def test_exact_bill_summary_rounds_every_charge_then_the_vat():
+    charges = [{"total": 1.005}, {"total": 2.675}, {"total": 0.333}]
+    calculator = TariffCalculator(ChargeVoltageType.ANY_230_400_V, tariff_c, pd.DataFrame({'month': [7]}),
+                                  current_charges=charges)
+
+    summary = calculator.get_bill_summary(exact=True)
+
+    assert summary["total"] == Decimal("4.02")
+    assert summary["vat_amount"] == Decimal("0.60")
+    assert summary["total_incl_vat"] == Decimal("4.62")
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_exact_bills_match_the_batch_exact_path(seed):
+    rng = np.random.default_rng(seed)
+    month = int(rng.integers(1, 13))
+    dates = pd.date_range(f"2023-{month:02d}-01", periods=int(rng.integers(48, 31 * 48)), freq="30min")
+    kw = rng.uniform(0, 200, len(dates)).round(3)
+    kva = (kw * rng.uniform(1, 1.3, len(dates))).round(3)
+    voltage = ChargeVoltageType.ANY_230_400_V
+
+    calculator = TariffCalculator(voltage, tariff_c, billing_frame(dates, kw, kva))
+    calculator.calculate_tariff()
+    summary = calculator.get_bill_summary(exact=True)
+
+    profile = pd.DataFrame({'meter': 'site', 'date': dates, 'kw': kw, 'kva': kva})
+    bills = bill_meters(profile, {'site': (tariff_c, voltage)}, holidays=(), exact=True)
+    batch = bill_summary(bills, [tariff_c]).iloc[0]
+    assert amount_to_cents(summary["total"]) == batch['total_cents']
+    assert amount_to_cents(summary["vat_amount"]) == batch['vat_cents']
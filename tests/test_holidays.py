@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.holidays import (build_public_holidays, easter_sunday, holidays_between, holidays_for, is_off_peak_day,
+                             public_holidays)
+
+
+@pytest.mark.parametrize('year, easter', [(2000, "2000-04-23"), (2019, "2019-04-21"), (2023, "2023-04-09"),
+                                          (2024, "2024-03-31"), (2038, "2038-04-25")])
+def test_easter_sunday(year, easter):
+    assert easter_sunday(year) == np.datetime64(easter)
+
+
+def test_public_holidays_of_a_year():
+    holidays = build_public_holidays(2023)
+
+    # Good Friday and Family Day around Easter, the 2023-12-15 declared holiday, New Year's Day and
+    # Heritage Day on Sundays observed on the Mondays, Youth Day on a Friday not shifted
+    for day in ["2023-04-07", "2023-04-10", "2023-12-15", "2023-01-02", "2023-09-25", "2023-06-16"]:
+        assert pd.Timestamp(day) in holidays
+    assert pd.Timestamp("2023-06-17") not in holidays
+    assert holidays.is_monotonic_increasing and len(holidays) == 15
+
+
+def test_a_sunday_holiday_before_another_holiday_moves_past_it():
+    # Christmas 2022 was a Sunday, the Monday is the Day of Goodwill, so the Tuesday is off
+    assert pd.Timestamp("2022-12-27") in build_public_holidays(2022)
+
+
+def test_no_holidays_before_the_act():
+    with pytest.raises(ValueError):
+        build_public_holidays(1994)
+    assert holidays_between(1990, 1994).empty
+
+
+def test_holidays_are_built_once_per_year():
+    assert public_holidays(2023) is public_holidays(2023)
+
+
+def test_holidays_for_spans_the_years_of_the_dates():
+    holidays = holidays_for(pd.to_datetime(["2022-12-31", None, "2024-01-01"]))
+
+    assert set(holidays.year) == {2022, 2023, 2024}
+    assert holidays_for(pd.DatetimeIndex([])).empty
+
+
+def test_is_off_peak_day_on_sundays_and_holidays():
+    dates = pd.to_datetime(["2023-06-16 07:00", "2023-06-17 07:00", "2023-06-18 07:00", "2024-05-29 23:30"])
+
+    assert list(is_off_peak_day(dates)) == [True, False, True, True]
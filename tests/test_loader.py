@@ -0,0 +1,32 @@
+import copy
+
+import pytest
+
+from tariff.constants import ChargeVoltageType
+from tariff.loader import TariffValidationError, tariff_errors, validate_tariff
+from tariff.tariff_maps import tariff_a, tariff_c, tariff_d
+from tests.profiles import charge
+
+
+@pytest.mark.parametrize('tariff', [tariff_a, tariff_c, tariff_d], ids=lambda tariff: tariff["name"])
+def test_shipped_tariffs_are_valid(tariff):
+    assert tariff_errors(tariff) == []
+
+
+def test_a_tariff_without_an_expiry_date_is_invalid():
+    tariff = {key: value for key, value in tariff_c.items() if key != "expires"}
+
+    with pytest.raises(TariffValidationError, match="'expires' is a required property"):
+        validate_tariff(tariff)
+
+
+def test_every_voltage_type_needs_a_rate():
+    tariff = copy.deepcopy(tariff_c)
+    del charge(tariff, "fixed_charge")["types"][ChargeVoltageType.ANY_230_400_V]
+
+    with pytest.raises(TariffValidationError) as error:
+        validate_tariff(tariff)
+
+    assert error.value.code == tariff_c["code"]
+    assert error.value.errors == [f"charges/0/types/{ChargeVoltageType.ANY_230_400_V}: no fixed_charge rate for "
+                                  f"{ChargeVoltageType.ANY_230_400_V}"]
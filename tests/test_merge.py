@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from tariff.file_parse import ParseReport
+from tariff.merge import dedupe_timestamps, merge_meters, union_index
+
+
+def meter(dates, kva):
+    return pd.DataFrame({'Date': pd.to_datetime(dates), 'KVA': kva})
+
+
+def test_dedupe_timestamps_sorts_and_keeps_the_first_reading_with_a_value():
+    dates = pd.to_datetime(["2023-07-01 01:00", "2023-07-01 00:30", None, "2023-07-01 01:00", "2023-07-01 00:30"])
+    values = np.array([np.nan, 1.0, 5.0, 2.0, 3.0])
+
+    unique, readings, duplicates = dedupe_timestamps(dates.values, values)
+
+    assert list(unique) == list(pd.to_datetime(["2023-07-01 00:30", "2023-07-01 01:00"]).values)
+    np.testing.assert_array_equal(readings, [1.0, 2.0])
+    assert len(duplicates) == 2
+
+
+def test_union_index_outer_joins_sorted_indexes():
+    indexes = [pd.date_range("2023-07-01", periods=3, freq=f"{step}min") for step in (30, 60, 90)]
+
+    joined = union_index(indexes)
+
+    assert joined.name == 'Date'
+    assert joined.is_monotonic_increasing and joined.is_unique
+    assert set(joined) == set().union(*map(set, indexes))
+
+
+def test_merge_meters_matches_an_outer_join():
+    a = meter(["2023-07-01 00:30", "2023-07-01 01:00", "2023-07-01 01:30"], [1.0, 2.0, 3.0])
+    b = meter(["2023-07-01 01:00", "2023-07-01 01:00", "2023-07-01 02:00"], [4.0, 9.0, 5.0])
+    report = ParseReport()
+
+    merged, summary = merge_meters({'Mtr1': a, 'Mtr2': b}, report=report)
+
+    expected = pd.concat([a.set_index('Date')['KVA'].rename('Mtr1'),
+                          b.drop_duplicates('Date').set_index('Date')['KVA'].rename('Mtr2')], axis=1)
+    pd.testing.assert_frame_equal(merged, expected.rename_axis('Date'), check_freq=False)
+    assert summary.loc['Mtr2', 'duplicates'] == 1
+    assert list(summary['missing']) == [1, 2]
+    assert {error['sheet'] for error in report.errors} == {'Mtr1', 'Mtr2'}
@@ -0,0 +1,61 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from tariff.constants import ALS_F, LGZ_F
+from tariff.file_parse import ParseReport
+from tariff.meter_formats import HEADER_BYTES, detect_meter_format, read_header, read_meter_file
+
+
+class Upload(BytesIO):
+    """An uploaded file that counts the bytes read from it."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def lgz_csv(rows=4):
+    dates = pd.date_range("2023-07-03 07:30", periods=rows, freq="30min")
+    lines = ["0-0:1.0.0;0-0:96.240.12 [HEX];1-1:1.5.0 [kW];1-1:5.5.0 [kvar]"]
+    lines += [f"{date:%d/%m/%Y %H:%M};008000C4;0,3;0,4" for date in dates]
+    return "\n".join(lines).encode()
+
+
+def test_read_header_reads_only_the_start_of_a_csv():
+    upload = Upload(lgz_csv(rows=5000), 'lgz.csv')
+
+    fields, _ = read_header(upload)
+
+    assert fields[0] == "0-0:1.0.0"
+    assert upload.bytes_read <= HEADER_BYTES
+    assert upload.tell() == 0
+
+
+def test_detect_meter_format():
+    als = Upload(b"RDATE,RTIME,KWH+,KVARH+,KWH-,KVARH-,KVA,PF,STATUS\n", 'als.csv')
+    unknown = Upload(b"Date,KW,KVAR,KVA\n", 'other.csv')
+
+    assert detect_meter_format(Upload(lgz_csv(), 'lgz.csv')).name == LGZ_F
+    assert detect_meter_format(als).name == ALS_F
+    assert detect_meter_format(unknown) is None
+
+
+def test_read_meter_file_scales_like_the_other_readers():
+    report = ParseReport()
+
+    df = read_meter_file(Upload(lgz_csv(), 'lgz.csv'), report=report)
+
+    np.testing.assert_allclose(df['KW'], [0.3 * 200000] * 4)
+    np.testing.assert_allclose(df['KVA'], [0.5 * 200000] * 4)
+    assert list(df['HEX']) == ['008000C4'] * 4
+    assert df['Date'].iloc[0] == pd.Timestamp("2023-07-03 07:30")
+    assert report.errors == []
+    assert "read" in report.timings
@@ -0,0 +1,67 @@
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+from tariff import file_parse, parse_cache as parse_cache_module
+from tariff.file_parse import ParseReport, read_and_parse_excel
+from tariff.parse_cache import SUFFIX, ParseCache
+from tests.sheets import make_sheet, to_xlsx
+
+pytest.importorskip('pyarrow')
+
+
+def test_cache_is_off_without_a_directory():
+    cache = ParseCache(directory=None)
+
+    cache.put('key', pd.DataFrame({'KW': [1.0]}))
+
+    assert not cache.enabled
+    assert cache.get('key') is None
+
+
+def test_cache_is_off_without_pyarrow(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(parse_cache_module, 'pa', None)
+
+    with caplog.at_level(logging.WARNING, logger='tariff'):
+        cache = ParseCache(directory=tmp_path)
+
+    assert not cache.enabled
+    assert "needs pyarrow" in caplog.text
+
+
+def test_put_and_get_keep_the_frame_and_errors(tmp_path):
+    cache = ParseCache(directory=tmp_path)
+    df = pd.DataFrame({'KW': [1.0, 2.0], 'HEX': ['008000C4', 800000]}, index=[3, 4])
+    errors = [{"sheet": "a", "column": "KW", "row": 3, "value": "x", "message": "not a number"}]
+
+    cache.put('key', df, errors)
+    cached, cached_errors = cache.get('key')
+
+    pd.testing.assert_frame_equal(cached, df.astype({'HEX': str}))
+    assert cached_errors == errors
+
+
+def test_prune_removes_other_versions_and_old_entries(tmp_path):
+    ParseCache(directory=tmp_path, version='1').put('old', pd.DataFrame({'KW': [1.0]}))
+    cache = ParseCache(directory=tmp_path, version='2')
+    cache.put('stale', pd.DataFrame({'KW': [1.0]}))
+    os.utime(cache.path('stale'), (0, 0))
+
+    cache.put('new', pd.DataFrame({'KW': [1.0]}))
+
+    assert sorted(path.name for path in tmp_path.glob(f"*{SUFFIX}")) == [f"new.v2{SUFFIX}"]
+
+
+def test_read_and_parse_excel_reads_the_cache_the_second_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_parse, 'parse_cache', ParseCache(directory=tmp_path))
+    upload = to_xlsx(make_sheet())
+
+    first, second = ParseReport(), ParseReport()
+    parsed = read_and_parse_excel(upload, report=first)
+    cached = read_and_parse_excel(upload, report=second)
+
+    assert "read" in first.timings and "read_cache" not in first.timings
+    assert set(second.timings) == {"read_cache"}
+    pd.testing.assert_frame_equal(cached, parsed)
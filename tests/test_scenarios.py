@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from tariff.compare import compare_tariffs
+from tariff.constants import OFF_PEAK, PEAK, ChargeVoltageType
+from tariff.scenarios import AddLoad, Cap, Scale, ScenarioEngine, Shift, Transformation
+from tariff.tariff_maps import tariff_c
+from tariff.tou import PERIODS
+from tests.profiles import profile
+
+VOLTAGE = ChargeVoltageType.ANY_230_400_V
+
+
+def week(start="2023-07-03", freq="30min"):
+    """A week of a daytime load over a base load, kVA a tenth above kW."""
+    dates = pd.date_range(start, pd.Timestamp(start) + pd.Timedelta(days=7), freq=freq, inclusive='left')
+    return profile('site', start, [30.0 if 6 <= date.hour < 20 else 10.0 for date in dates], freq).drop(columns='meter')
+
+
+def test_baseline_is_priced_as_compare_tariffs_prices_the_profile():
+    df = week(freq="15min")
+
+    engine = ScenarioEngine(df, tariff_c, VOLTAGE)
+
+    compared = compare_tariffs(df, tariffs=(tariff_c,)).set_index('voltage_type').loc[VOLTAGE]
+    assert engine.hours == 0.25
+    assert sum(engine.base_charges.values()) == pytest.approx(compared['total'])
+
+
+def test_scenarios_are_deltas_against_the_baseline():
+    engine = ScenarioEngine(week(), tariff_c, VOLTAGE)
+
+    result = engine.evaluate({
+        'none': [],
+        'half': [Scale(0.5)],
+        'other months': [Scale(0.5, months=[1])],
+        'cap': [Cap(20.0)],
+    })
+
+    assert result.loc['none', 'delta'] == 0
+    assert result.loc['other months', 'delta'] == 0
+    assert result.loc['half', "Energy charge"] == pytest.approx(-0.5 * engine.base_charges["Energy charge"])
+    assert result.loc['half', "Demand charge"] == pytest.approx(-0.5 * engine.base_charges["Demand charge"])
+    assert result.loc['cap', "Demand charge"] < 0
+    assert result.loc['cap', 'total'] == pytest.approx(sum(engine.base_charges.values()) + result.loc['cap', 'delta'])
+
+
+def test_shift_moves_energy_within_the_month():
+    engine = ScenarioEngine(week(), tariff_c, VOLTAGE)
+    base = engine.profile([])
+
+    shifted = engine.profile([Shift(5.0, from_periods=(PEAK,), to_periods=(OFF_PEAK,))])
+
+    assert shifted['kw'].sum() == pytest.approx(base['kw'].sum())
+    moved = engine.aggregates([Shift(5.0)]).kwh - engine.baseline.kwh
+    # 5 kW out of the ten peak half-hours of each of Monday to Saturday
+    assert moved[0, PERIODS.index(PEAK)] == pytest.approx(-5.0 * 0.5 * 60)
+    assert moved[0, PERIODS.index(OFF_PEAK)] == pytest.approx(5.0 * 0.5 * 60)
+
+
+def test_add_load_is_billed_over_the_interval_length():
+    hourly = ScenarioEngine(week(freq="h"), tariff_c, VOLTAGE)
+    half_hourly = ScenarioEngine(week(), tariff_c, VOLTAGE)
+
+    added = [AddLoad(1.0, periods=(OFF_PEAK,))]
+
+    assert hourly.evaluate({'add': added}).loc['add', "Energy charge"] == pytest.approx(
+        half_hourly.evaluate({'add': added}).loc['add', "Energy charge"])
+
+
+def test_transformations_must_implement_apply():
+    with pytest.raises(TypeError):
+        Transformation()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tariff.constants import HIGH_DEMAND, LOW_DEMAND, OFF_PEAK, PEAK, STANDARD
+from tariff.tariff_maps import coe_tariff_e_2020_2021, tariff_intervals
+from tariff.tou import PERIODS, SEASONS, SUNDAY, build_tou_grid, classify_tou, season_lookup, tou_grid
+
+
+def expected_labels(dates, tariff_map, holidays=()):
+    """Labels every timestamp from the tariff map one at a time."""
+    holidays = {pd.Timestamp(day).date() for day in holidays}
+    seasons, periods = [], []
+    for date in pd.DatetimeIndex(dates):
+        season = HIGH_DEMAND if date.month in tariff_map["high_demand_months"] else LOW_DEMAND
+        seasons.append(season)
+        if date.weekday() == SUNDAY or date.date() in holidays:
+            periods.append(OFF_PEAK)
+        else:
+            periods.append(tariff_map[season][date.hour][date.minute // 30])
+    return seasons, periods
+
+
+@pytest.mark.parametrize("tariff_map", [tariff_intervals, coe_tariff_e_2020_2021])
+def test_classify_tou_matches_tariff_map(tariff_map):
+    dates = pd.date_range("2023-05-29", "2023-06-12", freq="30min")
+
+    season, period = classify_tou(dates, tariff_map)
+
+    expected_season, expected_period = expected_labels(dates, tariff_map)
+    assert list(season) == expected_season
+    assert list(period) == expected_period
+
+
+def test_build_tou_grid_sundays_are_off_peak():
+    grid = build_tou_grid(tariff_intervals)
+
+    assert grid.shape == (len(SEASONS), 7, 48)
+    assert (grid[:, SUNDAY] == PERIODS.index(OFF_PEAK)).all()
+    # Monday 07:30 in the low demand season, 18:00 in the high demand season
+    assert PERIODS[grid[SEASONS.index(LOW_DEMAND), 0, 15]] == PEAK
+    assert PERIODS[grid[SEASONS.index(HIGH_DEMAND), 0, 36]] == PEAK
+    assert PERIODS[grid[SEASONS.index(HIGH_DEMAND), 0, 20]] == STANDARD
+
+
+def test_classify_tou_holidays_are_off_peak_all_day():
+    dates = pd.date_range("2023-06-16", periods=48, freq="30min")  # a Friday
+
+    _, period = classify_tou(dates, tariff_intervals, holidays=["2023-06-16"])
+
+    assert set(period) == {OFF_PEAK}
+
+
+def test_classify_tou_uses_wall_time_of_aware_timestamps():
+    dates = pd.date_range("2023-06-12 07:00", periods=4, freq="30min")
+
+    _, naive = classify_tou(dates, tariff_intervals)
+    _, aware = classify_tou(dates.tz_localize("Africa/Johannesburg"), tariff_intervals)
+
+    assert list(aware) == list(naive)
+
+
+def test_tou_grid_is_built_once_and_read_only():
+    grid = tou_grid(tariff_intervals)
+
+    assert tou_grid(tariff_intervals) is grid
+    with pytest.raises(ValueError):
+        grid[0, 0, 0] = 0
+
+
+def test_season_lookup():
+    lookup = season_lookup([6, 7, 8])
+
+    assert [SEASONS[code] for code in lookup[1:]] == [LOW_DEMAND] * 5 + [HIGH_DEMAND] * 3 + [LOW_DEMAND] * 4
+    assert lookup.dtype == np.int8
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from tariff.tariff_maps import tariff_c, tariff_intervals
+from tariff.tou import classify_tou
+from tariff.tou_calendar import calendar_labels, slot_minutes, tou_calendar
+
+
+@pytest.mark.parametrize('resolution', [5, '15min', 30, 60])
+def test_calendar_labels_match_the_tariff_map(resolution):
+    # A year boundary, with readings a few minutes into their slots
+    dates = pd.date_range("2022-12-30", "2023-01-03", freq="5min") + pd.Timedelta(minutes=2)
+
+    season, period = calendar_labels(dates, tariff_c, resolution)
+
+    expected_season, expected_period = classify_tou(dates, tariff_intervals)
+    assert list(season) == list(expected_season)
+    assert list(period) == list(expected_period)
+
+
+def test_calendars_are_built_once_per_year_and_resolution():
+    calendar = tou_calendar(tariff_c, '15min', 2023)
+
+    assert tou_calendar(tariff_c, 15, 2023) is calendar
+    assert len(calendar) == 365 * 24 * 4
+
+
+def test_slot_minutes_must_divide_a_day():
+    with pytest.raises(ValueError):
+        slot_minutes(7)